@@ -10,15 +10,19 @@ This file should:
 - Only expose register_agency_blueprints(app)
 """
 
-from .trips import agency_trips_bp
-from .dashboard import agency_dashboard_bp
-
 
 def register_agency_blueprints(app):
     """
     Attach all agency blueprints to the Flask app.
 
-    Keeps app.py clean and prevents circular imports.
+    Blueprint modules are imported here rather than at package import
+    time, so `import agency.decorators` stays cheap and app.py has a
+    single registration path.
     """
-    app.register_blueprint(agency_trips_bp)
-    app.register_blueprint(agency_dashboard_bp)
+    from auth.agency_auth import agency_auth_bp
+    from .dashboard import dashboard_bp
+    from .trips import agency_trips_bp
+
+    app.register_blueprint(agency_auth_bp, url_prefix="/agency")
+    app.register_blueprint(dashboard_bp, url_prefix="/agency")
+    app.register_blueprint(agency_trips_bp, url_prefix="/agency")
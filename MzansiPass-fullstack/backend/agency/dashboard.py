@@ -2,7 +2,7 @@ from flask import Blueprint, jsonify
 from flask_jwt_extended import get_jwt
 from models import Trip, Transaction
 from agency.decorators import agency_required
-from extensions import db
+from models import db
 from sqlalchemy import func
 
 dashboard_bp = Blueprint("agency_dashboard", __name__, url_prefix="/api/agency/dashboard")
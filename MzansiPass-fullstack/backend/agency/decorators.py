@@ -2,6 +2,8 @@ from flask_jwt_extended import verify_jwt_in_request, get_jwt
 from functools import wraps
 from flask import jsonify
 
+from tenancy import enter_tenant
+
 def agency_required(roles=None):
     def wrapper(fn):
         @wraps(fn)
@@ -15,6 +17,13 @@ def agency_required(roles=None):
             if roles and claims["role"] not in roles:
                 return jsonify({"error": "Insufficient role"}), 403
 
+            # Per-agency pool / schema / rate limit
+            retry_after = enter_tenant(claims["agency_id"])
+            if retry_after:
+                resp = jsonify({"error": "Agency rate limit exceeded"})
+                resp.headers["Retry-After"] = str(max(1, round(retry_after)))
+                return resp, 429
+
             return fn(*args, **kwargs)
         return decorator
     return wrapper
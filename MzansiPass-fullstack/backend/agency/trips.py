@@ -1,12 +1,19 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, abort, current_app, g
 from flask_jwt_extended import get_jwt
 from datetime import datetime
 from sqlalchemy.exc import IntegrityError
 
-from models import Trip, TripStatus, Transaction, TransactionType, User
+from models import Trip, TripStatus, Transaction, TransactionType, User, Card, TransportAgency
 from agency.decorators import agency_required
 from models import db
 from fares.engine import FareEngine, FareContext
+from fares.exceptions import FareCalculationError
+from fare_state import store as fare_state_store, price_with_caps
+from ratelimit import limiter, by_agency, by_terminal
+from serialization import Shape, paginate
+from fraud import TapEvent, screen_tap, valid_point
+import outbox
+import shards
 
 agency_trips_bp = Blueprint(
     "agency_trips",
@@ -29,6 +36,68 @@ def error(code, message, status=400):
     }), status
 
 
+# Column-only reads for the listings (see serialization/)
+TRIP_ROW = Shape(
+    id=Trip.id,
+    card_id=Trip.card_id,
+    start_time=Trip.start_time,
+    end_time=Trip.end_time,
+    fare=Trip.fare,
+    status=Trip.status,
+)
+
+TRIP_DETAIL = TRIP_ROW.extend(
+    start_lat=Trip.start_lat,
+    start_lng=Trip.start_lng,
+    end_lat=Trip.end_lat,
+    end_lng=Trip.end_lng,
+)
+
+
+def user_for_card(card_id):
+    # Cards live in their own table; users have no card_id column
+    return (
+        User.query
+        .join(Card, Card.user_id == User.id)
+        .filter(Card.card_id == card_id)
+        .first()
+    )
+
+
+# Refusal code from the owning tap shard -> (message, status)
+SHARD_REFUSALS = {
+    "card_not_found": ("Invalid card", 404),
+    "active_trip_exists": ("Trip already in progress", 409),
+    "no_active_trip": ("No active trip found", 409),
+    "card_blocked": ("Card blocked pending review", 403),
+}
+
+
+def submit_tap(tap, balance_message):
+    """
+    TAPSHARD_ENABLED: -> (result, None) or (None, error response).
+
+    The agency is checked first: an id the shard's batch insert cannot
+    take would fail every tap written with it.
+    """
+    if db.session.get(TransportAgency, tap.agency_id) is None:
+        return None, error("unknown_agency", "Agency not found", 403)
+
+    try:
+        result = shards.submit(tap)
+    except shards.ShardUnavailable:
+        return None, error("tap_unavailable", "Tap service unavailable, please tap again", 503)
+
+    code = result.get("error")
+    if code is None:
+        return result, None
+    if code == "insufficient_balance":
+        return None, error(code, balance_message, 402)
+
+    message, status = SHARD_REFUSALS.get(code, ("Please tap again", 409))
+    return None, error(code, message, status)
+
+
 # ----------------------------------------------------
 # LIST TRIPS (AGENCY / ADMIN VIEW)
 # ----------------------------------------------------
@@ -42,55 +111,29 @@ def list_trips():
     page = int(request.args.get("page", 1))
     per_page = min(int(request.args.get("per_page", 50)), 100)
 
-    pagination = (
-        Trip.query
-        .filter_by(agency_id=agency_id)
+    stmt = (
+        TRIP_ROW.select()
+        .where(Trip.agency_id == agency_id)
         .order_by(Trip.start_time.desc())
-        .paginate(page=page, per_page=per_page, error_out=False)
     )
+    items, meta = paginate(TRIP_ROW, stmt, page, per_page)
+
+    return jsonify({"items": items, "meta": meta})
 
-    return jsonify({
-        "items": [
-            {
-                "id": t.id,
-                "card_id": t.card_id,
-                "start_time": iso(t.start_time),
-                "end_time": iso(t.end_time),
-                "fare": t.fare,
-                "status": t.status.value
-            }
-            for t in pagination.items
-        ],
-        "meta": {
-            "page": page,
-            "per_page": per_page,
-            "total": pagination.total,
-            "pages": pagination.pages
-        }
-    })
 
 @agency_trips_bp.route("/<int:trip_id>", methods=["GET"])
 @agency_required()
 def get_trip(trip_id):
     agency_id = get_jwt()["agency_id"]
 
-    trip = Trip.query.filter_by(
-        id=trip_id,
-        agency_id=agency_id
-    ).first_or_404()
+    trip = TRIP_DETAIL.first(
+        TRIP_DETAIL.select()
+        .where(Trip.id == trip_id, Trip.agency_id == agency_id)
+    )
+    if trip is None:
+        abort(404)
 
-    return jsonify({
-        "id": trip.id,
-        "card_id": trip.card_id,
-        "start_time": iso(trip.start_time),
-        "end_time": iso(trip.end_time),
-        "fare": trip.fare,
-        "status": trip.status.value,
-        "start_lat": trip.start_lat,
-        "start_lng": trip.start_lng,
-        "end_lat": trip.end_lat,
-        "end_lng": trip.end_lng,
-    })
+    return jsonify(trip)
 
 
 # ----------------------------------------------------
@@ -99,6 +142,8 @@ def get_trip(trip_id):
 
 @agency_trips_bp.route("/tap-in", methods=["POST"])
 @agency_required()
+@limiter.limit("terminal_tap", key=by_terminal)
+@limiter.limit("agency_tap", key=by_agency)
 def tap_in():
     claims = get_jwt()
     agency_id = claims["agency_id"]
@@ -110,8 +155,27 @@ def tap_in():
 
     if not card_id:
         return error("invalid_request", "Missing card_id")
+    if not valid_point(lat, lng):
+        return error("invalid_request", "lat and lng must be coordinates")
+
+    if current_app.config["TAPSHARD_ENABLED"]:
+        result, failed = submit_tap(shards.Tap(
+            "in", str(card_id), datetime.utcnow(), lat, lng,
+            agency_id=agency_id,
+            terminal=request.headers.get("X-Terminal-Id"),
+            min_balance=current_app.config["TAP_MIN_BALANCE"],
+            bind=g.get("tenant_bind")
+        ), "Minimum balance not met")
+        if failed:
+            return failed
+
+        return jsonify({
+            "status": "ok",
+            "trip_id": result["trip_id"],
+            "started_at": result["started_at"]
+        }), 201
 
-    user = User.query.filter_by(card_id=card_id).first()
+    user = user_for_card(card_id)
     if not user:
         return error("card_not_found", "Invalid card", 404)
 
@@ -123,22 +187,32 @@ def tap_in():
     if active_trip:
         return error("active_trip_exists", "Trip already in progress", 409)
 
+    verdict = screen_tap(TapEvent(
+        card_id, "in", datetime.utcnow(), lat, lng,
+        agency_id=agency_id, user_id=user.id,
+        terminal=request.headers.get("X-Terminal-Id")
+    ))
+    if verdict.blocked:
+        return error("card_blocked", "Card blocked pending review", 403)
+
     # Minimum balance check (policy decision)
-    if user.balance < 5.00:
+    if user.balance < current_app.config["TAP_MIN_BALANCE"]:
         return error("insufficient_balance", "Minimum balance not met", 402)
 
     try:
-        with db.session.begin():
-            trip = Trip(
-                user_id=user.id,
-                agency_id=agency_id,
-                card_id=card_id,
-                start_time=datetime.utcnow(),
-                start_lat=lat,
-                start_lng=lng,
-                status=TripStatus.in_progress
-            )
-            db.session.add(trip)
+        trip = Trip(
+            user_id=user.id,
+            agency_id=agency_id,
+            card_id=card_id,
+            start_time=datetime.utcnow(),
+            start_lat=lat,
+            start_lng=lng,
+            status=TripStatus.in_progress
+        )
+        db.session.add(trip)
+        db.session.flush()
+        outbox.tap_in(trip, terminal=request.headers.get("X-Terminal-Id"))
+        db.session.commit()
 
         return jsonify({
             "status": "ok",
@@ -157,6 +231,8 @@ def tap_in():
 
 @agency_trips_bp.route("/tap-out", methods=["POST"])
 @agency_required()
+@limiter.limit("terminal_tap", key=by_terminal)
+@limiter.limit("agency_tap", key=by_agency)
 def tap_out():
     claims = get_jwt()
     agency_id = claims["agency_id"]
@@ -168,16 +244,36 @@ def tap_out():
 
     if not card_id:
         return error("invalid_request", "Missing card_id")
+    if not valid_point(lat, lng):
+        return error("invalid_request", "lat and lng must be coordinates")
+
+    if current_app.config["TAPSHARD_ENABLED"]:
+        result, failed = submit_tap(shards.Tap(
+            "out", str(card_id), datetime.utcnow(), lat, lng,
+            agency_id=agency_id,
+            terminal=request.headers.get("X-Terminal-Id"),
+            bind=g.get("tenant_bind")
+        ), "Not enough balance")
+        if failed:
+            return failed
+
+        return jsonify({
+            "status": "completed",
+            "trip_id": result["trip_id"],
+            "fare": result["fare"],
+            "balance": result["balance"]
+        })
 
-    user = User.query.filter_by(card_id=card_id).first()
+    user = user_for_card(card_id)
     if not user:
         return error("card_not_found", "Invalid card", 404)
 
+    # Row lock: the stale-trip sweeper skips trips being tapped out
     trip = Trip.query.filter_by(
         user_id=user.id,
         agency_id=agency_id,
         status=TripStatus.in_progress
-    ).first()
+    ).with_for_update().first()
 
     if not trip:
         return error("no_active_trip", "No active trip found", 409)
@@ -185,7 +281,16 @@ def tap_out():
     # -----------------------------
     # Fare calculation (PURE LOGIC)
     # -----------------------------
-    fare_result = FareEngine.calculate(
+    ended_at = datetime.utcnow()
+
+    # Recorded only: refusing a tap-out would strand the trip
+    screen_tap(TapEvent(
+        card_id, "out", ended_at, lat, lng,
+        agency_id=agency_id, user_id=user.id,
+        terminal=request.headers.get("X-Terminal-Id")
+    ))
+
+    base_result = FareEngine.calculate(
         FareContext(
             agency="Rea Vaya",  # Later derive from agency_id
             start_lat=trip.start_lat,
@@ -193,36 +298,48 @@ def tap_out():
             end_lat=lat,
             end_lng=lng,
             start_time=trip.start_time,
-            end_time=datetime.utcnow(),
+            end_time=ended_at,
         )
     )
 
+    # Transfer discount + daily/weekly caps from per-card rolling state
+    try:
+        fare_result, fare_state = price_with_caps(
+            card_id, agency_id, base_result, trip.start_time, ended_at
+        )
+    except FareCalculationError:
+        db.session.rollback()
+        return error("fare_state_conflict", "Please tap again", 409)
+
     fare = fare_result.amount
 
     if user.balance < fare:
+        db.session.rollback()
         return error("insufficient_balance", "Not enough balance", 402)
 
     try:
-        with db.session.begin():
-            trip.end_time = datetime.utcnow()
-            trip.end_lat = lat
-            trip.end_lng = lng
-            trip.fare = fare
-            trip.status = TripStatus.completed
-
-            user.balance -= fare
-
-            tx = Transaction(
-                user_id=user.id,
-                agency_id=agency_id,
-                amount=fare,
-                type=TransactionType.fare,
-                meta={
-                    "trip_id": trip.id,
-                    "fare_breakdown": fare_result.breakdown
-                }
-            )
-            db.session.add(tx)
+        trip.end_time = ended_at
+        trip.end_lat = lat
+        trip.end_lng = lng
+        trip.fare = fare
+        trip.status = TripStatus.completed
+
+        user.balance -= fare
+
+        tx = Transaction(
+            user_id=user.id,
+            agency_id=agency_id,
+            amount=fare,
+            type=TransactionType.fare,
+            meta={
+                "trip_id": trip.id,
+                "fare_breakdown": fare_result.breakdown
+            }
+        )
+        db.session.add(tx)
+        outbox.tap_out(trip, terminal=request.headers.get("X-Terminal-Id"))
+        db.session.commit()
+        fare_state_store.remember(fare_state)
 
         return jsonify({
             "status": "completed",
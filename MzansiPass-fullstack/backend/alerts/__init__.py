@@ -0,0 +1,20 @@
+"""
+MzansiPass Transit Alerts
+-------------------------
+
+Official incidents and crowd-sourced reports (crowded / delay /
+hazard / ...), served to riders as one cached, versioned feed.
+
+Crowd reports are clustered on (provider, category, location cell,
+time window) so a single incident reported by a thousand riders is
+stored and broadcast once, with a report_count.
+
+Public API:
+- alerts_bp
+"""
+
+from .routes import alerts_bp
+
+__all__ = [
+    "alerts_bp",
+]
@@ -0,0 +1,52 @@
+# alerts/clustering.py
+"""
+Pure helpers for folding crowd reports into incidents.
+
+No Flask / DB access here - routes.py does the persistence.
+"""
+from datetime import datetime, timedelta
+from math import floor
+
+
+def cell_key(lat, lng, cell_deg: float):
+    """
+    Snap a coordinate onto a fixed lat/lng grid.
+
+    Returns None when the report carries no location; those reports
+    cluster per provider + category only.
+    """
+    if lat is None or lng is None:
+        return None
+
+    return f"{floor(lat / cell_deg)}:{floor(lng / cell_deg)}"
+
+
+def cluster_key(provider, category: str, cell, now: datetime, window_seconds: int) -> str:
+    """
+    Unique key of the incident a report opens: provider, category,
+    cell and the dedup-window-sized time bucket it falls in.
+
+    Reports are folded by the sliding window (dedup_cutoff) first;
+    the key only makes concurrent first reports meet on one row.
+    """
+    # Naive UTC: .timestamp() would read it as the host's local time
+    bucket = floor((now - datetime(1970, 1, 1)).total_seconds() / window_seconds)
+    return f"{provider or ''}|{category}|{cell or ''}|{bucket}"
+
+
+def dedup_cutoff(now: datetime, window_seconds: int) -> datetime:
+    """
+    Oldest last_reported_at that still counts as "the same incident".
+
+    The window slides with every report, so an incident that keeps
+    being reported stays one row instead of splitting at a bucket edge.
+    """
+    return now - timedelta(seconds=window_seconds)
+
+
+def default_title(category: str, provider) -> str:
+    # Mirrors ReportIssueModal: "Delay Report on Gautrain"
+    title = f"{category.capitalize()} Report"
+    if provider:
+        title += f" on {provider}"
+    return title
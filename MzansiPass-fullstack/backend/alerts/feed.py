@@ -0,0 +1,110 @@
+# alerts/feed.py
+"""
+Versioned, in-process cache of the active-alert feed.
+
+The feed version is derived from (count, max(updated_at)) of the
+active alerts, so it changes whenever a report is folded in, an
+official alert is published or an alert expires. Clients send the
+version back as If-None-Match and get a 304 without a body.
+
+Within ALERT_FEED_CACHE_SECONDS the cached body is served without
+touching the database at all.
+"""
+import hashlib
+import json
+import time
+from datetime import datetime
+from threading import Lock
+
+from sqlalchemy import func
+
+from models import db, TransitAlert
+
+
+def iso(dt):
+    return dt.isoformat() if dt else None
+
+
+def serialize_alert(a: TransitAlert) -> dict:
+    # Shape matches the frontend TransitAlert type
+    return {
+        "id": str(a.id),
+        "type": a.type.value,
+        "provider": a.provider,
+        "category": a.category.value,
+        "title": a.title,
+        "description": a.description,
+        "timestamp": iso(a.last_reported_at),
+        "isVerified": a.is_verified,
+        "officialAction": a.official_action,
+        "reportCount": a.report_count,
+        "lat": a.lat,
+        "lng": a.lng,
+    }
+
+
+class AlertFeedCache:
+    def __init__(self):
+        self._lock = Lock()
+        self._etag = None
+        self._body = None
+        self._fresh_until = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._fresh_until = 0.0
+
+    def get(self, ttl_seconds: int):
+        """
+        Return (etag, body) for the current active feed.
+        """
+        now = time.monotonic()
+        if self._body is not None and now < self._fresh_until:
+            return self._etag, self._body
+
+        with self._lock:
+            if self._body is not None and time.monotonic() < self._fresh_until:
+                return self._etag, self._body
+
+            etag = self._current_version()
+
+            # Version unchanged: extend freshness without rebuilding
+            if etag != self._etag or self._body is None:
+                self._body = self._build_body(etag)
+                self._etag = etag
+
+            self._fresh_until = time.monotonic() + ttl_seconds
+            return self._etag, self._body
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+
+    @staticmethod
+    def _active_filter():
+        return TransitAlert.expires_at > datetime.utcnow()
+
+    def _current_version(self) -> str:
+        count, last_update = db.session.query(
+            func.count(TransitAlert.id),
+            func.max(TransitAlert.updated_at)
+        ).filter(self._active_filter()).one()
+
+        raw = f"{count}:{iso(last_update)}".encode()
+        return hashlib.sha1(raw).hexdigest()[:16]
+
+    def _build_body(self, etag: str) -> bytes:
+        alerts = (
+            TransitAlert.query
+            .filter(self._active_filter())
+            .order_by(TransitAlert.last_reported_at.desc())
+            .all()
+        )
+
+        return json.dumps({
+            "version": etag,
+            "items": [serialize_alert(a) for a in alerts]
+        }, separators=(",", ":")).encode()
+
+
+feed_cache = AlertFeedCache()
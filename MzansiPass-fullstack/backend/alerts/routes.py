@@ -0,0 +1,323 @@
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify, current_app, Response
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, TransitAlert, AlertType, ReportCategory, TransportAgency
+from agency.decorators import agency_required
+from alerts.clustering import cell_key, cluster_key, dedup_cutoff, default_title
+from alerts.feed import feed_cache, serialize_alert
+
+alerts_bp = Blueprint(
+    "alerts",
+    __name__,
+    url_prefix="/api/alerts"
+)
+
+# ----------------------------------------------------
+# Helpers
+# ----------------------------------------------------
+
+def error(code, message, status=400):
+    return jsonify({
+        "error": code,
+        "message": message
+    }), status
+
+
+def parse_category(value):
+    try:
+        return ReportCategory(value)
+    except ValueError:
+        return None
+
+
+# Longest accepted value per free-text field (the column widths;
+# description is Text, capped so a report stays a report)
+TEXT_LIMITS = {
+    "provider": 60,
+    "title": 180,
+    "description": 2000,
+    "official_action": 255,
+}
+
+
+def parse_text(data, field):
+    """
+    data[field] stripped, None when missing or blank. Raises ValueError
+    for a non-string or one longer than TEXT_LIMITS[field].
+    """
+    value = data.get(field)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    value = value.strip()
+    if len(value) > TEXT_LIMITS[field]:
+        raise ValueError(f"{field} must be at most {TEXT_LIMITS[field]} characters")
+    return value or None
+
+
+def parse_texts(data, *fields):
+    return {field: parse_text(data, field) for field in fields}
+
+
+def parse_location(data):
+    """
+    (lat, lng) from a request body, or None if either is present but
+    not a coordinate. Both missing is fine: the alert has no location.
+    """
+    lat, lng = data.get("lat"), data.get("lng")
+    if lat is None and lng is None:
+        return None, None
+
+    for value, limit in ((lat, 90), (lng, 180)):
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or abs(value) > limit:
+            return None
+    return lat, lng
+
+
+def open_incident(now, expires_at, **values):
+    """
+    Insert a crowd-report incident, or count the report into the one
+    with the same cluster_key. Returns (alert id, report_count).
+    """
+    dialect = db.session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    alerts = TransitAlert.__table__
+    stmt = insert(alerts).values(
+        type=AlertType.user_report,
+        report_count=1,
+        is_verified=False,
+        first_reported_at=now,
+        last_reported_at=now,
+        updated_at=now,
+        expires_at=expires_at,
+        **values
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[alerts.c.cluster_key],
+        set_={
+            "report_count": alerts.c.report_count + 1,
+            "last_reported_at": stmt.excluded.last_reported_at,
+            "updated_at": stmt.excluded.updated_at,
+            "expires_at": stmt.excluded.expires_at,
+        }
+    ).returning(alerts.c.id, alerts.c.report_count)
+
+    return tuple(db.session.execute(stmt).one())
+
+
+def agency_alert(alert_id, agency_id):
+    """
+    Official incidents of this agency, or crowd reports on its service.
+    """
+    alert = db.session.get(TransitAlert, alert_id)
+    if alert is None:
+        return None
+    if alert.agency_id == agency_id:
+        return alert
+
+    agency = db.session.get(TransportAgency, agency_id)
+    if alert.agency_id is None and agency is not None and alert.provider == agency.name:
+        return alert
+    return None
+
+
+# ----------------------------------------------------
+# ACTIVE FEED (RIDERS / PORTAL)
+# ----------------------------------------------------
+
+@alerts_bp.route("", methods=["GET"])
+def active_alerts():
+    etag, body = feed_cache.get(current_app.config["ALERT_FEED_CACHE_SECONDS"])
+
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype="application/json")
+
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+# ----------------------------------------------------
+# CROWD REPORTS (PASSENGERS)
+# ----------------------------------------------------
+
+@alerts_bp.route("/reports", methods=["POST"])
+@jwt_required()
+def submit_report():
+    data = request.get_json() or {}
+
+    category = parse_category(data.get("category"))
+    if not category:
+        return error("invalid_request", "Unknown report category")
+
+    try:
+        text = parse_texts(data, "provider", "title", "description")
+    except ValueError as exc:
+        return error("invalid_request", str(exc))
+    provider = text["provider"]
+
+    location = parse_location(data)
+    if location is None:
+        return error("invalid_request", "lat and lng must be valid coordinates")
+    lat, lng = location
+
+    cfg = current_app.config
+    now = datetime.utcnow()
+    cell = cell_key(lat, lng, cfg["ALERT_CELL_DEG"])
+
+    # Fold into an existing incident if one is still open
+    alert = (
+        TransitAlert.query
+        .filter(
+            TransitAlert.type == AlertType.user_report,
+            TransitAlert.provider == provider,
+            TransitAlert.category == category,
+            TransitAlert.cell == cell,
+            TransitAlert.last_reported_at >= dedup_cutoff(
+                now, cfg["ALERT_DEDUP_WINDOW_SECONDS"]
+            ),
+        )
+        .order_by(TransitAlert.last_reported_at.desc())
+        .with_for_update()
+        .first()
+    )
+
+    expires_at = now + timedelta(seconds=cfg["ALERT_TTL_SECONDS"])
+
+    if alert:
+        alert.report_count += 1
+        alert.last_reported_at = now
+        alert.expires_at = max(alert.expires_at, expires_at)
+        alert_id, report_count = alert.id, alert.report_count
+    else:
+        # Nothing to lock yet: a concurrent first report lands on the
+        # same cluster_key and is counted into this row instead
+        alert_id, report_count = open_incident(
+            provider=provider,
+            category=category,
+            cell=cell,
+            cluster_key=cluster_key(
+                provider, category.value, cell, now, cfg["ALERT_DEDUP_WINDOW_SECONDS"]
+            ),
+            lat=lat,
+            lng=lng,
+            title=text["title"] or default_title(category.value, provider),
+            description=text["description"],
+            now=now,
+            expires_at=expires_at
+        )
+
+    db.session.commit()
+    feed_cache.invalidate()
+
+    return jsonify({
+        "status": "ok",
+        "alert_id": alert_id,
+        "report_count": report_count
+    }), 201 if report_count == 1 else 200
+
+
+# ----------------------------------------------------
+# OFFICIAL INCIDENTS (AGENCY PORTAL)
+# ----------------------------------------------------
+
+@alerts_bp.route("/official", methods=["POST"])
+@agency_required(roles=["admin", "staff"])
+def publish_official():
+    agency_id = get_jwt()["agency_id"]
+    data = request.get_json() or {}
+
+    category = parse_category(data.get("category"))
+    if not category:
+        return error("invalid_request", "Unknown report category")
+
+    try:
+        text = parse_texts(data, "title", "description", "official_action")
+    except ValueError as exc:
+        return error("invalid_request", str(exc))
+    if not text["title"]:
+        return error("invalid_request", "Missing title")
+
+    location = parse_location(data)
+    if location is None:
+        return error("invalid_request", "lat and lng must be valid coordinates")
+    lat, lng = location
+
+    try:
+        ttl = int(data.get("ttl_seconds") or current_app.config["ALERT_TTL_SECONDS"])
+    except (TypeError, ValueError):
+        ttl = 0
+    if ttl <= 0:
+        return error("invalid_request", "ttl_seconds must be a positive integer")
+
+    agency = db.session.get(TransportAgency, agency_id)
+    now = datetime.utcnow()
+
+    alert = TransitAlert(
+        type=AlertType.official,
+        agency_id=agency_id,
+        provider=agency.name if agency else None,
+        category=category,
+        cell=cell_key(lat, lng, current_app.config["ALERT_CELL_DEG"]),
+        lat=lat,
+        lng=lng,
+        title=text["title"],
+        description=text["description"],
+        is_verified=True,
+        official_action=text["official_action"],
+        first_reported_at=now,
+        last_reported_at=now,
+        expires_at=now + timedelta(seconds=ttl)
+    )
+
+    db.session.add(alert)
+    db.session.commit()
+    feed_cache.invalidate()
+
+    return jsonify(serialize_alert(alert)), 201
+
+
+@alerts_bp.route("/<int:alert_id>/verify", methods=["POST"])
+@agency_required(roles=["admin", "staff"])
+def verify_report(alert_id):
+    data = request.get_json() or {}
+
+    try:
+        official_action = parse_text(data, "official_action")
+    except ValueError as exc:
+        return error("invalid_request", str(exc))
+
+    alert = agency_alert(alert_id, get_jwt()["agency_id"])
+    if alert is None:
+        return error("not_found", "Alert not found", 404)
+
+    alert.is_verified = True
+    if official_action:
+        alert.official_action = official_action
+
+    db.session.commit()
+    feed_cache.invalidate()
+
+    return jsonify(serialize_alert(alert))
+
+
+@alerts_bp.route("/<int:alert_id>/resolve", methods=["POST"])
+@agency_required(roles=["admin", "staff"])
+def resolve_alert(alert_id):
+    alert = agency_alert(alert_id, get_jwt()["agency_id"])
+    if alert is None:
+        return error("not_found", "Alert not found", 404)
+
+    alert.expires_at = datetime.utcnow()
+
+    db.session.commit()
+    feed_cache.invalidate()
+
+    return jsonify({"status": "resolved", "alert_id": alert.id})
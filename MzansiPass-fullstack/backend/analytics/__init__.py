@@ -0,0 +1,32 @@
+"""
+MzansiPass Analytics
+--------------------
+
+Pre-aggregated ridership for the provider portal (admin dashboard,
+finance portal, fleet tracker): trips and revenue per agency by day,
+hour, origin / destination station and fare band.
+
+A scheduled `flask analytics build` folds newly completed trips into
+ridership_cube; the portal slices and dices that table through
+/api/analytics/ridership and never scans trips.
+
+Public API:
+- analytics_bp
+- analytics_cli
+- build(cfg), reset(session)
+- StationResolver
+"""
+
+from .stations import StationResolver
+from .cube import build, reset, fare_band
+from .routes import analytics_bp
+from .commands import analytics_cli
+
+__all__ = [
+    "analytics_bp",
+    "analytics_cli",
+    "build",
+    "reset",
+    "fare_band",
+    "StationResolver",
+]
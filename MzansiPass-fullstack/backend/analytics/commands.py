@@ -0,0 +1,25 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from models import db
+from analytics.cube import build, reset
+
+analytics_cli = AppGroup("analytics", help="Ridership cube jobs.")
+
+
+@analytics_cli.command("build")
+@click.option("--max-batches", type=int, default=None,
+              help="Stop after this many batches (default: until caught up).")
+def build_command(max_batches):
+    """Fold new completed trips into the ridership cube."""
+    consumed = build(current_app.config, max_batches=max_batches)
+    click.echo(f"analytics: folded {consumed} fare(s)")
+
+
+@analytics_cli.command("rebuild")
+def rebuild_command():
+    """Empty the cube and rebuild it from the whole ledger."""
+    reset(db.session)
+    consumed = build(current_app.config)
+    click.echo(f"analytics: rebuilt from {consumed} fare(s)")
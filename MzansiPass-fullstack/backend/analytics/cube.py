@@ -0,0 +1,173 @@
+# analytics/cube.py
+"""
+Incremental ridership cube build.
+
+Same consumer shape as loyalty: each batch covers fare and refund
+transactions (cursor, hi], trailing the ledger by
+ANALYTICS_SETTLE_SECONDS, and is applied in one DB transaction with
+the cursor row locked:
+
+1. read the batch's fare and refund rows joined to their trips
+   (meta.trip_id; columns only)
+2. fold them into cube cells in memory
+   (agency, day, hour, origin, destination, fare band); day and hour
+   are SAST, the riders' clock and the fare caps' day
+3. upsert the cells, adding to existing counts
+4. move the cursor to hi
+
+A refund lands in its trip's cell (banded by the trip's fare) as
+negative revenue and no trips, so revenue is net of incident refunds.
+Ticket purchases and their revocation refunds carry no trip and are
+left out alike.
+
+Only completed trips are ever read, and each exactly once, so the
+cost of a build is proportional to new trips, not to history.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import (
+    db, Trip, Transaction, TransactionType, RidershipCube, ConsumerCursor
+)
+from fares.capping import SAST
+from analytics.stations import StationResolver
+
+CURSOR_NAME = "analytics"
+
+_DIMENSIONS = ("agency_id", "day", "hour", "origin", "destination", "fare_band")
+
+
+def fare_band(amount, bands) -> str:
+    """
+    bands [10, 20, 40] -> "0-10", "10-20", "20-40", "40+"
+    """
+    lower = 0
+    for upper in bands:
+        if amount < upper:
+            return f"{lower:g}-{upper:g}"
+        lower = upper
+    return f"{lower:g}+"
+
+
+def _lock_cursor(session):
+    cursor = session.get(ConsumerCursor, CURSOR_NAME, with_for_update=True)
+    if cursor is None:
+        cursor = ConsumerCursor(name=CURSOR_NAME, position=0)
+        session.add(cursor)
+        session.flush()
+    return cursor
+
+
+def _upsert(session, cells):
+    dialect = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    # One compiled statement, executemany over the cells
+    cube = RidershipCube.__table__
+    stmt = insert(cube)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(_DIMENSIONS),
+        set_={
+            "trips": cube.c.trips + stmt.excluded.trips,
+            "revenue": cube.c.revenue + stmt.excluded.revenue,
+        }
+    )
+    session.execute(stmt, [
+        dict(zip(_DIMENSIONS, key), trips=trips, revenue=revenue)
+        for key, (trips, revenue) in cells.items()
+    ])
+
+
+def run_batch(session, cfg, stations, now: datetime | None = None) -> int:
+    """
+    Fold one batch into the cube. Returns the number of ledger rows consumed.
+    """
+    now = now or datetime.utcnow()
+    cursor = _lock_cursor(session)
+
+    rows = session.execute(
+        select(
+            Transaction.id,
+            Transaction.agency_id,
+            Transaction.type,
+            Transaction.amount,
+            Trip.fare,
+            Trip.start_time,
+            Trip.start_lat,
+            Trip.start_lng,
+            Trip.end_lat,
+            Trip.end_lng,
+        )
+        .join(Trip, Trip.id == Transaction.meta["trip_id"].as_integer())
+        .where(
+            Transaction.id > cursor.position,
+            Transaction.type.in_([TransactionType.fare, TransactionType.refund]),
+            Transaction.agency_id.isnot(None),
+            Transaction.created_at <= now - timedelta(seconds=cfg["ANALYTICS_SETTLE_SECONDS"])
+        )
+        .order_by(Transaction.id)
+        .limit(cfg["ANALYTICS_BATCH_SIZE"])
+    ).all()
+
+    if not rows:
+        session.rollback()
+        return 0
+
+    bands = cfg["ANALYTICS_FARE_BANDS"]
+    cells = defaultdict(lambda: [0, 0.0])
+
+    for _, agency_id, type_, amount, trip_fare, started, s_lat, s_lng, e_lat, e_lng in rows:
+        refund = type_ == TransactionType.refund
+        local = started + SAST
+        cell = cells[(
+            agency_id,
+            local.date(),
+            local.hour,
+            stations.resolve(s_lat, s_lng),
+            stations.resolve(e_lat, e_lng),
+            fare_band((trip_fare or amount) if refund else amount, bands),
+        )]
+        if refund:
+            cell[1] -= amount
+        else:
+            cell[0] += 1
+            cell[1] += amount
+
+    _upsert(session, cells)
+
+    cursor.position = rows[-1].id
+    session.commit()
+    return len(rows)
+
+
+def build(cfg, max_batches: int | None = None, now: datetime | None = None) -> int:
+    """
+    Run batches until the cursor catches up (or max_batches).
+    Returns the total number of ledger rows consumed.
+    """
+    stations = StationResolver.from_config(cfg)
+    total = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        consumed = run_batch(db.session, cfg, stations, now=now)
+        if not consumed:
+            break
+        total += consumed
+        batches += 1
+
+    return total
+
+
+def reset(session):
+    """
+    Empty the cube and rewind the cursor (e.g. after changing bands
+    or the station feed); the next build recomputes from the ledger.
+    """
+    session.execute(delete(RidershipCube))
+    cursor = session.get(ConsumerCursor, CURSOR_NAME)
+    if cursor is not None:
+        cursor.position = 0
+    session.commit()
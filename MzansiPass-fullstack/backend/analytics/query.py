@@ -0,0 +1,126 @@
+# analytics/query.py
+"""
+Slice / dice over ridership_cube.
+
+    group_by  any of day, hour, origin, destination, route, fare_band
+              (route = origin + destination)
+    filters   from / to (days, inclusive), hour, origin, destination,
+              fare_band
+
+The cube is indexed by its grain (agency first), so a query reads a
+few thousand pre-aggregated rows at most. Results are cached per
+process and keyed by the analytics cursor, so they are reused until
+the next build lands.
+"""
+from collections import OrderedDict
+from datetime import date
+from threading import Lock
+
+from sqlalchemy import select, func
+
+from models import db, RidershipCube, ConsumerCursor
+from analytics.cube import CURSOR_NAME
+
+GROUPS = {
+    "day": (RidershipCube.day,),
+    "hour": (RidershipCube.hour,),
+    "origin": (RidershipCube.origin,),
+    "destination": (RidershipCube.destination,),
+    "route": (RidershipCube.origin, RidershipCube.destination),
+    "fare_band": (RidershipCube.fare_band,),
+}
+
+FILTERS = ("hour", "origin", "destination", "fare_band")
+
+
+class BadQuery(ValueError):
+    pass
+
+
+def parse_query(args) -> dict:
+    group_by = tuple(g for g in (args.get("group_by") or "").split(",") if g)
+    unknown = [g for g in group_by if g not in GROUPS]
+    if unknown:
+        raise BadQuery(f"Unknown group_by: {', '.join(unknown)}")
+
+    try:
+        start = date.fromisoformat(args["from"]) if args.get("from") else None
+        end = date.fromisoformat(args["to"]) if args.get("to") else None
+        hour = int(args["hour"]) if args.get("hour") else None
+    except ValueError as exc:
+        raise BadQuery(str(exc)) from exc
+
+    return {
+        "group_by": group_by,
+        "from": start,
+        "to": end,
+        "hour": hour,
+        "origin": args.get("origin"),
+        "destination": args.get("destination"),
+        "fare_band": args.get("fare_band"),
+    }
+
+
+def run_query(agency_id, q) -> list[dict]:
+    columns, names = [], []
+    for g in q["group_by"]:
+        for col in GROUPS[g]:
+            if col.key not in names:
+                columns.append(col)
+                names.append(col.key)
+
+    stmt = (
+        select(
+            *columns,
+            func.sum(RidershipCube.trips).label("trips"),
+            func.sum(RidershipCube.revenue).label("revenue"),
+        )
+        .where(RidershipCube.agency_id == agency_id)
+        .group_by(*columns)
+        .order_by(*columns)
+    )
+
+    if q["from"]:
+        stmt = stmt.where(RidershipCube.day >= q["from"])
+    if q["to"]:
+        stmt = stmt.where(RidershipCube.day <= q["to"])
+    for f in FILTERS:
+        if q[f] is not None:
+            stmt = stmt.where(getattr(RidershipCube, f) == q[f])
+
+    return [
+        {
+            **dict(zip(names, row[:len(names)])),
+            "trips": int(row.trips or 0),
+            "revenue": round(row.revenue or 0.0, 2),
+        }
+        for row in db.session.execute(stmt)
+    ]
+
+
+def cube_version() -> int:
+    cursor = db.session.get(ConsumerCursor, CURSOR_NAME)
+    return cursor.position if cursor else 0
+
+
+class QueryCache:
+    def __init__(self):
+        self._lock = Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, limit):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > limit:
+                self._entries.popitem(last=False)
+
+
+query_cache = QueryCache()
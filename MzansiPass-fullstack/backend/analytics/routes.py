@@ -0,0 +1,55 @@
+import hashlib
+
+from flask import Blueprint, request, jsonify, current_app, Response
+from flask_jwt_extended import get_jwt
+
+from agency.decorators import agency_required
+from analytics.query import parse_query, run_query, cube_version, query_cache, BadQuery
+
+analytics_bp = Blueprint(
+    "analytics",
+    __name__,
+    url_prefix="/api/analytics"
+)
+
+# ----------------------------------------------------
+# Helpers
+# ----------------------------------------------------
+
+def error(code, message, status=400):
+    return jsonify({
+        "error": code,
+        "message": message
+    }), status
+
+
+# ----------------------------------------------------
+# RIDERSHIP (PROVIDER PORTAL)
+# ----------------------------------------------------
+
+@analytics_bp.route("/ridership", methods=["GET"])
+@agency_required(roles=["admin", "staff", "finance"])
+def ridership():
+    agency_id = get_jwt()["agency_id"]
+
+    try:
+        q = parse_query(request.args)
+    except BadQuery as exc:
+        return error("invalid_request", str(exc))
+
+    version = cube_version()
+    key = (agency_id, version, tuple(sorted((k, str(v)) for k, v in q.items())))
+    etag = f"cube-{version}-" + hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        rows = query_cache.get(key)
+        if rows is None:
+            rows = run_query(agency_id, q)
+            query_cache.put(key, rows, current_app.config["ANALYTICS_QUERY_CACHE_SIZE"])
+        resp = jsonify({"version": version, "group_by": list(q["group_by"]), "rows": rows})
+
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
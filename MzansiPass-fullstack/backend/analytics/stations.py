@@ -0,0 +1,69 @@
+# analytics/stations.py
+"""
+Tap coordinates -> station label.
+
+With a GTFS feed loaded (PLANNER_GTFS_DIR) a tap is assigned to the
+nearest stop within ANALYTICS_STATION_RADIUS_M; otherwise, or when no
+stop is close enough, to a grid cell ("cell:<lat>:<lng>", the same
+grid as alert clustering). Coordinates missing -> "unknown".
+"""
+from collections import defaultdict
+from math import cos, radians
+
+from alerts.clustering import cell_key
+from fares.engine import FareEngine
+from planner.gtfs import get_graph, FeedError
+
+UNKNOWN = "unknown"
+
+
+class StationResolver:
+    def __init__(self, graph=None, radius_m=500.0, cell_deg=0.01):
+        self.radius_m = radius_m
+        self.cell_deg = cell_deg
+        self.graph = graph
+
+        # Stops bucketed on a radius-sized grid: lookups scan 9 cells.
+        # A degree of longitude shrinks by cos(lat): size the longitude
+        # cell for the feed's most poleward stop, so a cell is at least
+        # radius_m wide everywhere in it.
+        self._cell = radius_m / 111_000
+        self._lng_cell = self._cell
+        self._grid = defaultdict(list)
+        if graph is not None:
+            if graph.stop_count:
+                max_lat = max(abs(lat) for lat in graph.stop_lat)
+                self._lng_cell = self._cell / max(cos(radians(max_lat)), 0.01)
+            for i in range(graph.stop_count):
+                self._grid[self._key(graph.stop_lat[i], graph.stop_lng[i])].append(i)
+
+    @classmethod
+    def from_config(cls, cfg):
+        try:
+            graph = get_graph(cfg["PLANNER_GTFS_DIR"], walk_radius_m=cfg["PLANNER_WALK_RADIUS_M"])
+        except (FileNotFoundError, FeedError):
+            graph = None
+        return cls(graph, cfg["ANALYTICS_STATION_RADIUS_M"], cfg["ANALYTICS_CELL_DEG"])
+
+    def _key(self, lat, lng):
+        return int(lat // self._cell), int(lng // self._lng_cell)
+
+    def resolve(self, lat, lng) -> str:
+        if lat is None or lng is None:
+            return UNKNOWN
+
+        if self._grid:
+            cx, cy = self._key(lat, lng)
+            best, best_m = None, self.radius_m
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for i in self._grid.get((cx + dx, cy + dy), ()):
+                        m = FareEngine._distance_km(
+                            lat, lng, self.graph.stop_lat[i], self.graph.stop_lng[i]
+                        ) * 1000
+                        if m <= best_m:
+                            best, best_m = i, m
+            if best is not None:
+                return self.graph.stop_ids[best]
+
+        return "cell:" + cell_key(lat, lng, self.cell_deg)
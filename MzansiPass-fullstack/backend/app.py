@@ -1,12 +1,12 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import os
 import uuid
 import math
-import requests
 from datetime import datetime
 
 from flask import Flask, request, jsonify, abort
-from flask_cors import CORS
-from flask_migrate import Migrate
 from flask_jwt_extended import (
     JWTManager,
     create_access_token,
@@ -15,37 +15,217 @@ from flask_jwt_extended import (
 )
 
 from config import Config
+from fares.engine import FareResult
+from fares.exceptions import FareCalculationError
+from fare_state import store as fare_state_store, price_with_caps
+from ratelimit import limiter, by_ip, by_user
+from serialization import FastJSONProvider, Shape
+from fraud import TapEvent, screen_tap, flag_buffer, valid_point
+import outbox
+import shards
 from models import (
     db, bcrypt,
-    User, Card, Trip, Transaction,
+    User, Card, Trip, Transaction, TransportAgency,
     UserRole, TripStatus, TransactionType
 )
 
-# Agency / Provider apps
-from auth.agency_auth import agency_auth_bp
-from agency.dashboard import dashboard_bp
-from agency.trips import agency_trips_bp
+# NOTE: keep module-level imports light. Blueprints, CLI-only
+# extensions (Flask-Migrate pulls in alembic) and `requests` are
+# imported where they are used, so worker start-up stays well under
+# Config.STARTUP_BUDGET_MS. Measure with `python bench/startup.py`.
+
+
+def register_blueprints(app):
+    from agency import register_agency_blueprints
+    from alerts import alerts_bp
+    from planner import planner_bp
+    from tickets import tickets_bp
+    from loyalty import loyalty_bp
+    from assistant import assistant_bp
+    from fraud import fraud_bp
+    from terminals import terminals_bp
+    from analytics import analytics_bp
+    from refunds import refunds_bp
+    from profiling import profiling_bp
+    from provisioning import provisioning_bp
+
+    # Provider / agency apps
+    register_agency_blueprints(app)
+
+    # Rider-facing services
+    app.register_blueprint(alerts_bp)
+    app.register_blueprint(planner_bp)
+    app.register_blueprint(tickets_bp)
+    app.register_blueprint(loyalty_bp)
+    app.register_blueprint(assistant_bp)
+
+    # Operations
+    app.register_blueprint(fraud_bp)
+    app.register_blueprint(terminals_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(refunds_bp)
+    app.register_blueprint(profiling_bp)
+    app.register_blueprint(provisioning_bp)
+
+
+def register_cli(app):
+    from flask_migrate import Migrate
+    from loyalty import loyalty_cli
+    from sweeper import trips_cli
+    from tenancy import tenants_cli
+    from terminals import terminals_cli
+    from analytics import analytics_cli
+    from provisioning import cards_cli
+    from refunds import refunds_cli
+
+    Migrate(app, db)
+
+    # Background jobs (flask <group> <command>)
+    app.cli.add_command(loyalty_cli)
+    app.cli.add_command(trips_cli)
+    app.cli.add_command(tenants_cli)
+    app.cli.add_command(terminals_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(cards_cli)
+    app.cli.add_command(refunds_cli)
+    app.cli.add_command(outbox.outbox_cli)
+    app.cli.add_command(shards.shards_cli)
+
+
+# Column-only read for GET /cards (see serialization/)
+CARD_ROW = Shape(
+    id=Card.id,
+    card_id=Card.card_id,
+    label=Card.label,
+    color=Card.color,
+    linked=Card.linked,
+)
+
 
+# -----------------------------
+# Fare engine (isolated logic)
+# -----------------------------
+# Module level so bench/fares.py can benchmark and property-test it
+# alongside the fares package.
+def calculate_fare(a, b, c, d):
+    if None in (a, b, c, d):
+        return 10.00
+
+    R = 6371
+    lat1, lon1, lat2, lon2 = map(math.radians, [a, b, c, d])
+    dlat, dlon = lat2 - lat1, lon2 - lon1
+    x = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    dist = 2 * R * math.atan2(math.sqrt(x), math.sqrt(1-x))
+
+    return round(max(6.0, 6.0 + (0.5 * dist)), 2)
+
+
+# -----------------------------
+# Tap shards (TAPSHARD_ENABLED)
+# -----------------------------
+# Refusal code from the owning shard -> this route's status / message
+TAP_IN_REFUSALS = {
+    "card_not_found": (404, "Invalid card"),
+    "active_trip_exists": (409, "Trip already in progress"),
+    "card_blocked": (403, "Card blocked pending review"),
+}
+
+TAP_OUT_REFUSALS = {
+    "card_not_found": (404, "No active trip"),
+    "no_active_trip": (404, "No active trip"),
+    "insufficient_balance": (402, "Insufficient balance"),
+}
+
+
+def tap_point(data):
+    """
+    (lat, lng) from a tap body, checked before the fraud window or a
+    shard sees it: a garbled value would fail every later tap on the
+    card, or every tap in the shard's batch.
+    """
+    lat, lng = data.get("lat"), data.get("lng")
+    if not valid_point(lat, lng):
+        abort(400, "lat and lng must be coordinates")
+    return lat, lng
+
+
+def tap_agency(data):
+    """
+    agency_id from a rider tap-in body: an existing agency's id. It
+    goes into the trip, the fraud flags and the shard batch, where a
+    bad value fails the insert.
+    """
+    agency_id = data.get("agency_id")
+    if agency_id is None:
+        abort(400, "Missing agency_id")
+    if (
+        not isinstance(agency_id, int) or isinstance(agency_id, bool)
+        or db.session.get(TransportAgency, agency_id) is None
+    ):
+        abort(400, "Unknown agency_id")
+    return agency_id
+
+
+def sharded_tap(tap, refusals):
+    try:
+        result = shards.submit(tap)
+    except shards.ShardUnavailable:
+        abort(503, "Tap service unavailable, please tap again")
+
+    if "error" in result:
+        status, message = refusals.get(result["error"], (409, "Please tap again"))
+        abort(status, message)
+    return result
 
 
 # =========================================================
 # APPLICATION FACTORY
 # =========================================================
-def create_app():
+def create_app(serving=False):
+    """
+    serving=True (wsgi.py) skips CLI-only setup: migrations and
+    background-job command groups.
+    """
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.json = FastJSONProvider(app)
+
+    if app.config["PROXY_FIX_X_FOR"] or app.config["PROXY_FIX_X_PROTO"]:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app,
+            x_for=app.config["PROXY_FIX_X_FOR"],
+            x_proto=app.config["PROXY_FIX_X_PROTO"]
+        )
+
+    if not app.config["TICKET_SIGNING_KEY"]:
+        raise RuntimeError("TICKET_SIGNING_KEY is not set")
+    if app.config["TICKET_SIGNING_KEY"] == app.config["SECRET_KEY"]:
+        raise RuntimeError("TICKET_SIGNING_KEY must differ from SECRET_KEY")
 
-    # Core extensions
+    from sweeper.engine import POLICIES
+    if app.config["STALE_TRIP_POLICY"] not in POLICIES:
+        raise RuntimeError(f"STALE_TRIP_POLICY must be one of {', '.join(POLICIES)}")
+
+    # Core extensions (tenant binds must exist before engines are built)
+    from tenancy import configure_tenants
+    configure_tenants(app)
     db.init_app(app)
     bcrypt.init_app(app)
-    Migrate(app, db)
     JWTManager(app)
+    limiter.init_app(app)
+
+    from profiling import profiler
+    profiler.init_app(app)
+    flag_buffer.init_app(app)
+
+    from flask_cors import CORS
     CORS(app)
 
-    # Register provider / agency apps
-    app.register_blueprint(agency_auth_bp, url_prefix="/agency")
-    app.register_blueprint(dashboard_bp, url_prefix="/agency")
-    app.register_blueprint(agency_trips_bp, url_prefix="/agency")
+    register_blueprints(app)
+
+    if not serving:
+        register_cli(app)
 
     # =====================================================
     # HEALTH / META
@@ -86,6 +266,7 @@ def create_app():
         return jsonify({"msg": "account_created"}), 201
 
     @app.route("/auth/login", methods=["POST"])
+    @limiter.limit("login", key=by_ip)
     def login():
         data = request.get_json() or {}
         user = User.query.filter_by(email=data.get("email")).first()
@@ -115,15 +296,10 @@ def create_app():
     @jwt_required()
     def list_cards():
         user_id = get_jwt_identity()["id"]
-        cards = Card.query.filter_by(user_id=user_id).all()
 
-        return jsonify([{
-            "id": c.id,
-            "card_id": c.card_id,
-            "label": c.label,
-            "color": c.color,
-            "linked": c.linked
-        } for c in cards])
+        return jsonify(CARD_ROW.all(
+            CARD_ROW.select().where(Card.user_id == user_id)
+        ))
 
     @app.route("/cards", methods=["POST"])
     @jwt_required()
@@ -152,10 +328,26 @@ def create_app():
     # =====================================================
     @app.route("/nfc/tap-in", methods=["POST"])
     @jwt_required()
+    @limiter.limit("tap", key=by_user)
     def tap_in():
         user_id = get_jwt_identity()["id"]
         data = request.get_json() or {}
 
+        if not data.get("card_id"):
+            abort(404, "Invalid card")
+        lat, lng = tap_point(data)
+        agency_id = tap_agency(data)
+
+        if app.config["TAPSHARD_ENABLED"]:
+            result = sharded_tap(shards.Tap(
+                "in", str(data["card_id"]), datetime.utcnow(), lat, lng,
+                agency_id=agency_id, owner=user_id, pricing="distance"
+            ), TAP_IN_REFUSALS)
+            return jsonify({
+                "msg": "tap_in_success",
+                "trip_id": result["trip_id"]
+            })
+
         card = Card.query.filter_by(
             card_id=data.get("card_id"),
             user_id=user_id
@@ -174,15 +366,24 @@ def create_app():
         if active:
             abort(409, "Trip already in progress")
 
+        verdict = screen_tap(TapEvent(
+            card.card_id, "in", datetime.utcnow(), lat, lng,
+            agency_id=agency_id, user_id=user_id
+        ))
+        if verdict.blocked:
+            abort(403, "Card blocked pending review")
+
         trip = Trip(
             user_id=user_id,
-            agency_id=data.get("agency_id"),
+            agency_id=agency_id,
             card_id=card.card_id,
-            start_lat=data.get("lat"),
-            start_lng=data.get("lng")
+            start_lat=lat,
+            start_lng=lng
         )
 
         db.session.add(trip)
+        db.session.flush()
+        outbox.tap_in(trip)
         db.session.commit()
 
         return jsonify({
@@ -190,26 +391,28 @@ def create_app():
             "trip_id": trip.id
         })
 
-    # -----------------------------
-    # Fare engine (isolated logic)
-    # -----------------------------
-    def calculate_fare(a, b, c, d):
-        if None in (a, b, c, d):
-            return 10.00
-
-        R = 6371
-        lat1, lon1, lat2, lon2 = map(math.radians, [a, b, c, d])
-        dlat, dlon = lat2 - lat1, lon2 - lon1
-        x = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        dist = 2 * R * math.atan2(math.sqrt(x), math.sqrt(1-x))
-
-        return round(max(6.0, 6.0 + (0.5 * dist)), 2)
-
     @app.route("/nfc/tap-out", methods=["POST"])
     @jwt_required()
+    @limiter.limit("tap", key=by_user)
     def tap_out():
         user_id = get_jwt_identity()["id"]
         data = request.get_json() or {}
+        lat, lng = tap_point(data)
+
+        if app.config["TAPSHARD_ENABLED"]:
+            if not data.get("card_id"):
+                abort(404, "No active trip")
+
+            result = sharded_tap(shards.Tap(
+                "out", str(data["card_id"]), datetime.utcnow(), lat, lng,
+                owner=user_id, pricing="distance",
+                reference=f"fare_{uuid.uuid4().hex}"
+            ), TAP_OUT_REFUSALS)
+            return jsonify({
+                "msg": "trip_completed",
+                "fare": result["fare"],
+                "balance": result["balance"]
+            })
 
         trip = Trip.query.filter_by(
             user_id=user_id,
@@ -221,19 +424,38 @@ def create_app():
             abort(404, "No active trip")
 
         user = User.query.get(user_id)
+        ended_at = datetime.utcnow()
+
+        # Recorded only: refusing a tap-out would strand the trip
+        screen_tap(TapEvent(
+            trip.card_id, "out", ended_at, lat, lng,
+            agency_id=trip.agency_id, user_id=user_id
+        ))
 
-        fare = calculate_fare(
-            trip.start_lat, trip.start_lng,
-            data.get("lat"), data.get("lng")
+        base_fare = calculate_fare(
+            trip.start_lat, trip.start_lng, lat, lng
         )
 
+        # Transfer discount + daily/weekly caps
+        try:
+            fare_result, fare_state = price_with_caps(
+                trip.card_id, trip.agency_id, FareResult(amount=base_fare),
+                trip.start_time, ended_at
+            )
+        except FareCalculationError:
+            db.session.rollback()
+            abort(409, "Please tap again")
+
+        fare = fare_result.amount
+
         if user.balance < fare:
+            db.session.rollback()
             abort(402, "Insufficient balance")
 
         # Close trip
-        trip.end_time = datetime.utcnow()
-        trip.end_lat = data.get("lat")
-        trip.end_lng = data.get("lng")
+        trip.end_time = ended_at
+        trip.end_lat = lat
+        trip.end_lng = lng
         trip.fare = fare
         trip.status = TripStatus.completed
 
@@ -250,12 +472,15 @@ def create_app():
             meta={
                 "trip_id": trip.id,
                 "start": [trip.start_lat, trip.start_lng],
-                "end": [trip.end_lat, trip.end_lng]
+                "end": [trip.end_lat, trip.end_lng],
+                "fare_breakdown": fare_result.breakdown
             }
         )
 
         db.session.add(tx)
+        outbox.tap_out(trip)
         db.session.commit()
+        fare_state_store.remember(fare_state)
 
         return jsonify({
             "msg": "trip_completed",
@@ -277,6 +502,8 @@ def create_app():
 
         reference = f"ps_{uuid.uuid4().hex}"
 
+        import requests
+
         headers = {
             "Authorization": f"Bearer {app.config['PAYSTACK_SECRET_KEY']}"
         }
@@ -308,12 +535,15 @@ def create_app():
         return jsonify(data)
 
     @app.route("/payment/verify/<reference>", methods=["GET"])
+    @limiter.limit("payment_verify", key=by_ip)
     def verify_payment(reference):
         tx = Transaction.query.filter_by(reference=reference).first_or_404()
 
         if tx.meta.get("status") == "success":
             return jsonify({"msg": "already_verified"})
 
+        import requests
+
         headers = {
             "Authorization": f"Bearer {app.config['PAYSTACK_SECRET_KEY']}"
         }
@@ -331,22 +561,33 @@ def create_app():
             amount = data["amount"] / 100
 
             user.balance += amount
-            tx.meta.update({
+            # Reassign: in-place mutation of a JSON column is not tracked
+            tx.meta = {
+                **(tx.meta or {}),
                 "status": "success",
                 "paystack": data
-            })
+            }
+            outbox.payment_verified(tx, amount)
 
             db.session.commit()
 
         return jsonify({"status": data["status"]})
 
+    # Module imports + factory; the factory runs once per process
+    app.config["STARTUP_MS"] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
+    if app.config["STARTUP_MS"] > app.config["STARTUP_BUDGET_MS"]:
+        app.logger.warning(
+            "create_app took %.1f ms (budget %d ms)",
+            app.config["STARTUP_MS"], app.config["STARTUP_BUDGET_MS"]
+        )
+
     return app
 
 
 # =========================================================
 # ENTRY POINT
 # =========================================================
-app = create_app()
-
+# No module-level app: `flask` finds create_app() itself and wsgi.py
+# builds the serving app, so the factory only ever runs once.
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), debug=True)
+    create_app().run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)), debug=True)
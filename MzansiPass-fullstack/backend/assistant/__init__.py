@@ -0,0 +1,38 @@
+"""
+MzansiPass AI Assistant Proxy
+-----------------------------
+
+Backend proxy for the Gemini calls both frontends used to make from
+services/geminiService.ts (planTripWithAI, getLiveJourneyUpdate).
+
+    POST /api/ai/plan             {"query", "provider"?} -> RouteOption[]
+    POST /api/ai/journey-update   {"trip", "alert"}      -> LiveJourneyUpdate
+
+Send Accept: text/event-stream (or ?stream=1) to receive partial text
+as SSE "chunk" events followed by a "result" event.
+
+- prompts.py  normalises requests to route / time band / provider keys
+- cache.py    TTL / LRU cache; identical concurrent requests share one
+              model call and its stream
+- client.py   Gemini REST streaming client
+- stub.py     local stub model server (python -m assistant.stub)
+
+Public API:
+- assistant_bp
+- response_cache
+- plan_prompt, live_prompt
+- ModelError
+"""
+
+from .client import ModelError
+from .cache import response_cache
+from .prompts import plan_prompt, live_prompt
+from .routes import assistant_bp
+
+__all__ = [
+    "assistant_bp",
+    "response_cache",
+    "plan_prompt",
+    "live_prompt",
+    "ModelError",
+]
@@ -0,0 +1,129 @@
+# assistant/cache.py
+"""
+TTL / LRU response cache with request coalescing.
+
+A miss starts ONE model call in a background thread (a "flight");
+the request that missed and every identical request arriving while it
+runs all follow that flight, each receiving the parts streamed so far
+and then the rest as they arrive. The finished response is cached for
+its TTL. Failed flights are not cached.
+
+Per process, like the ratelimit memory backend.
+"""
+from collections import OrderedDict, Counter
+from threading import Condition, Lock, Thread
+from time import monotonic
+
+from assistant.client import ModelError
+
+
+class _Flight:
+    def __init__(self):
+        self._cond = Condition()
+        self.parts = []
+        self.done = False
+        self.error = None
+
+    def feed(self, part):
+        with self._cond:
+            self.parts.append(part)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+    def follow(self, timeout):
+        """
+        Every part, from the first, as it becomes available.
+        """
+        seen = 0
+        while True:
+            with self._cond:
+                if not self._cond.wait_for(lambda: len(self.parts) > seen or self.done, timeout):
+                    raise ModelError("model timed out")
+                new = self.parts[seen:]
+                done, error = self.done, self.error
+
+            yield from new
+            seen += len(new)
+
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+
+class ResponseCache:
+    def __init__(self):
+        self._lock = Lock()
+        self._entries = OrderedDict()     # key -> (expires, parts)
+        self._flights = {}
+        self.stats = Counter()
+
+    def stream(self, key, produce, ttl, max_entries, timeout):
+        """
+        -> ("hit" | "miss" | "coalesced", iterator of parts)
+
+        produce() is only called on a miss, in a background thread.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats["hit"] += 1
+                    return "hit", iter(entry[1])
+                del self._entries[key]
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.stats["coalesced"] += 1
+                return "coalesced", flight.follow(timeout)
+
+            flight = self._flights[key] = _Flight()
+            self.stats["miss"] += 1
+
+        Thread(
+            target=self._fly, args=(key, flight, produce, ttl, max_entries),
+            name="assistant-flight", daemon=True
+        ).start()
+        return "miss", flight.follow(timeout)
+
+    def _fly(self, key, flight, produce, ttl, max_entries):
+        try:
+            for part in produce():
+                flight.feed(part)
+        except Exception as exc:
+            with self._lock:
+                self._flights.pop(key, None)
+            self.stats["error"] += 1
+            flight.finish(exc if isinstance(exc, ModelError) else ModelError(str(exc)))
+            return
+
+        with self._lock:
+            # Cached before the flight goes, so no request sees neither
+            self._entries[key] = (monotonic() + ttl, tuple(flight.parts))
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+            self._flights.pop(key, None)
+        flight.finish()
+
+    def discard(self, key):
+        """Drop a response that turned out to be unusable."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.stats.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+response_cache = ResponseCache()
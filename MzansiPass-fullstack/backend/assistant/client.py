@@ -0,0 +1,72 @@
+# assistant/client.py
+"""
+Minimal Gemini REST client (streamGenerateContent over SSE).
+
+Yields response parts ({"text": ...} or {"functionCall": ...}) as
+they arrive. AI_BASE_URL can point at the local stub (stub.py).
+"""
+import json
+from dataclasses import dataclass
+
+
+class ModelError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class ModelSettings:
+    base_url: str
+    api_key: str
+    model: str
+    timeout: float
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(
+            base_url=cfg["AI_BASE_URL"].rstrip("/"),
+            api_key=cfg["AI_API_KEY"],
+            model=cfg["AI_MODEL"],
+            timeout=cfg["AI_TIMEOUT_SECONDS"],
+        )
+
+
+def stream_parts(settings: ModelSettings, prompt: str, schema=None, tools=None):
+    import requests
+
+    body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+    if schema is not None:
+        body["generationConfig"] = {
+            "responseMimeType": "application/json",
+            "responseSchema": schema,
+        }
+    if tools:
+        body["tools"] = [{"functionDeclarations": tools}]
+
+    try:
+        resp = requests.post(
+            f"{settings.base_url}/v1beta/models/{settings.model}:streamGenerateContent",
+            params={"alt": "sse"},
+            headers={"x-goog-api-key": settings.api_key},
+            json=body,
+            stream=True,
+            timeout=settings.timeout
+        )
+    except requests.RequestException as exc:
+        raise ModelError(f"model unreachable ({type(exc).__name__})") from exc
+
+    with resp:
+        if resp.status_code != 200:
+            raise ModelError(f"model returned {resp.status_code}")
+
+        resp.encoding = "utf-8"
+        try:
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                event = json.loads(line[5:])
+                for candidate in event.get("candidates", ())[:1]:
+                    for part in candidate.get("content", {}).get("parts", ()):
+                        if "text" in part or "functionCall" in part:
+                            yield part
+        except (requests.RequestException, ValueError) as exc:
+            raise ModelError(f"model stream broken ({type(exc).__name__})") from exc
@@ -0,0 +1,194 @@
+# assistant/prompts.py
+"""
+Prompt normalisation.
+
+Riders ask the same question many ways ("Park Station to Sandton at
+7am", "from park station to sandton, 07:15"). Each request is reduced
+to canonical fields - origin, destination, time band, day type,
+provider - and both the cache key and the prompt are built from those
+fields only, so every request sharing a key sends the model the same
+prompt and may share its answer.
+
+Text that does not parse as "<origin> to <destination>" falls back
+to its normalised form (key and prompt alike).
+"""
+import hashlib
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+PROVIDERS = (
+    "Rea Vaya", "Metrobus", "Gautrain", "MyCiTi",
+    "Areyeng", "Tshwane Bus Service", "PRASA",
+)
+_PROVIDERS = {p.lower(): p for p in PROVIDERS}
+
+# (name, first hour, end hour, description)
+TIME_BANDS = (
+    ("early", 0, 6, "early morning, before 06:00"),
+    ("am_peak", 6, 9, "morning peak, 06:00-09:00"),
+    ("midday", 9, 15, "midday, 09:00-15:00"),
+    ("pm_peak", 15, 19, "afternoon peak, 15:00-19:00"),
+    ("evening", 19, 24, "evening, after 19:00"),
+)
+_BAND_TEXT = {name: text for name, _, _, text in TIME_BANDS}
+
+# Riders are all on SAST (UTC+2, no DST)
+SAST = timedelta(hours=2)
+
+_WEEKEND = ("saturday", "sunday", "weekend")
+
+_NOISE = re.compile(r"[^a-z0-9:]+")
+_LEADING = re.compile(
+    r"^(?:please |how do i (?:get|go) |i (?:want|need) to (?:get|go|travel) |"
+    r"take me |directions |route |get me |travel )+"
+)
+_ROUTE = re.compile(
+    r"^(?:from )?(?P<origin>.+?) to (?P<destination>.+?)"
+    r"(?: (?P<when>(?:at|around|by|before|after|leaving|departing|on|this|tomorrow|today|tonight|now)\b.*"
+    r"|\d{1,2}(?:[:h]\d{2})?(?: ?[ap]m)?))?$"
+)
+_VIA = re.compile(r" (?:by|using|via|on|with) (?P<provider>" + "|".join(
+    re.escape(p) for p in sorted(_PROVIDERS, key=len, reverse=True)
+) + r")\b")
+_CLOCK = re.compile(r"\b(?P<h>\d{1,2})(?:[:h](?P<m>\d{2}))?\s*(?P<ampm>am|pm)?\b")
+
+PLAN_PROMPT = (
+    "You are a trip planner for major South African cities. You have access to the "
+    "full, up-to-the-minute schedules for all listed services. Your ONLY available "
+    "transport options are Rea Vaya, Metrobus, Gautrain, MyCiTi, Areyeng, Tshwane Bus "
+    "Service, and PRASA. Do NOT include any minibus taxis, e-hailing services (like Uber "
+    "or Bolt), or private vehicles in your suggestions. Based on the user's request, "
+    "provide 1 to 3 route options using ONLY the allowed public transport. For each "
+    "route, provide a title, a tag ('Recommended', 'Cheapest', or 'Fastest'), an "
+    "estimated total fare in ZAR, an estimated travel time, and a list of steps. "
+    'User request: "{request}"'
+)
+
+LIVE_PROMPT = (
+    "You are a proactive travel assistant. The user is currently on a trip from "
+    "{origin} to {destination} using {provider}. An alert has just been issued: "
+    '"{alert}".\n'
+    "Analyze the situation. If it's a significant disruption (like a major delay), "
+    "find an alternative route. Also, offer to notify a contact about the delay. "
+    "Formulate a friendly, concise message for the user explaining the situation "
+    "and the proposed solution."
+)
+
+
+@dataclass(frozen=True)
+class Prompt:
+    key: tuple
+    text: str
+
+
+def _text(value) -> str:
+    # JSON fields: anything but a string counts as missing
+    return value if isinstance(value, str) else ""
+
+
+def normalise(text) -> str:
+    return " ".join(_NOISE.sub(" ", _text(text).lower()).split())
+
+
+def canonical_provider(value):
+    """
+    Known provider name, "any" for none; None if unknown (or not a string).
+    """
+    if value is None or value == "":
+        return "any"
+    if not isinstance(value, str):
+        return None
+    return _PROVIDERS.get(value.strip().lower())
+
+
+def sast_now() -> datetime:
+    return datetime.utcnow() + SAST
+
+
+def time_band(when: str | None, now: datetime) -> tuple[str, str]:
+    """
+    -> (band, "weekday" | "weekend"); no recognisable time means now.
+    """
+    when = when or ""
+    hour = now.hour
+
+    clock = _CLOCK.search(when)
+    if clock:
+        hour = int(clock["h"]) % 24
+        if clock["ampm"] == "pm" and hour < 12:
+            hour += 12
+        elif clock["ampm"] == "am" and hour == 12:
+            hour = 0
+    elif "morning" in when:
+        hour = 7
+    elif "afternoon" in when:
+        hour = 16
+    elif "evening" in when or "tonight" in when:
+        hour = 20
+
+    day = now + timedelta(days=1) if "tomorrow" in when else now
+    if any(w in when for w in _WEEKEND):
+        day_type = "weekend"
+    else:
+        day_type = "weekend" if day.weekday() >= 5 else "weekday"
+
+    band = next(name for name, lo, hi, _ in TIME_BANDS if lo <= hour < hi)
+    return band, day_type
+
+
+def _place(text) -> str:
+    return text.strip().title()
+
+
+def plan_prompt(query, provider="any", now: datetime | None = None) -> Prompt | None:
+    """
+    Canonical planner prompt for a free-text query; None if empty.
+    """
+    text = normalise(query)
+    if not text:
+        return None
+
+    via = _VIA.search(text)
+    if via:
+        if provider == "any":
+            provider = _PROVIDERS[via["provider"]]
+        text = (text[:via.start()] + text[via.end():]).strip()
+
+    text = _LEADING.sub("", text)
+    match = _ROUTE.match(text)
+
+    if match is None:
+        key = ("plan", hashlib.sha1(text.encode()).hexdigest(), provider)
+        request = text
+    else:
+        origin, destination = _place(match["origin"]), _place(match["destination"])
+        band, day_type = time_band(match["when"], now or sast_now())
+        key = ("plan", origin, destination, band, day_type, provider)
+        request = f"From {origin} to {destination}, departing in the {_BAND_TEXT[band]} on a {day_type}"
+
+    if provider != "any":
+        request += f", preferring {provider}"
+
+    return Prompt(key=key, text=PLAN_PROMPT.format(request=request))
+
+
+def live_prompt(trip: dict, alert: dict) -> Prompt | None:
+    """
+    Prompt for a disruption on a trip in progress; None if incomplete.
+    """
+    origin, destination = normalise(trip.get("from")), normalise(trip.get("to"))
+    provider = canonical_provider(trip.get("provider"))
+    title, description = _text(alert.get("title")).strip(), _text(alert.get("description")).strip()
+    if not origin or not destination or provider in (None, "any") or not title:
+        return None
+
+    # Every rider on the same leg gets the same advice for the same alert
+    alert_key = hashlib.sha1(f"{title}\n{description}".encode()).hexdigest()
+    return Prompt(
+        key=("live", provider, origin, destination, alert_key),
+        text=LIVE_PROMPT.format(
+            origin=_place(origin), destination=_place(destination), provider=provider,
+            alert=f"{title}: {description}" if description else title
+        ),
+    )
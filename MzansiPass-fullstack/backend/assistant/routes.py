@@ -0,0 +1,128 @@
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required
+
+from ratelimit import limiter, by_user
+from assistant.client import ModelError
+from assistant.prompts import plan_prompt, live_prompt, canonical_provider
+from assistant.service import ask_plan, ask_live, parse_routes, journey_update
+
+assistant_bp = Blueprint(
+    "assistant",
+    __name__,
+    url_prefix="/api/ai"
+)
+
+# ----------------------------------------------------
+# Helpers
+# ----------------------------------------------------
+
+def error(code, message, status=400):
+    return jsonify({
+        "error": code,
+        "message": message
+    }), status
+
+
+def wants_stream():
+    return (
+        request.args.get("stream") == "1"
+        or request.accept_mimetypes.best == "text/event-stream"
+    )
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+
+def answer(source, parts, finish):
+    """
+    JSON, or SSE: "chunk" events with text as it arrives, then one
+    "result" (the same JSON) or "error" event.
+    """
+    if not wants_stream():
+        try:
+            body = finish(list(parts))
+        except ModelError as exc:
+            return error("model_unavailable", str(exc), 502)
+        resp = jsonify(body)
+        resp.headers["X-Cache"] = source.upper()
+        return resp
+
+    def events():
+        received = []
+        try:
+            for part in parts:
+                received.append(part)
+                if part.get("text"):
+                    yield sse("chunk", {"text": part["text"]})
+            yield sse("result", finish(received))
+        except ModelError as exc:
+            yield sse("error", {"error": "model_unavailable", "message": str(exc)})
+
+    resp = Response(stream_with_context(events()), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    resp.headers["X-Cache"] = source.upper()
+    return resp
+
+
+def unavailable():
+    return error("ai_unavailable", "AI assistant is not configured", 503)
+
+
+# ----------------------------------------------------
+# TRIP PLANNING
+# ----------------------------------------------------
+
+@assistant_bp.route("/plan", methods=["POST"])
+@jwt_required()
+@limiter.limit("ai", key=by_user)
+def plan_trip():
+    """
+    {"query": "Park Station to Sandton at 7am", "provider"?} -> RouteOption[]
+    """
+    cfg = current_app.config
+    if not cfg["AI_API_KEY"]:
+        return unavailable()
+
+    data = request.get_json(silent=True) or {}
+
+    provider = canonical_provider(data.get("provider"))
+    if provider is None:
+        return error("invalid_request", "Unknown provider")
+
+    prompt = plan_prompt(str(data.get("query") or "")[:500], provider)
+    if prompt is None:
+        return error("invalid_request", "query is required")
+
+    source, parts = ask_plan(cfg, prompt)
+    return answer(source, parts, lambda received: parse_routes(prompt, received))
+
+
+# ----------------------------------------------------
+# LIVE JOURNEY UPDATES
+# ----------------------------------------------------
+
+@assistant_bp.route("/journey-update", methods=["POST"])
+@jwt_required()
+@limiter.limit("ai", key=by_user)
+def live_update():
+    """
+    {"trip": {from, to, provider}, "alert": {title, description}}
+    -> LiveJourneyUpdate
+    """
+    cfg = current_app.config
+    if not cfg["AI_API_KEY"]:
+        return unavailable()
+
+    data = request.get_json(silent=True) or {}
+    trip, alert = data.get("trip"), data.get("alert")
+    if not isinstance(trip, dict) or not isinstance(alert, dict):
+        return error("invalid_request", "trip and alert are required")
+
+    prompt = live_prompt(trip, alert)
+    if prompt is None:
+        return error("invalid_request", "trip needs from, to and a known provider; alert needs a title")
+
+    source, parts = ask_live(cfg, prompt)
+    return answer(source, parts, lambda received: journey_update(cfg, received))
@@ -0,0 +1,137 @@
+# assistant/service.py
+"""
+Planner and live-journey requests on top of the cached model calls.
+"""
+import json
+
+from assistant.cache import response_cache
+from assistant.client import ModelError, ModelSettings, stream_parts
+from assistant.prompts import plan_prompt
+
+# Same structured output the frontend asked for (RouteOption[])
+PLAN_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "title": {"type": "STRING"},
+            "tag": {"type": "STRING"},
+            "totalFare": {"type": "NUMBER"},
+            "travelTime": {"type": "STRING"},
+            "steps": {
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "provider": {"type": "STRING"},
+                        "from": {"type": "STRING"},
+                        "to": {"type": "STRING"},
+                        "instruction": {"type": "STRING"},
+                    },
+                    "required": ["provider", "from", "to", "instruction"],
+                },
+            },
+        },
+        "required": ["title", "tag", "totalFare", "travelTime", "steps"],
+    },
+}
+
+LIVE_TOOLS = [
+    {
+        "name": "findAlternativeRoute",
+        "description": "Finds an alternative transit route when the user's current trip is disrupted.",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "currentLocation": {"type": "STRING", "description": "The user's current location, e.g., 'Sandton'."},
+                "destination": {"type": "STRING", "description": "The user's final destination, e.g., 'Soweto Theatre'."},
+            },
+            "required": ["currentLocation", "destination"],
+        },
+    },
+    {
+        "name": "notifyContact",
+        "description": "Sends a notification to a contact about a travel delay.",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "contactName": {"type": "STRING", "description": "The name of the contact to notify, e.g., 'Mom'."},
+                "message": {"type": "STRING", "description": "The message to send, e.g., 'Running about 15 minutes late due to a bus delay.'"},
+            },
+            "required": ["contactName", "message"],
+        },
+    },
+]
+
+_ROUTE_FIELDS = ("title", "tag", "totalFare", "travelTime", "steps")
+
+
+def ask(cfg, prompt, ttl, schema=None, tools=None):
+    """
+    -> (cache source, iterator of response parts)
+    """
+    settings = ModelSettings.from_config(cfg)
+    return response_cache.stream(
+        prompt.key,
+        lambda: stream_parts(settings, prompt.text, schema=schema, tools=tools),
+        ttl=ttl,
+        max_entries=cfg["AI_CACHE_MAX_ENTRIES"],
+        timeout=settings.timeout,
+    )
+
+
+def ask_plan(cfg, prompt):
+    return ask(cfg, prompt, cfg["AI_PLAN_CACHE_TTL_SECONDS"], schema=PLAN_SCHEMA)
+
+
+def ask_live(cfg, prompt):
+    return ask(cfg, prompt, cfg["AI_LIVE_CACHE_TTL_SECONDS"], tools=LIVE_TOOLS)
+
+
+def text_of(parts) -> str:
+    return "".join(p.get("text", "") for p in parts)
+
+
+def parse_routes(prompt, parts) -> list:
+    """
+    RouteOption list from a finished planner response. A malformed
+    answer is evicted so the next request asks again.
+    """
+    try:
+        routes = json.loads(text_of(parts))
+        if not isinstance(routes, list) or not all(
+            isinstance(r, dict) and all(f in r for f in _ROUTE_FIELDS) for r in routes
+        ):
+            raise ValueError("not a route list")
+    except ValueError as exc:
+        response_cache.discard(prompt.key)
+        raise ModelError(f"unusable planner response: {exc}") from exc
+    return routes
+
+
+def journey_update(cfg, parts) -> dict:
+    """
+    LiveJourneyUpdate from a finished live response; tool calls are
+    answered here (alternative routes go through the planner cache).
+    """
+    update = {"userMessage": text_of(parts)}
+
+    for part in parts:
+        call = part.get("functionCall")
+        if not call:
+            continue
+        args = call.get("args") or {}
+
+        if call.get("name") == "findAlternativeRoute":
+            prompt = plan_prompt(f"From {args.get('currentLocation', '')} to {args.get('destination', '')}")
+            if prompt is None:
+                continue
+            _, route_parts = ask_plan(cfg, prompt)
+            routes = parse_routes(prompt, list(route_parts))
+            if routes:
+                update["alternativeRoute"] = routes[0]
+
+        elif call.get("name") == "notifyContact" and args.get("message"):
+            update["notificationMessage"] = args["message"]
+
+    return update
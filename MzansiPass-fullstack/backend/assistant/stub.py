@@ -0,0 +1,128 @@
+# assistant/stub.py
+"""
+Local stand-in for the Gemini API, for development and load tests.
+
+    python -m assistant.stub [--port 8090] [--latency 1.5] [--chunks 5]
+    AI_BASE_URL=http://127.0.0.1:8090 AI_API_KEY=stub flask run
+
+Answers streamGenerateContent (alt=sse) and generateContent with
+canned, deterministic responses: a RouteOption list when a response
+schema is requested, otherwise a message plus both tool calls when
+tools are offered. The answer is spread over --chunks SSE events
+across --latency seconds. GET /stats returns the number of model
+calls, so caching and coalescing can be checked from outside.
+"""
+import argparse
+import json
+import re
+import time
+from threading import Lock
+
+from flask import Flask, Response, jsonify, request
+
+_REQUEST = re.compile(r'User request: "(?:From )?(?P<origin>.+?) to (?P<destination>[^,"]+)')
+
+
+def _plan(prompt):
+    match = _REQUEST.search(prompt)
+    origin, destination = (match["origin"], match["destination"]) if match else ("Park Station", "Sandton")
+    return json.dumps([
+        {
+            "title": f"Gautrain to {destination}",
+            "tag": "Fastest",
+            "totalFare": 85.0,
+            "travelTime": "25 min",
+            "steps": [{"provider": "Gautrain", "from": origin, "to": destination,
+                       "instruction": f"Take the Gautrain from {origin} to {destination}."}],
+        },
+        {
+            "title": f"Rea Vaya to {destination}",
+            "tag": "Cheapest",
+            "totalFare": 14.5,
+            "travelTime": "55 min",
+            "steps": [{"provider": "Rea Vaya", "from": origin, "to": destination,
+                       "instruction": f"Board the Rea Vaya trunk route towards {destination}."}],
+        },
+    ])
+
+
+def _parts(body):
+    prompt = body["contents"][0]["parts"][0]["text"]
+
+    if body.get("generationConfig", {}).get("responseSchema"):
+        return [{"text": _plan(prompt)}]
+
+    parts = [{"text": "Heads up: your service is running late. I found another way to get "
+                      "you there and can let someone know you'll be delayed."}]
+    if body.get("tools"):
+        parts += [
+            {"functionCall": {"name": "findAlternativeRoute",
+                              "args": {"currentLocation": "Park Station", "destination": "Sandton"}}},
+            {"functionCall": {"name": "notifyContact",
+                              "args": {"contactName": "Mom", "message": "Running about 15 minutes late."}}},
+        ]
+    return parts
+
+
+def _split(parts, chunks):
+    """Break text parts into ~chunks pieces, like a streaming model."""
+    out = []
+    for part in parts:
+        text = part.get("text")
+        if text is None:
+            out.append(part)
+            continue
+        step = max(1, -(-len(text) // chunks))
+        out += [{"text": text[i:i + step]} for i in range(0, len(text), step)]
+    return out
+
+
+def create_stub(latency=1.0, chunks=5):
+    app = Flask("assistant_stub")
+    lock = Lock()
+    calls = {"count": 0}
+
+    def count():
+        with lock:
+            calls["count"] += 1
+
+    @app.route("/v1beta/models/<model>:streamGenerateContent", methods=["POST"])
+    def stream(model):
+        count()
+        pieces = _split(_parts(request.get_json()), chunks)
+        pause = latency / max(len(pieces), 1)
+
+        def events():
+            for piece in pieces:
+                time.sleep(pause)
+                event = {"candidates": [{"content": {"role": "model", "parts": [piece]}}]}
+                yield f"data: {json.dumps(event)}\r\n\r\n"
+
+        return Response(events(), mimetype="text/event-stream")
+
+    @app.route("/v1beta/models/<model>:generateContent", methods=["POST"])
+    def generate(model):
+        count()
+        time.sleep(latency)
+        return jsonify({"candidates": [{"content": {"role": "model", "parts": _parts(request.get_json())}}]})
+
+    @app.route("/stats", methods=["GET"])
+    def stats():
+        return jsonify(calls)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--chunks", type=int, default=5)
+    args = parser.parse_args()
+
+    create_stub(args.latency, args.chunks).run(args.host, args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from models import AgencyUser
-from extensions import db
+from models import db
 from flask_jwt_extended import create_access_token
 
 agency_auth_bp = Blueprint("agency_auth", __name__, url_prefix="/api/agency/auth")
@@ -22,6 +22,11 @@ def agency_login():
             "agency_user_id": user.id,
             "agency_id": user.agency_id,
             "role": user.role.value
+        },
+        # agency_required() reads these from the top-level claims
+        additional_claims={
+            "agency_id": user.agency_id,
+            "role": user.role.value
         }
     )
 
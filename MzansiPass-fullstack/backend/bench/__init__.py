@@ -0,0 +1,11 @@
+"""
+Benchmarks and load tests for the backend.
+
+Run from the backend directory, e.g.:
+
+    python bench/startup.py
+    python -m bench.loadtest --users 20000 --duration 30
+    python -m bench.fares
+    python -m bench.listings
+    python -m bench.compare bench/results/a.json bench/results/b.json
+"""
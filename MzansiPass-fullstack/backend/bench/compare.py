@@ -0,0 +1,65 @@
+# bench/compare.py
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m bench.compare OLD.json NEW.json [--threshold 0.10]
+
+Works for loadtest results (per-endpoint p50/p95/p99 and rps) and for
+any result with the same {"endpoints": {name: {metric: value}}}
+layout. Exits 1 if any latency grew, or throughput dropped, by more
+than the threshold.
+"""
+import argparse
+import json
+import sys
+
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "ns_per_op", "allocs_per_op")
+HIGHER_IS_BETTER = ("rps", "ops_per_s")
+
+
+def compare(old: dict, new: dict, threshold: float):
+    rows, regressions = [], 0
+    for name, new_metrics in sorted(new.get("endpoints", {}).items()):
+        old_metrics = old.get("endpoints", {}).get(name)
+        if not old_metrics:
+            continue
+        for metric, new_value in new_metrics.items():
+            if metric not in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+                continue
+            old_value = old_metrics.get(metric)
+            if not isinstance(new_value, (int, float)) or not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            worse = (
+                (metric in LOWER_IS_BETTER and change > threshold) or
+                (metric in HIGHER_IS_BETTER and change < -threshold)
+            )
+            regressions += worse
+            rows.append((name, metric, old_value, new_value, change, worse))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    with open(args.old) as fh:
+        old = json.load(fh)
+    with open(args.new) as fh:
+        new = json.load(fh)
+
+    rows, regressions = compare(old, new, args.threshold)
+
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for name, metric, a, b, change, worse in rows:
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:24} {metric:14} {a:>12} -> {b:<12} {change:+.1%}{flag}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+# bench/fares.py
+"""
+Fare engine micro-benchmark and property-test harness.
+
+The repo currently prices fares in three places with different
+formulas:
+
+    FareEngine (fares/engine.py)       haversine, base 10 + 1.25/km
+    fares/rules/rea_vaya.py            hypot * 111, base 5 + 1.25/km
+    app.calculate_fare (/nfc/tap-out)  haversine, 6 + 0.5/km, min 6
+
+Every implementation is registered in IMPLEMENTATIONS with the
+reference policy it is supposed to follow. The harness
+
+1. property-tests each one on random South African coordinates
+   against its reference (independent, straightforward maths) plus
+   invariants: deterministic, 2-dp rounding, >= minimum, symmetric,
+   non-decreasing with distance;
+2. benchmarks ns/op and allocated blocks per call.
+
+Differences that exist today are listed in KNOWN_DIVERGENCES, per
+implementation and property, so they are reported but do not fail the
+run; any NEW divergence (another property included) exits 1.
+That is the safety net for optimising the engine without silently
+changing anyone's fare.
+
+    python -m bench.fares [--cases 20000] [--iterations 200000] [--json out.json]
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from fares.engine import FareEngine, FareContext  # noqa: E402
+from fares.context import FareContext as RuleFareContext  # noqa: E402
+from fares.rules.rea_vaya import calculate_rea_vaya  # noqa: E402
+
+# South Africa bounding box
+LAT_RANGE = (-34.8, -22.2)
+LNG_RANGE = (16.5, 32.8)
+
+T0 = datetime(2024, 1, 1, 7, 0)
+T1 = T0 + timedelta(minutes=35)
+
+
+# ----------------------------------------------------
+# References (deliberately simple, not fast)
+# ----------------------------------------------------
+
+def ref_great_circle_km(lat1, lng1, lat2, lng2):
+    # Haversine via asin; independent of the engine's atan2 form
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    h = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371 * math.asin(min(1.0, math.sqrt(h)))
+
+
+def ref_distance_fare(base, per_km, minimum=0.0):
+    def fare(lat1, lng1, lat2, lng2):
+        return round(max(minimum, base + per_km * ref_great_circle_km(lat1, lng1, lat2, lng2)), 2)
+    fare.minimum = max(minimum, base)
+    return fare
+
+
+def ref_flat(amount):
+    def fare(*_):
+        return amount
+    fare.minimum = amount
+    return fare
+
+
+# ----------------------------------------------------
+# Implementations under test
+# ----------------------------------------------------
+
+def engine(agency):
+    def call(lat1, lng1, lat2, lng2):
+        return FareEngine.calculate(FareContext(
+            agency=agency, start_lat=lat1, start_lng=lng1,
+            end_lat=lat2, end_lng=lng2, start_time=T0, end_time=T1,
+        ))
+    return call
+
+
+def rule_rea_vaya(lat1, lng1, lat2, lng2):
+    return calculate_rea_vaya(RuleFareContext(
+        agency="Rea Vaya", start_lat=lat1, start_lng=lng1,
+        end_lat=lat2, end_lng=lng2, start_time=T0, end_time=T1,
+    ))
+
+
+def app_tap_out(lat1, lng1, lat2, lng2):
+    from app import calculate_fare
+    return calculate_fare(lat1, lng1, lat2, lng2)
+
+
+def amount_of(result):
+    # Implementations return a FareResult-like object or a bare float
+    return getattr(result, "amount", result)
+
+
+# name -> (implementation, reference). Implementations return their
+# native result so the benchmark counts everything they allocate.
+IMPLEMENTATIONS = {
+    "FareEngine/Rea Vaya": (engine("Rea Vaya"), ref_distance_fare(10.00, 1.25)),
+    "FareEngine/Gautrain": (engine("Gautrain"), ref_flat(45.00)),
+    "rules.rea_vaya": (rule_rea_vaya, ref_distance_fare(10.00, 1.25)),
+    "app.calculate_fare": (app_tap_out, ref_distance_fare(6.00, 0.50, minimum=6.00)),
+}
+
+# (implementation, property) present in the tree today; reported, not
+# failed. Any other property failing on the same implementation is new.
+KNOWN_DIVERGENCES = {
+    ("rules.rea_vaya", "matches_reference"): "base 5.00 instead of 10.00 and flat-earth hypot*111 distance",
+    ("rules.rea_vaya", "at_least_minimum"): "base 5.00 is below the 10.00 minimum",
+}
+
+# Largest acceptable difference from the reference (one rounding step)
+TOLERANCE = 0.011
+
+
+# ----------------------------------------------------
+# Property tests
+# ----------------------------------------------------
+
+def random_cases(n, rng):
+    cases = [
+        (-26.2041, 28.0473, -26.2041, 28.0473),   # same point
+        (-26.2041, 28.0473, -25.7479, 28.2293),   # Johannesburg -> Pretoria
+        (-33.9249, 18.4241, -26.2041, 28.0473),   # Cape Town -> Johannesburg
+    ]
+    while len(cases) < n:
+        lat1, lng1 = rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+        if rng.random() < 0.7:
+            # Mostly urban hops of a few km
+            lat2, lng2 = lat1 + rng.uniform(-0.3, 0.3), lng1 + rng.uniform(-0.3, 0.3)
+        else:
+            lat2, lng2 = rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+        cases.append((lat1, lng1, lat2, lng2))
+    return cases
+
+
+def check(name, raw_impl, ref, cases):
+    def impl(*case):
+        return amount_of(raw_impl(*case))
+
+    failures = {}
+    max_diff = 0.0
+
+    def fail(prop, case, detail):
+        failures.setdefault(prop, {"count": 0, "example": None})
+        failures[prop]["count"] += 1
+        if failures[prop]["example"] is None:
+            failures[prop]["example"] = {"case": case, "detail": detail}
+
+    for case in cases:
+        amount = impl(*case)
+        expected = ref(*case)
+
+        diff = abs(amount - expected)
+        max_diff = max(max_diff, diff)
+        if diff > TOLERANCE:
+            fail("matches_reference", case, f"{amount} != {expected}")
+
+        if impl(*case) != amount:
+            fail("deterministic", case, "different result on second call")
+
+        if round(amount, 2) != amount:
+            fail("rounded_2dp", case, repr(amount))
+
+        if amount < ref.minimum - 1e-9:
+            fail("at_least_minimum", case, f"{amount} < {ref.minimum}")
+
+        lat1, lng1, lat2, lng2 = case
+        if abs(impl(lat2, lng2, lat1, lng1) - amount) > TOLERANCE:
+            fail("symmetric", case, "A->B differs from B->A")
+
+        # Push the destination 10% further along the same line
+        farther = (lat1, lng1, lat1 + (lat2 - lat1) * 1.1, lng1 + (lng2 - lng1) * 1.1)
+        if impl(*farther) + 1e-9 < amount:
+            fail("monotonic_distance", case, "longer trip priced lower")
+
+    return {
+        "cases": len(cases),
+        "max_abs_diff": round(max_diff, 4),
+        "failures": failures,
+        "known_divergences": {
+            prop: KNOWN_DIVERGENCES[(name, prop)]
+            for prop in failures if (name, prop) in KNOWN_DIVERGENCES
+        },
+    }
+
+
+# ----------------------------------------------------
+# Micro-benchmark
+# ----------------------------------------------------
+
+def bench(impl, cases, iterations):
+    """
+    ns/op over `iterations` calls, plus allocs/op: memory blocks still
+    alive per call with every result retained (GC off) - i.e. the
+    objects each call produces, a proxy for allocation pressure.
+    """
+    work = [cases[i % len(cases)] for i in range(iterations)]
+
+    for case in work[:1000]:  # warm-up
+        impl(*case)
+
+    gc.disable()
+    try:
+        started = time.perf_counter_ns()
+        for case in work:
+            impl(*case)
+        elapsed = time.perf_counter_ns() - started
+
+        sample = work[:10_000]
+        kept = [None] * len(sample)
+        before = sys.getallocatedblocks()
+        for i, case in enumerate(sample):
+            kept[i] = impl(*case)
+        allocs = (sys.getallocatedblocks() - before) / len(sample)
+        del kept
+    finally:
+        gc.enable()
+
+    return {
+        "ns_per_op": round(elapsed / iterations, 1),
+        "ops_per_s": round(iterations / (elapsed / 1e9)),
+        "allocs_per_op": round(allocs, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fare engine harness")
+    parser.add_argument("--cases", type=int, default=20_000)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", action="append", help="Limit to these implementations")
+    parser.add_argument("--json", help="Write results (bench.compare layout) to this file")
+    args = parser.parse_args()
+
+    cases = random_cases(args.cases, random.Random(args.seed))
+    names = args.only or list(IMPLEMENTATIONS)
+
+    result = {"commit": None, "endpoints": {}, "properties": {}}
+    new_divergences = []
+
+    for name in names:
+        impl, ref = IMPLEMENTATIONS[name]
+        props = check(name, impl, ref, cases)
+        result["properties"][name] = props
+        result["endpoints"][name] = bench(impl, cases, args.iterations)
+
+        status = "ok"
+        new = [prop for prop in props["failures"] if prop not in props["known_divergences"]]
+        if new:
+            status = "FAIL"
+            new_divergences.append(name)
+        elif props["failures"]:
+            status = "KNOWN DIVERGENCE"
+
+        b = result["endpoints"][name]
+        print(f"{name:22} {b['ns_per_op']:>9} ns/op {b['allocs_per_op']:>6} allocs/op  "
+              f"max diff {props['max_abs_diff']:<8} {status}")
+        for prop, info in props["failures"].items():
+            known = " (known)" if prop in props["known_divergences"] else ""
+            print(f"    {prop}{known}: {info['count']} case(s), e.g. {info['example']}")
+
+    try:
+        from bench.loadtest import git_commit
+        result["commit"] = git_commit()
+    except ImportError:
+        pass
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(result, fh, indent=2)
+
+    sys.exit(1 if new_divergences else 0)
+
+
+if __name__ == "__main__":
+    main()
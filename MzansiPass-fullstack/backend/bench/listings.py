@@ -0,0 +1,211 @@
+# bench/listings.py
+"""
+Before/after benchmark for the read-heavy listing routes.
+
+"before" is the previous implementation of each route kept verbatim
+below (full ORM objects, iso()/.value per field, Flask's stdlib JSON
+provider), mounted under /bench/legacy. "after" is the live route
+(column-only Shape select, FastJSONProvider). Both are driven through
+the same test client against the same seeded database, JWT and all,
+and both payloads are compared so a speed-up can never hide a
+changed response.
+
+    python -m bench.listings [--users 2000] [--trips-per-user 20] [--iterations 300] [--json out.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+# ----------------------------------------------------
+# Previous implementations ("before")
+# ----------------------------------------------------
+
+def legacy_blueprint(app):
+    from flask import Blueprint, request
+    from flask.json.provider import DefaultJSONProvider
+    from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+
+    from agency.decorators import agency_required
+    from models import Card, Trip
+
+    legacy = Blueprint("bench_legacy", __name__, url_prefix="/bench/legacy")
+    stdlib = DefaultJSONProvider(app)
+
+    def iso(dt):
+        return dt.isoformat() if dt else None
+
+    @legacy.route("/agency/trips")
+    @agency_required()
+    def list_trips():
+        agency_id = get_jwt()["agency_id"]
+        page = int(request.args.get("page", 1))
+        per_page = min(int(request.args.get("per_page", 50)), 100)
+
+        pagination = (
+            Trip.query
+            .filter_by(agency_id=agency_id)
+            .order_by(Trip.start_time.desc())
+            .paginate(page=page, per_page=per_page, error_out=False)
+        )
+
+        return stdlib.response({
+            "items": [
+                {
+                    "id": t.id,
+                    "card_id": t.card_id,
+                    "start_time": iso(t.start_time),
+                    "end_time": iso(t.end_time),
+                    "fare": t.fare,
+                    "status": t.status.value
+                }
+                for t in pagination.items
+            ],
+            "meta": {
+                "page": page,
+                "per_page": per_page,
+                "total": pagination.total,
+                "pages": pagination.pages
+            }
+        })
+
+    @legacy.route("/agency/trips/<int:trip_id>")
+    @agency_required()
+    def get_trip(trip_id):
+        agency_id = get_jwt()["agency_id"]
+        trip = Trip.query.filter_by(id=trip_id, agency_id=agency_id).first_or_404()
+
+        return stdlib.response({
+            "id": trip.id,
+            "card_id": trip.card_id,
+            "start_time": iso(trip.start_time),
+            "end_time": iso(trip.end_time),
+            "fare": trip.fare,
+            "status": trip.status.value,
+            "start_lat": trip.start_lat,
+            "start_lng": trip.start_lng,
+            "end_lat": trip.end_lat,
+            "end_lng": trip.end_lng,
+        })
+
+    @legacy.route("/cards")
+    @jwt_required()
+    def list_cards():
+        user_id = get_jwt_identity()["id"]
+        cards = Card.query.filter_by(user_id=user_id).all()
+
+        return stdlib.response([{
+            "id": c.id,
+            "card_id": c.card_id,
+            "label": c.label,
+            "color": c.color,
+            "linked": c.linked
+        } for c in cards])
+
+    return legacy
+
+
+# ----------------------------------------------------
+# Runner
+# ----------------------------------------------------
+
+def time_route(client, url, headers, iterations, warmup=20):
+    for _ in range(warmup):
+        client.get(url, headers=headers)
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        resp = client.get(url, headers=headers)
+        samples.append(time.perf_counter() - started)
+        assert resp.status_code == 200, (url, resp.status_code)
+
+    samples.sort()
+    return {
+        "mean_us": round(statistics.fmean(samples) * 1e6, 1),
+        "p50_us": round(samples[len(samples) // 2] * 1e6, 1),
+        "p95_us": round(samples[int(len(samples) * 0.95)] * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--cards-per-user", type=int, default=5)
+    parser.add_argument("--trips-per-user", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    os.environ.setdefault("RATELIMIT_ENABLED", "false")
+    os.environ.setdefault("TICKET_SIGNING_KEY", "bench-ticket-key")
+
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from models import db, Trip, AgencyUser
+    from bench.seed import seed
+
+    app = create_app(serving=True)
+    app.register_blueprint(legacy_blueprint(app))
+
+    with app.app_context():
+        db.create_all()
+        seeded = seed(users=args.users, cards_per_user=args.cards_per_user,
+                      trips_per_user=args.trips_per_user)
+
+        admin = AgencyUser.query.filter_by(agency_id=seeded["agencies"][0]).first()
+        trip_id = db.session.query(Trip.id).filter_by(agency_id=admin.agency_id).limit(1).scalar()
+
+        agency_auth = {"Authorization": "Bearer " + create_access_token(
+            identity={"agency_user_id": admin.id, "agency_id": admin.agency_id, "role": admin.role.value},
+            additional_claims={"agency_id": admin.agency_id, "role": admin.role.value},
+        )}
+        user_auth = {"Authorization": "Bearer " + create_access_token(
+            identity={"id": seeded["first_user"], "role": "user"}
+        )}
+
+    routes = [
+        # Agency blueprints are mounted at /agency (agency/__init__.py)
+        ("GET /agency?per_page=100", "/agency?per_page=100", "/agency/trips?per_page=100", agency_auth),
+        ("GET /agency/<trip_id>", f"/agency/{trip_id}", f"/agency/trips/{trip_id}", agency_auth),
+        ("GET /cards", "/cards", "/cards", user_auth),
+    ]
+
+    client = app.test_client()
+    results = []
+
+    for name, url, legacy_path, headers in routes:
+        legacy_url = "/bench/legacy" + legacy_path
+
+        before_body = client.get(legacy_url, headers=headers).get_json()
+        after_body = client.get(url, headers=headers).get_json()
+        if before_body != after_body:
+            sys.exit(f"{name}: payload changed between before and after")
+
+        before = time_route(client, legacy_url, headers, args.iterations)
+        after = time_route(client, url, headers, args.iterations)
+        results.append({
+            "route": name,
+            "before": before,
+            "after": after,
+            "speedup": round(before["mean_us"] / after["mean_us"], 2),
+        })
+
+    print(f"{'route':40} {'before us':>10} {'after us':>10} {'speedup':>8}")
+    for r in results:
+        print(f"{r['route']:40} {r['before']['mean_us']:>10} {r['after']['mean_us']:>10} {r['speedup']:>7}x")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"results": results, "args": vars(args)}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
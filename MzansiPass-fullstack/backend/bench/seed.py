@@ -0,0 +1,187 @@
+# bench/seed.py
+"""
+Bulk seeding of realistic data for benchmarks.
+
+Rows are generated deterministically (fixed RNG seed) and inserted
+with Core executemany in chunks, bypassing the ORM unit of work, so
+millions of rows load in minutes on Postgres.
+"""
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from models import (
+    db, bcrypt, User, Card, Trip, Transaction, TransportAgency, AgencyUser,
+    UserRole, AgencyRole, TripStatus, TransactionType
+)
+
+# Johannesburg-ish bounding box
+LAT_RANGE = (-26.35, -25.70)
+LNG_RANGE = (27.80, 28.35)
+
+AGENCIES = [
+    ("Rea Vaya", "RV"),
+    ("Gautrain", "GT"),
+    ("Metrobus", "MB"),
+    ("PRASA", "PR"),
+]
+
+BENCH_PASSWORD = "bench-password"
+
+
+def _chunks(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _bulk(table, rows, chunk):
+    for part in _chunks(rows, chunk):
+        db.session.execute(insert(table), part)
+
+
+def _bulk_ids(table, rows, chunk) -> list[int]:
+    """
+    _bulk, returning the new ids in row order (the sequence hands
+    them out, so later live inserts never collide with seeded rows).
+    """
+    stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    ids = []
+    for part in _chunks(rows, chunk):
+        ids.extend(db.session.execute(stmt, part).scalars())
+    return ids
+
+
+def seed(users=10_000, cards_per_user=1, trips_per_user=5,
+         chunk=10_000, rng_seed=42, log=print) -> dict:
+    """
+    Seed agencies, one agency admin per agency, users with cards,
+    completed trips and matching fare / top-up transactions.
+
+    Returns ids the load generator needs (agencies, card pool).
+    """
+    rng = random.Random(rng_seed)
+    started = time.perf_counter()
+    now = datetime.utcnow()
+
+    # One bcrypt hash reused for every seeded account
+    password_hash = bcrypt.generate_password_hash(BENCH_PASSWORD).decode()
+
+    agencies = []
+    for name, code in AGENCIES:
+        agency = TransportAgency.query.filter_by(code=code).first()
+        if agency is None:
+            agency = TransportAgency(name=name, code=code, email=f"ops@{code.lower()}.bench")
+            db.session.add(agency)
+            db.session.flush()
+            db.session.add(AgencyUser(
+                agency_id=agency.id,
+                email=f"admin@{code.lower()}.bench",
+                password_hash=password_hash,
+                name=f"{name} admin",
+                role=AgencyRole.admin
+            ))
+        agencies.append(agency.id)
+    db.session.commit()
+
+    run_tag = uuid.uuid4().hex[:8]
+
+    user_ids = _bulk_ids(User.__table__, [{
+        "email": f"rider{i}.{run_tag}@bench",
+        "password_hash": password_hash,
+        "name": f"Rider {i}",
+        "role": UserRole.user,
+        "balance": round(rng.uniform(50, 500), 2),
+        "loyalty_points": 0,
+        "created_at": now,
+    } for i in range(users)], chunk)
+    log(f"seed: {users} users")
+
+    cards = []
+    card_rows = []
+    for i in range(users):
+        for c in range(cards_per_user):
+            card_id = f"BENCH-{run_tag}-{i}-{c}"
+            cards.append(card_id)
+            card_rows.append({
+                "card_id": card_id,
+                "user_id": user_ids[i],
+                "label": "Bench card",
+                "color": "#4A90E2",
+                "linked": True,
+                "created_at": now,
+            })
+    _bulk(Card.__table__, card_rows, chunk)
+    log(f"seed: {len(card_rows)} cards")
+
+    # Fare rows point at their trip (meta.trip_id) like the live tap-out
+    # paths do, so trips go in first and hand back their ids
+    def flush(trip_rows, fare_rows, tx_rows):
+        trip_ids = _bulk_ids(Trip.__table__, trip_rows, chunk)
+        for row, trip_id in zip(fare_rows, trip_ids):
+            row["meta"] = {"trip_id": trip_id}
+        _bulk(Transaction.__table__, tx_rows, chunk)
+
+    trip_rows, fare_rows, tx_rows = [], [], []
+    for i in range(users):
+        user_id = user_ids[i]
+        for t in range(trips_per_user):
+            start = now - timedelta(minutes=rng.randint(60, 60 * 24 * 30))
+            fare = round(rng.uniform(8, 45), 2)
+            agency_id = rng.choice(agencies)
+            trip_rows.append({
+                "user_id": user_id,
+                "agency_id": agency_id,
+                "card_id": cards[i * cards_per_user],
+                "start_time": start,
+                "start_lat": rng.uniform(*LAT_RANGE),
+                "start_lng": rng.uniform(*LNG_RANGE),
+                "end_time": start + timedelta(minutes=rng.randint(5, 90)),
+                "end_lat": rng.uniform(*LAT_RANGE),
+                "end_lng": rng.uniform(*LNG_RANGE),
+                "fare": fare,
+                "status": TripStatus.completed,
+                "created_at": start,
+            })
+            fare_rows.append({
+                "user_id": user_id,
+                "agency_id": agency_id,
+                "amount": fare,
+                "type": TransactionType.fare,
+                "reference": f"fare_{uuid.uuid4().hex}",
+                "settled": False,
+                "created_at": start,
+            })
+            tx_rows.append(fare_rows[-1])
+        tx_rows.append({
+            "user_id": user_id,
+            "agency_id": None,
+            "amount": 100.0,
+            "type": TransactionType.topup,
+            "reference": f"ps_{uuid.uuid4().hex}",
+            "meta": {"status": "success"},
+            "settled": False,
+            "created_at": now - timedelta(days=31),
+        })
+
+        if len(trip_rows) >= chunk:
+            flush(trip_rows, fare_rows, tx_rows)
+            trip_rows, fare_rows, tx_rows = [], [], []
+
+    flush(trip_rows, fare_rows, tx_rows)
+    db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    log(f"seed: {users * trips_per_user} trips, "
+        f"{users * (trips_per_user + 1)} transactions in {elapsed:.1f}s")
+
+    return {
+        "agencies": agencies,
+        "agency_admins": [f"admin@{code.lower()}.bench" for _, code in AGENCIES],
+        "cards": cards,
+        "first_user": user_ids[0] if user_ids else None,
+        "users": users,
+        "seconds": round(elapsed, 1),
+    }
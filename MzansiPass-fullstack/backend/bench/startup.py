@@ -0,0 +1,76 @@
+"""
+Cold-start benchmark for the serving app.
+
+Spawns fresh interpreters that import wsgi (i.e. create_app(serving=True))
+and reports import + factory time. Exits non-zero when the median
+exceeds Config.STARTUP_BUDGET_MS, so it can gate CI / container builds.
+
+    python bench/startup.py [--runs 10] [--budget-ms 300] [--json out.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = (
+    "import time; t = time.perf_counter(); import wsgi; "
+    "print((time.perf_counter() - t) * 1000, wsgi.app.config['STARTUP_MS'])"
+)
+
+
+def measure(runs: int) -> dict:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "0"}
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env.setdefault("TICKET_SIGNING_KEY", "bench-ticket-key")
+
+    totals, factories = [], []
+    for _ in range(runs + 1):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=BACKEND, env=env, check=True, capture_output=True, text=True
+        ).stdout.split()
+        totals.append(float(out[0]))
+        factories.append(float(out[1]))
+
+    # First run warms the bytecode cache
+    totals, factories = totals[1:], factories[1:]
+    return {
+        "runs": runs,
+        "import_and_factory_ms": {
+            "median": round(statistics.median(totals), 1),
+            "max": round(max(totals), 1),
+        },
+        "app_reported_ms": {
+            "median": round(statistics.median(factories), 1),
+        },
+    }
+
+
+def main():
+    sys.path.insert(0, BACKEND)
+    from config import Config
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=int, default=Config.STARTUP_BUDGET_MS)
+    parser.add_argument("--json", help="Write the result to this file")
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    result["budget_ms"] = args.budget_ms
+    result["within_budget"] = result["import_and_factory_ms"]["median"] <= args.budget_ms
+
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(result, fh, indent=2)
+
+    sys.exit(0 if result["within_budget"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -12,3 +13,152 @@ class Config:
     PAYSTACK_BASE = os.getenv('PAYSTACK_BASE', 'https://api.paystack.co')
     ADMIN_EMAIL = os.getenv('ADMIN_EMAIL', 'admin@example.com')
     ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'adminpass')
+
+    # Transit alerts: crowd-report clustering and feed caching
+    ALERT_CELL_DEG = float(os.getenv('ALERT_CELL_DEG', '0.01'))  # ~1 km grid
+    ALERT_DEDUP_WINDOW_SECONDS = int(os.getenv('ALERT_DEDUP_WINDOW_SECONDS', '1800'))
+    ALERT_TTL_SECONDS = int(os.getenv('ALERT_TTL_SECONDS', '7200'))
+    ALERT_FEED_CACHE_SECONDS = int(os.getenv('ALERT_FEED_CACHE_SECONDS', '5'))
+
+    # Journey planner (GTFS-style feed on local disk)
+    PLANNER_GTFS_DIR = os.getenv('PLANNER_GTFS_DIR', os.path.join(os.path.dirname(__file__), 'data', 'gtfs'))
+    PLANNER_MAX_TRANSFERS = int(os.getenv('PLANNER_MAX_TRANSFERS', '3'))
+    PLANNER_MIN_CHANGE_SECONDS = int(os.getenv('PLANNER_MIN_CHANGE_SECONDS', '120'))
+    PLANNER_WALK_RADIUS_M = float(os.getenv('PLANNER_WALK_RADIUS_M', '400'))
+
+    # PRASA tickets: HMAC key for QR payloads (gates hold the same key).
+    # Required, and never SECRET_KEY: that one is also the tap shards'
+    # socket authkey, and gates must not hold it.
+    TICKET_SIGNING_KEY = os.getenv('TICKET_SIGNING_KEY')
+    TICKET_REVOCATION_FP_RATE = float(os.getenv('TICKET_REVOCATION_FP_RATE', '0.001'))
+
+    # Loyalty accrual (batch job over the transactions ledger)
+    LOYALTY_BATCH_SIZE = int(os.getenv('LOYALTY_BATCH_SIZE', '5000'))
+    LOYALTY_SETTLE_SECONDS = int(os.getenv('LOYALTY_SETTLE_SECONDS', '900'))
+    LOYALTY_POINTS_PER_TRIP = int(os.getenv('LOYALTY_POINTS_PER_TRIP', '10'))
+    LOYALTY_POINTS_PER_RAND_TOPUP = float(os.getenv('LOYALTY_POINTS_PER_RAND_TOPUP', '1'))
+    LOYALTY_CACHE_SECONDS = int(os.getenv('LOYALTY_CACHE_SECONDS', '30'))
+    # Successful top-ups older than this are no longer looked for
+    LOYALTY_TOPUP_LOOKBACK_DAYS = int(os.getenv('LOYALTY_TOPUP_LOOKBACK_DAYS', '7'))
+
+    # Start-up budget (app imports + create_app); exceeded -> warning in the log
+    STARTUP_BUDGET_MS = int(os.getenv('STARTUP_BUDGET_MS', '800'))
+
+    # Fare capping and transfer discounts (ZAR)
+    FARE_DAILY_CAP = float(os.getenv('FARE_DAILY_CAP', '60'))
+    FARE_WEEKLY_CAP = float(os.getenv('FARE_WEEKLY_CAP', '250'))
+    FARE_TRANSFER_WINDOW_MINUTES = int(os.getenv('FARE_TRANSFER_WINDOW_MINUTES', '60'))
+    FARE_TRANSFER_DISCOUNT_PCT = float(os.getenv('FARE_TRANSFER_DISCOUNT_PCT', '50'))
+    FARE_MAX_TRANSFERS = int(os.getenv('FARE_MAX_TRANSFERS', '2'))
+    FARE_STATE_CACHE_SIZE = int(os.getenv('FARE_STATE_CACHE_SIZE', '200000'))
+
+    # Stale-trip sweeper (per-agency columns override these)
+    STALE_TRIP_HOURS = int(os.getenv('STALE_TRIP_HOURS', '6'))
+    STALE_TRIP_POLICY = os.getenv('STALE_TRIP_POLICY', 'charge_max')
+    STALE_TRIP_MAX_FARE = float(os.getenv('STALE_TRIP_MAX_FARE', '45'))
+    STALE_TRIP_BATCH_SIZE = int(os.getenv('STALE_TRIP_BATCH_SIZE', '500'))
+
+    # Per-agency routing, e.g.
+    # AGENCY_TENANTS='{"4": {"pool_size": 20, "schema": "agency_prasa",
+    #                  "statement_timeout_ms": 5000, "rate_limit": 200, "burst": 400}}'
+    AGENCY_TENANTS = json.loads(os.getenv('AGENCY_TENANTS', '{}'))
+
+    # Reverse proxies in front of the app (0 = none): how many
+    # X-Forwarded-For / X-Forwarded-Proto hops to trust, so by_ip sees
+    # the client rather than the proxy
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', '0'))
+    PROXY_FIX_X_PROTO = int(os.getenv('PROXY_FIX_X_PROTO', '0'))
+
+    # Rate limits: "<count>/<second|minute|hour|day|seconds>", empty = off
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_BACKEND = os.getenv('RATELIMIT_BACKEND', 'memory')
+    RATELIMIT_MAX_KEYS = int(os.getenv('RATELIMIT_MAX_KEYS', '100000'))
+    RATELIMIT_LOGIN = os.getenv('RATELIMIT_LOGIN', '10/minute')
+    RATELIMIT_TAP = os.getenv('RATELIMIT_TAP', '30/minute')
+    RATELIMIT_TERMINAL_TAP = os.getenv('RATELIMIT_TERMINAL_TAP', '600/minute')
+    RATELIMIT_PAYMENT_VERIFY = os.getenv('RATELIMIT_PAYMENT_VERIFY', '20/minute')
+    RATELIMIT_TERMINAL_SYNC = os.getenv('RATELIMIT_TERMINAL_SYNC', '30/minute')
+    # Whole-agency ceilings over its terminals: X-Terminal-Id is the
+    # client's word, so a fresh id per request must not mean a fresh bucket
+    RATELIMIT_AGENCY_TAP = os.getenv('RATELIMIT_AGENCY_TAP', '6000/minute')
+    RATELIMIT_AGENCY_SYNC = os.getenv('RATELIMIT_AGENCY_SYNC', '300/minute')
+    RATELIMIT_AI = os.getenv('RATELIMIT_AI', '30/minute')
+
+    # Tap stream fraud detector
+    FRAUD_ENABLED = os.getenv('FRAUD_ENABLED', 'true').lower() == 'true'
+    FRAUD_MAX_SPEED_KMH = float(os.getenv('FRAUD_MAX_SPEED_KMH', '160'))
+    FRAUD_BLOCK_SPEED_KMH = float(os.getenv('FRAUD_BLOCK_SPEED_KMH', '900'))
+    FRAUD_MIN_DISTANCE_KM = float(os.getenv('FRAUD_MIN_DISTANCE_KM', '3'))
+    FRAUD_BURST_TAPS = int(os.getenv('FRAUD_BURST_TAPS', '4'))
+    FRAUD_BURST_WINDOW_SECONDS = int(os.getenv('FRAUD_BURST_WINDOW_SECONDS', '300'))
+    FRAUD_BLOCK_AFTER_FLAGS = int(os.getenv('FRAUD_BLOCK_AFTER_FLAGS', '3'))
+    FRAUD_BLOCK_SECONDS = int(os.getenv('FRAUD_BLOCK_SECONDS', '3600'))
+    FRAUD_WINDOW_SECONDS = int(os.getenv('FRAUD_WINDOW_SECONDS', '7200'))
+    FRAUD_MAX_CARDS = int(os.getenv('FRAUD_MAX_CARDS', '200000'))
+    FRAUD_FLUSH_BATCH = int(os.getenv('FRAUD_FLUSH_BATCH', '100'))
+    FRAUD_FLUSH_SECONDS = int(os.getenv('FRAUD_FLUSH_SECONDS', '10'))
+
+    # Tap-in minimum balance; also the "allowed" flag terminals sync offline
+    TAP_MIN_BALANCE = float(os.getenv('TAP_MIN_BALANCE', '5.00'))
+
+    # Offline terminal sync
+    TERMINAL_SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv('TERMINAL_SNAPSHOT_MAX_AGE_SECONDS', '300'))
+    TERMINAL_SYNC_MAX_DELTA = int(os.getenv('TERMINAL_SYNC_MAX_DELTA', '50000'))
+    TERMINAL_SYNC_RETENTION_DAYS = int(os.getenv('TERMINAL_SYNC_RETENTION_DAYS', '7'))
+    TERMINAL_UPLOAD_MAX_TAPS = int(os.getenv('TERMINAL_UPLOAD_MAX_TAPS', '5000'))
+
+    # Ridership cubes (analytics/)
+    ANALYTICS_BATCH_SIZE = int(os.getenv('ANALYTICS_BATCH_SIZE', '20000'))
+    ANALYTICS_SETTLE_SECONDS = int(os.getenv('ANALYTICS_SETTLE_SECONDS', '60'))
+    ANALYTICS_FARE_BANDS = [float(b) for b in os.getenv('ANALYTICS_FARE_BANDS', '10,20,40').split(',')]
+    ANALYTICS_STATION_RADIUS_M = float(os.getenv('ANALYTICS_STATION_RADIUS_M', '500'))
+    ANALYTICS_CELL_DEG = float(os.getenv('ANALYTICS_CELL_DEG', '0.01'))
+    ANALYTICS_QUERY_CACHE_SIZE = int(os.getenv('ANALYTICS_QUERY_CACHE_SIZE', '512'))
+
+    # Bulk card import (provisioning/)
+    CARD_IMPORT_CHUNK_SIZE = int(os.getenv('CARD_IMPORT_CHUNK_SIZE', '5000'))
+    CARD_IMPORT_MAX_ERRORS = int(os.getenv('CARD_IMPORT_MAX_ERRORS', '1000'))
+    # HTTP uploads wait here for the import worker (shared with it)
+    CARD_IMPORT_DIR = os.getenv('CARD_IMPORT_DIR', 'var/card_imports')
+
+    # AI assistant proxy (assistant/); AI_BASE_URL may point at assistant/stub.py
+    AI_API_KEY = os.getenv('AI_API_KEY', os.getenv('GEMINI_API_KEY', ''))
+    AI_BASE_URL = os.getenv('AI_BASE_URL', 'https://generativelanguage.googleapis.com')
+    AI_MODEL = os.getenv('AI_MODEL', 'gemini-2.5-flash')
+    AI_TIMEOUT_SECONDS = float(os.getenv('AI_TIMEOUT_SECONDS', '30'))
+    AI_PLAN_CACHE_TTL_SECONDS = int(os.getenv('AI_PLAN_CACHE_TTL_SECONDS', '900'))
+    AI_LIVE_CACHE_TTL_SECONDS = int(os.getenv('AI_LIVE_CACHE_TTL_SECONDS', '120'))
+    AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', '5000'))
+
+    # Disruption refunds (refunds/)
+    REFUND_CHUNK_SIZE = int(os.getenv('REFUND_CHUNK_SIZE', '5000'))
+    REFUND_RADIUS_KM = float(os.getenv('REFUND_RADIUS_KM', '2.0'))
+    # Trips already under way when the incident was first reported
+    REFUND_LEAD_MINUTES = int(os.getenv('REFUND_LEAD_MINUTES', '60'))
+
+    # SQL profiler (profiling/); adds per-query overhead, keep off in production
+    SQL_PROFILING = os.getenv('SQL_PROFILING', 'false').lower() == 'true'
+    SQL_SLOW_MS = float(os.getenv('SQL_SLOW_MS', '100'))
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '5'))
+    # ANALYZE executes the slow query a second time (inside a rolled-back savepoint)
+    SQL_EXPLAIN_ANALYZE = os.getenv('SQL_EXPLAIN_ANALYZE', 'false').lower() == 'true'
+    SQL_PROFILE_MAX_SLOW = int(os.getenv('SQL_PROFILE_MAX_SLOW', '200'))
+
+    # Transactional outbox (outbox/): "file" (local log directory) or "memory" (in-process bus)
+    OUTBOX_BROKER = os.getenv('OUTBOX_BROKER', 'file')
+    OUTBOX_LOG_DIR = os.getenv('OUTBOX_LOG_DIR', 'var/outbox')
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '500'))
+    OUTBOX_POLL_SECONDS = float(os.getenv('OUTBOX_POLL_SECONDS', '1.0'))
+    OUTBOX_RETENTION_HOURS = int(os.getenv('OUTBOX_RETENTION_HOURS', '24'))
+
+    # Card-affinity tap shards (shards/); run `flask shards serve` on the node first
+    TAPSHARD_ENABLED = os.getenv('TAPSHARD_ENABLED', 'false').lower() == 'true'
+    TAPSHARD_WORKERS = int(os.getenv('TAPSHARD_WORKERS', str(os.cpu_count() or 1)))
+    TAPSHARD_VNODES = int(os.getenv('TAPSHARD_VNODES', '64'))
+    TAPSHARD_SOCKET_DIR = os.getenv('TAPSHARD_SOCKET_DIR', '/tmp/mzansipass-shards')
+    TAPSHARD_BATCH_SIZE = int(os.getenv('TAPSHARD_BATCH_SIZE', '200'))
+    TAPSHARD_FLUSH_MS = float(os.getenv('TAPSHARD_FLUSH_MS', '2'))
+    TAPSHARD_TIMEOUT_SECONDS = float(os.getenv('TAPSHARD_TIMEOUT_SECONDS', '5'))
+    # Reload a card's hot state this long after it was read (offline uploads, sweeper)
+    TAPSHARD_STATE_TTL_SECONDS = int(os.getenv('TAPSHARD_STATE_TTL_SECONDS', '300'))
+    TAPSHARD_MAX_CARDS = int(os.getenv('TAPSHARD_MAX_CARDS', '500000'))
@@ -0,0 +1,178 @@
+# fare_state.py
+"""
+Per-card fare cap / transfer state: in-process cache, written through
+to the fare_cap_state table.
+
+A tap-out reads the state from the cache (falling back to one primary
+key lookup), prices the fare with fares.apply_caps and writes the new
+state with `UPDATE ... WHERE version = :seen`. If another worker got
+there first the update matches no row: we drop our cached copy,
+reload and price again. The cache is only refreshed after the
+request's transaction commits (remember()).
+
+Tap shards (shards/) own their cards and price in memory; they write
+a whole micro-batch of states with write_many().
+"""
+from collections import OrderedDict
+from dataclasses import replace
+from threading import Lock
+
+from flask import current_app
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, FareCapState
+from fares.capping import CapPolicy, RiderFareState, apply_caps
+from fares.exceptions import FareCalculationError
+
+_FIELDS = (
+    "day", "day_total", "week_start", "week_total",
+    "last_tap_out_at", "last_agency_id", "chain_transfers",
+)
+
+
+class FareStateStore:
+    def __init__(self):
+        self._lock = Lock()
+        self._cache = OrderedDict()
+
+    # --------------------------------------------------
+    # Cache
+    # --------------------------------------------------
+
+    def _cached(self, card_id):
+        with self._lock:
+            state = self._cache.get(card_id)
+            if state is not None:
+                self._cache.move_to_end(card_id)
+            return state
+
+    def remember(self, state: RiderFareState):
+        limit = current_app.config["FARE_STATE_CACHE_SIZE"]
+        with self._lock:
+            self._cache[state.card_id] = state
+            self._cache.move_to_end(state.card_id)
+            while len(self._cache) > limit:
+                self._cache.popitem(last=False)
+
+    def forget(self, card_id):
+        with self._lock:
+            self._cache.pop(card_id, None)
+
+    # --------------------------------------------------
+    # Table
+    # --------------------------------------------------
+
+    def load(self, card_id) -> RiderFareState:
+        state = self._cached(card_id)
+        if state is not None:
+            return state
+
+        row = db.session.get(FareCapState, card_id, populate_existing=True)
+        if row is None:
+            return RiderFareState(card_id=card_id)
+
+        return RiderFareState(
+            card_id=card_id,
+            version=row.version,
+            **{f: getattr(row, f) for f in _FIELDS}
+        )
+
+    def write(self, new: RiderFareState, seen_version: int) -> RiderFareState | None:
+        """
+        Persist `new` if the stored row is still at seen_version.
+        Returns the state with its new version, or None on conflict.
+        """
+        values = {f: getattr(new, f) for f in _FIELDS}
+
+        if seen_version == 0:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(
+                        insert(FareCapState).values(card_id=new.card_id, version=1, **values)
+                    )
+            except IntegrityError:
+                return None
+            return replace(new, version=1)
+
+        result = db.session.execute(
+            update(FareCapState)
+            .where(
+                FareCapState.card_id == new.card_id,
+                FareCapState.version == seen_version
+            )
+            .values(version=seen_version + 1, **values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return None
+        return replace(new, version=seen_version + 1)
+
+    def write_many(self, changes) -> list[RiderFareState] | None:
+        """
+        Batch write(): changes is [(new, seen_version), ...], at most one
+        per card. One executemany insert for first-time cards, one
+        guarded executemany update for the rest. Returns the saved
+        states in order, or None if any row had moved (the caller rolls
+        back and reloads those cards).
+        """
+        table = FareCapState.__table__
+        first = [new for new, seen in changes if seen == 0]
+        moved = [(new, seen) for new, seen in changes if seen != 0]
+
+        if first:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(table), [
+                        dict(card_id=new.card_id, version=1, **{f: getattr(new, f) for f in _FIELDS})
+                        for new in first
+                    ])
+            except IntegrityError:
+                return None
+
+        if moved:
+            stmt = (
+                update(table)
+                .where(table.c.card_id == bindparam("b_card_id"), table.c.version == bindparam("b_seen"))
+                .values(version=bindparam("b_seen") + 1, **{f: bindparam(f"b_{f}") for f in _FIELDS})
+            )
+            rows = [
+                dict(b_card_id=new.card_id, b_seen=seen, **{f"b_{f}": getattr(new, f) for f in _FIELDS})
+                for new, seen in moved
+            ]
+
+            # executemany reports a total rowcount only on some drivers
+            if db.session.get_bind().dialect.supports_sane_multi_rowcount:
+                matched = db.session.execute(stmt, rows).rowcount == len(rows)
+            else:
+                matched = all(db.session.execute(stmt, row).rowcount == 1 for row in rows)
+            if not matched:
+                return None
+
+        return [replace(new, version=seen + 1) for new, seen in changes]
+
+
+store = FareStateStore()
+
+
+def price_with_caps(card_id, agency_id, base, started_at, ended_at):
+    """
+    base FareResult -> (charged FareResult, persisted RiderFareState).
+
+    Runs inside the caller's transaction; call store.remember(state)
+    once that transaction has committed.
+    """
+    policy = CapPolicy.from_config(current_app.config)
+
+    for _ in range(3):
+        state = store.load(card_id)
+        result, new_state = apply_caps(policy, state, base, agency_id, started_at, ended_at)
+
+        saved = store.write(new_state, state.version)
+        if saved is not None:
+            return result, saved
+
+        # Someone else moved this card's state: reload and re-price
+        store.forget(card_id)
+
+    raise FareCalculationError(f"Fare state for card {card_id} kept changing")
@@ -13,14 +13,19 @@ Rules:
 Public API:
 - FareContext
 - FareEngine
+- CapPolicy / RiderFareState / apply_caps (transfers + caps)
 """
 
 from .context import FareContext
 from .engine import FareEngine
 from .exceptions import FareCalculationError
+from .capping import CapPolicy, RiderFareState, apply_caps
 
 __all__ = [
     "FareContext",
     "FareEngine",
     "FareCalculationError",
+    "CapPolicy",
+    "RiderFareState",
+    "apply_caps",
 ]
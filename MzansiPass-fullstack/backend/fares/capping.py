@@ -0,0 +1,106 @@
+# fares/capping.py
+"""
+Transfer discounts and daily / weekly fare caps.
+
+Pricing pipeline per tap-out:
+
+    base rule (FareEngine) -> transfer window -> cap
+
+All of it works on a small per-card RiderFareState, so every step is
+O(1) - no trip history is read. Pure logic: persisting the state is
+the caller's job (see fare_state.py).
+"""
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+
+from .engine import FareResult
+
+# Riders are all on SAST (UTC+2, no DST): caps reset at local midnight
+SAST = timedelta(hours=2)
+
+
+@dataclass(frozen=True)
+class CapPolicy:
+    daily_cap: float
+    weekly_cap: float
+    transfer_window: timedelta
+    transfer_discount_pct: float
+    max_transfers: int = 2
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(
+            daily_cap=cfg["FARE_DAILY_CAP"],
+            weekly_cap=cfg["FARE_WEEKLY_CAP"],
+            transfer_window=timedelta(minutes=cfg["FARE_TRANSFER_WINDOW_MINUTES"]),
+            transfer_discount_pct=cfg["FARE_TRANSFER_DISCOUNT_PCT"],
+            max_transfers=cfg["FARE_MAX_TRANSFERS"],
+        )
+
+
+@dataclass(frozen=True)
+class RiderFareState:
+    card_id: str
+    day: date | None = None
+    day_total: float = 0.0
+    week_start: date | None = None
+    week_total: float = 0.0
+    last_tap_out_at: datetime | None = None
+    last_agency_id: int | None = None
+    chain_transfers: int = 0
+    # Optimistic-concurrency counter of the persisted row (0 = not stored yet)
+    version: int = 0
+
+
+def _week_start(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def apply_caps(policy: CapPolicy, state: RiderFareState, base: FareResult,
+               agency_id, started_at: datetime, ended_at: datetime):
+    """
+    Returns (FareResult actually charged, next RiderFareState).
+    Times are naive UTC; the cap day and week are SAST ones.
+    """
+    today = (ended_at + SAST).date()
+    week = _week_start(today)
+
+    day_total = state.day_total if state.day == today else 0.0
+    week_total = state.week_total if state.week_start == week else 0.0
+
+    amount = base.amount
+    breakdown = dict(base.breakdown or {})
+    breakdown["base_amount"] = base.amount
+
+    # Transfer: boarded another agency soon after the last tap-out
+    is_transfer = (
+        state.last_tap_out_at is not None
+        and state.last_agency_id != agency_id
+        and started_at - state.last_tap_out_at <= policy.transfer_window
+        and state.chain_transfers < policy.max_transfers
+    )
+    if is_transfer:
+        discount = round(amount * policy.transfer_discount_pct / 100, 2)
+        amount -= discount
+        breakdown["transfer_discount"] = discount
+
+    # Caps: never charge past what is left of the day / week allowance
+    remaining = min(policy.daily_cap - day_total, policy.weekly_cap - week_total)
+    if amount > remaining:
+        breakdown["capped_by"] = round(amount - max(remaining, 0.0), 2)
+        amount = max(remaining, 0.0)
+
+    amount = round(amount, 2)
+
+    next_state = replace(
+        state,
+        day=today,
+        day_total=round(day_total + amount, 2),
+        week_start=week,
+        week_total=round(week_total + amount, 2),
+        last_tap_out_at=ended_at,
+        last_agency_id=agency_id,
+        chain_transfers=state.chain_transfers + 1 if is_transfer else 0,
+    )
+
+    return FareResult(amount=amount, currency=base.currency, breakdown=breakdown), next_state
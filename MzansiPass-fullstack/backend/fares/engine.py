@@ -74,6 +74,22 @@ class FareEngine:
         # Placeholder – zone-based later
         return FareResult(amount=45.00)
 
+    # --------------------------------------------------
+    # Refunds
+    # --------------------------------------------------
+
+    @staticmethod
+    def refund(charged: float, share: float = 1.0) -> FareResult:
+        """
+        Credit for a fare hit by a service disruption: `share` of what
+        was charged, never more than the fare itself.
+        """
+        share = min(max(share, 0.0), 1.0)
+        return FareResult(
+            amount=round(charged * share, 2),
+            breakdown={"charged": charged, "share": share}
+        )
+
     # --------------------------------------------------
     # Utilities
     # --------------------------------------------------
@@ -0,0 +1,42 @@
+"""
+MzansiPass Fraud Detection
+--------------------------
+
+Streaming checks over tap events (impossible journeys, tap bursts
+across terminals), per-card sliding windows held in memory, findings
+written in batches to fraud_flags for review by agency admins.
+Blocks are written at once and confirmed against fraud_flags before a
+tap is refused, so dismissing a flag unblocks the card everywhere.
+
+Every tap path checks the location with valid_point() (400 otherwise)
+and calls screen_tap() before it writes anything:
+
+    verdict = screen_tap(TapEvent(card_id, "in", now, lat, lng, agency_id))
+    if verdict.blocked:
+        return 403
+
+Public API:
+- screen_tap(event)
+- TapEvent, Verdict, valid_point
+- detector, flag_buffer
+- fraud_bp
+"""
+
+from .detector import TapEvent, Verdict, FraudDetector, DetectorPolicy, detector, valid_point
+from .flags import FlagBuffer, flag_buffer, block_in_force
+from .screen import screen_tap
+from .routes import fraud_bp
+
+__all__ = [
+    "screen_tap",
+    "TapEvent",
+    "Verdict",
+    "valid_point",
+    "FraudDetector",
+    "DetectorPolicy",
+    "detector",
+    "FlagBuffer",
+    "flag_buffer",
+    "block_in_force",
+    "fraud_bp",
+]
@@ -0,0 +1,270 @@
+# fraud/detector.py
+"""
+Streaming anomaly detector over tap events.
+
+Each card keeps a short in-memory window of its recent taps and
+flags; every event is checked against that window only, so the cost
+per event is O(window) with a window of a handful of taps - a few
+microseconds, no DB access.
+
+Rules:
+- impossible_speed  consecutive located taps further apart than
+                    FRAUD_MIN_DISTANCE_KM at more than
+                    FRAUD_MAX_SPEED_KMH (block above
+                    FRAUD_BLOCK_SPEED_KMH)
+- tap_burst         more than FRAUD_BURST_TAPS tap-ins inside
+                    FRAUD_BURST_WINDOW_SECONDS from more than one
+                    terminal / operator
+
+A card collecting FRAUD_BLOCK_AFTER_FLAGS flags inside the window is
+blocked for FRAUD_BLOCK_SECONDS. Windows are per process; with taps
+sharded by card every card's window lives in one worker.
+"""
+import math
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from threading import Lock
+
+from flask import current_app
+
+from fares.engine import FareEngine
+from models import FraudRule, FraudAction
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(frozen=True)
+class DetectorPolicy:
+    max_speed_kmh: float
+    block_speed_kmh: float
+    min_distance_km: float
+    burst_taps: int
+    burst_window: float
+    block_after_flags: int
+    block_seconds: float
+    window: float
+    max_cards: int
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(
+            max_speed_kmh=cfg["FRAUD_MAX_SPEED_KMH"],
+            block_speed_kmh=cfg["FRAUD_BLOCK_SPEED_KMH"],
+            min_distance_km=cfg["FRAUD_MIN_DISTANCE_KM"],
+            burst_taps=cfg["FRAUD_BURST_TAPS"],
+            burst_window=cfg["FRAUD_BURST_WINDOW_SECONDS"],
+            block_after_flags=cfg["FRAUD_BLOCK_AFTER_FLAGS"],
+            block_seconds=cfg["FRAUD_BLOCK_SECONDS"],
+            window=cfg["FRAUD_WINDOW_SECONDS"],
+            max_cards=cfg["FRAUD_MAX_CARDS"],
+        )
+
+
+def valid_point(lat, lng) -> bool:
+    """
+    Each of lat / lng is None (no fix) or a finite number in range.
+    Taps are measured against the card's previous location, so one
+    garbled value in a window would break every later tap on the card.
+    """
+    return all(
+        value is None or (
+            isinstance(value, (int, float)) and not isinstance(value, bool)
+            and math.isfinite(value) and abs(value) <= limit
+        )
+        for value, limit in ((lat, 90), (lng, 180))
+    )
+
+
+@dataclass(frozen=True)
+class TapEvent:
+    card_id: str
+    kind: str                      # "in" | "out"
+    at: datetime
+    lat: float | None = None
+    lng: float | None = None
+    agency_id: int | None = None
+    terminal: str | None = None
+    user_id: int | None = None
+
+    def __post_init__(self):
+        # Routes answer 400 first (valid_point); this keeps a missed
+        # check from reaching the window
+        if not valid_point(self.lat, self.lng):
+            raise ValueError(f"invalid tap location {self.lat!r}, {self.lng!r}")
+        if self.agency_id is not None and (
+            not isinstance(self.agency_id, int) or isinstance(self.agency_id, bool)
+        ):
+            raise ValueError(f"invalid tap agency {self.agency_id!r}")
+
+    @property
+    def source(self):
+        return self.terminal or f"agency:{self.agency_id}"
+
+
+@dataclass(frozen=True)
+class Finding:
+    rule: FraudRule
+    action: FraudAction
+    detail: dict
+
+
+@dataclass(frozen=True)
+class Verdict:
+    blocked: bool = False
+    findings: tuple = ()
+
+    @property
+    def flagged(self):
+        return bool(self.findings)
+
+
+ALLOW = Verdict()
+
+
+@dataclass
+class _CardWindow:
+    # (ts, kind, lat, lng, source)
+    taps: deque = field(default_factory=deque)
+    flags: deque = field(default_factory=deque)
+    blocked_until: float = 0.0
+
+
+class FraudDetector:
+    def __init__(self):
+        self._lock = Lock()
+        self._cards = OrderedDict()
+
+    def _window(self, card_id, max_cards):
+        w = self._cards.get(card_id)
+        if w is None:
+            w = self._cards[card_id] = _CardWindow()
+            if len(self._cards) > max_cards:
+                self._cards.popitem(last=False)
+        else:
+            self._cards.move_to_end(card_id)
+        return w
+
+    def observe(self, event: TapEvent, policy: DetectorPolicy | None = None) -> Verdict:
+        """
+        Check one tap against the card's window, then add it.
+
+        Callers refuse a tap-in when verdict.blocked; tap-outs are only
+        recorded (refusing one would strand an open trip).
+        """
+        policy = policy or DetectorPolicy.from_config(current_app.config)
+        ts = (event.at - _EPOCH).total_seconds()
+
+        with self._lock:
+            w = self._window(event.card_id, policy.max_cards)
+
+            if w.blocked_until > ts:
+                return Verdict(blocked=True)
+
+            _expire(w.taps, ts - policy.window)
+            _expire(w.flags, ts - policy.window)
+
+            findings = []
+
+            speed = _speed_finding(policy, w.taps, event, ts)
+            if speed is not None:
+                findings.append(speed)
+
+            w.taps.append((ts, event.kind, event.lat, event.lng, event.source))
+
+            if event.kind == "in":
+                burst = _burst_finding(policy, w.taps, ts)
+                if burst is not None:
+                    findings.append(burst)
+
+            for _ in findings:
+                w.flags.append((ts,))
+
+            blocked = any(f.action is FraudAction.block for f in findings)
+            if findings and len(w.flags) >= policy.block_after_flags:
+                blocked = True
+            if blocked:
+                w.blocked_until = ts + policy.block_seconds
+
+        if not findings:
+            return ALLOW
+
+        if blocked:
+            findings = [
+                Finding(f.rule, FraudAction.block, f.detail) for f in findings
+            ]
+        return Verdict(blocked=blocked, findings=tuple(findings))
+
+    def unblock(self, card_id):
+        with self._lock:
+            w = self._cards.get(card_id)
+            if w is not None:
+                w.blocked_until = 0.0
+                w.flags.clear()
+
+    def reset(self):
+        with self._lock:
+            self._cards.clear()
+
+
+def _expire(window, cutoff):
+    while window and window[0][0] < cutoff:
+        window.popleft()
+
+
+def _speed_finding(policy, taps, event, ts):
+    if event.lat is None or event.lng is None:
+        return None
+
+    # Most recent located tap
+    for prev_ts, _, lat, lng, source in reversed(taps):
+        if lat is not None and lng is not None:
+            break
+    else:
+        return None
+
+    distance = FareEngine._distance_km(lat, lng, event.lat, event.lng)
+    if distance < policy.min_distance_km:
+        return None
+
+    seconds = max(ts - prev_ts, 1.0)
+    kmh = distance / seconds * 3600
+    if kmh <= policy.max_speed_kmh:
+        return None
+
+    return Finding(
+        FraudRule.impossible_speed,
+        FraudAction.block if kmh > policy.block_speed_kmh else FraudAction.flag,
+        {
+            "km": round(distance, 2),
+            "seconds": round(seconds, 1),
+            "kmh": round(kmh),
+            "from": [lat, lng, source],
+            "to": [event.lat, event.lng, event.source],
+        },
+    )
+
+
+def _burst_finding(policy, taps, ts):
+    cutoff = ts - policy.burst_window
+    tap_ins = [t for t in taps if t[1] == "in" and t[0] >= cutoff]
+
+    if len(tap_ins) <= policy.burst_taps:
+        return None
+
+    sources = {t[4] for t in tap_ins}
+    if len(sources) < 2:
+        return None
+
+    return Finding(
+        FraudRule.tap_burst,
+        FraudAction.flag,
+        {
+            "tap_ins": len(tap_ins),
+            "window_seconds": policy.burst_window,
+            "sources": sorted(sources),
+        },
+    )
+
+
+detector = FraudDetector()
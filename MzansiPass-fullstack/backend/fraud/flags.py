@@ -0,0 +1,152 @@
+# fraud/flags.py
+"""
+Batched writer for fraud_flags.
+
+The detector must not add a DB round trip to every suspicious tap, so
+findings are buffered and inserted with one executemany once
+FRAUD_FLUSH_BATCH rows are waiting or the oldest is FRAUD_FLUSH_SECONDS
+old; after_request (init_app) writes a buffer that has aged out even
+if no further flag arrives. Blocking findings are written at once:
+the fraud_flags row is what keeps the card blocked (block_in_force),
+so that a dismissal in any process lifts it. The insert runs on its
+own connection, on the pool of the tap's agency (tenancy/): it never
+joins, or rolls back with, the tap's transaction. A batch the table refuses is written row by row and the
+rows it still refuses are logged and dropped; only an unreachable
+database keeps rows queued for the next flush.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from threading import Lock
+
+from flask import current_app
+from sqlalchemy import exists, insert, select
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+
+from models import FraudFlag, FlagStatus, FraudAction
+from tenancy import tenant_engine
+
+log = logging.getLogger(__name__)
+
+
+class FlagBuffer:
+    def __init__(self):
+        self._lock = Lock()
+        self._rows = []
+        self._oldest = None
+
+    def init_app(self, app):
+        app.after_request(self._after_request)
+
+    def _after_request(self, response):
+        if self.due():
+            self.flush()
+        return response
+
+    def add(self, event, verdict):
+        created_at = datetime.utcnow()
+        rows = [{
+            "card_id": event.card_id,
+            "user_id": event.user_id,
+            "agency_id": event.agency_id,
+            "rule": f.rule,
+            "action": f.action,
+            "detail": f.detail,
+            "status": FlagStatus.open,
+            "created_at": created_at,
+        } for f in verdict.findings]
+
+        cfg = current_app.config
+        with self._lock:
+            self._rows.extend(rows)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = verdict.blocked or self._due(cfg)
+
+        if due:
+            self.flush()
+
+    def _due(self, cfg):
+        return self._oldest is not None and (
+            len(self._rows) >= cfg["FRAUD_FLUSH_BATCH"]
+            or time.monotonic() - self._oldest >= cfg["FRAUD_FLUSH_SECONDS"]
+        )
+
+    def due(self) -> bool:
+        with self._lock:
+            return self._due(current_app.config)
+
+    def flush(self) -> int:
+        with self._lock:
+            rows, self._rows, self._oldest = self._rows, [], None
+
+        if not rows:
+            return 0
+
+        by_agency = defaultdict(list)
+        for row in rows:
+            by_agency[row["agency_id"]].append(row)
+        return sum(
+            self._write(tenant_engine(agency_id), group)
+            for agency_id, group in by_agency.items()
+        )
+
+    def _write(self, engine, rows) -> int:
+        try:
+            self._insert(engine, rows)
+            return len(rows)
+        except OperationalError:
+            log.exception("could not write %d fraud flags, keeping them", len(rows))
+            self._requeue(rows)
+            return 0
+        except SQLAlchemyError:
+            log.exception("fraud flag batch refused, writing %d rows one by one", len(rows))
+
+        written = 0
+        for i, row in enumerate(rows):
+            try:
+                self._insert(engine, [row])
+                written += 1
+            except OperationalError:
+                self._requeue(rows[i:])
+                break
+            except SQLAlchemyError:
+                # Queued again, it would fail every later batch with it
+                log.exception("dropping fraud flag the table refuses: %r", row)
+        return written
+
+    @staticmethod
+    def _insert(engine, rows):
+        with engine.begin() as conn:
+            conn.execute(insert(FraudFlag.__table__), rows)
+
+    def _requeue(self, rows):
+        # The next flush retries them first
+        with self._lock:
+            self._rows[:0] = rows
+            self._oldest = self._oldest or time.monotonic()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+
+def block_in_force(card_id, at, block_seconds, agency_id=None) -> bool:
+    """
+    Whether fraud_flags still holds a block on card_id at `at`: a
+    blocking flag from the last block_seconds that no one dismissed.
+    Read on a connection of its own from the tapping agency's pool,
+    like the writes.
+    """
+    stmt = select(exists().where(
+        FraudFlag.card_id == card_id,
+        FraudFlag.action == FraudAction.block,
+        FraudFlag.status != FlagStatus.dismissed,
+        FraudFlag.created_at >= at - timedelta(seconds=block_seconds),
+    ))
+    with tenant_engine(agency_id).connect() as conn:
+        return conn.execute(stmt).scalar()
+
+
+flag_buffer = FlagBuffer()
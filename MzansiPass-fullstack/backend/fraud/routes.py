@@ -0,0 +1,101 @@
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from models import db, FraudFlag, FlagStatus
+from agency.decorators import agency_required
+from serialization import Shape, paginate
+from fraud.detector import detector
+from fraud.flags import flag_buffer
+
+fraud_bp = Blueprint(
+    "fraud",
+    __name__,
+    url_prefix="/api/fraud"
+)
+
+FLAG_ROW = Shape(
+    id=FraudFlag.id,
+    card_id=FraudFlag.card_id,
+    user_id=FraudFlag.user_id,
+    rule=FraudFlag.rule,
+    action=FraudFlag.action,
+    detail=FraudFlag.detail,
+    status=FraudFlag.status,
+    created_at=FraudFlag.created_at,
+    reviewed_at=FraudFlag.reviewed_at,
+)
+
+# ----------------------------------------------------
+# Helpers
+# ----------------------------------------------------
+
+def error(code, message, status=400):
+    return jsonify({
+        "error": code,
+        "message": message
+    }), status
+
+
+def parse_status(value):
+    try:
+        return FlagStatus(value)
+    except ValueError:
+        return None
+
+
+# ----------------------------------------------------
+# REVIEW QUEUE (AGENCY ADMIN DASHBOARD)
+# ----------------------------------------------------
+
+@fraud_bp.route("/flags", methods=["GET"])
+@agency_required(roles=["admin", "staff"])
+def list_flags():
+    agency_id = get_jwt()["agency_id"]
+
+    status = parse_status(request.args.get("status", "open"))
+    if status is None:
+        return error("invalid_request", "Unknown status")
+
+    page = int(request.args.get("page", 1))
+    per_page = min(int(request.args.get("per_page", 50)), 100)
+
+    # Show what this worker has buffered too
+    flag_buffer.flush()
+
+    stmt = (
+        FLAG_ROW.select()
+        .where(FraudFlag.agency_id == agency_id, FraudFlag.status == status)
+        .order_by(FraudFlag.created_at.desc())
+    )
+    items, meta = paginate(FLAG_ROW, stmt, page, per_page)
+
+    return jsonify({"items": items, "meta": meta})
+
+
+@fraud_bp.route("/flags/<int:flag_id>/review", methods=["POST"])
+@agency_required(roles=["admin"])
+def review_flag(flag_id):
+    agency_id = get_jwt()["agency_id"]
+    data = request.get_json() or {}
+
+    status = parse_status(data.get("status"))
+    if status not in (FlagStatus.dismissed, FlagStatus.confirmed):
+        return error("invalid_request", "status must be dismissed or confirmed")
+
+    flag = FraudFlag.query.filter_by(id=flag_id, agency_id=agency_id).first_or_404()
+
+    flag.status = status
+    flag.reviewed_at = datetime.utcnow()
+    flag.reviewed_by = get_jwt_identity().get("agency_user_id")
+
+    db.session.commit()
+
+    # A false positive must not keep the rider locked out. Other
+    # processes (tap shards) see the dismissal in fraud_flags.
+    if status is FlagStatus.dismissed:
+        detector.unblock(flag.card_id)
+
+    return jsonify({"id": flag.id, "status": flag.status.value})
+
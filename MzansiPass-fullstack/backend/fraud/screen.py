@@ -0,0 +1,29 @@
+# fraud/screen.py
+from flask import current_app
+
+from .detector import ALLOW, detector
+from .flags import flag_buffer, block_in_force
+
+
+def screen_tap(event):
+    """
+    Run one tap through the detector and queue any findings.
+
+    A block carried over from an earlier tap is confirmed against
+    fraud_flags first: the detector's window is per process, and a
+    dismissal in another process only reaches the table.
+    """
+    cfg = current_app.config
+    if not cfg["FRAUD_ENABLED"]:
+        return ALLOW
+
+    verdict = detector.observe(event)
+    if verdict.blocked and not verdict.flagged:
+        if block_in_force(event.card_id, event.at, cfg["FRAUD_BLOCK_SECONDS"], event.agency_id):
+            return verdict
+        detector.unblock(event.card_id)
+        verdict = detector.observe(event)
+
+    if verdict.flagged:
+        flag_buffer.add(event, verdict)
+    return verdict
@@ -0,0 +1,26 @@
+"""
+MzansiPass Loyalty
+------------------
+
+Points and challenge progress, accrued OFFLINE from the transactions
+ledger by a batch job - tap_out and top-ups never wait on loyalty.
+
+- engine.py    set-based accrual over an incremental id cursor
+- routes.py    cached per-user points / progress for the app
+- commands.py  `flask loyalty accrue` / `flask loyalty seed-challenges`
+
+Public API:
+- loyalty_bp
+- loyalty_cli
+- accrue
+"""
+
+from .engine import accrue
+from .routes import loyalty_bp
+from .commands import loyalty_cli
+
+__all__ = [
+    "loyalty_bp",
+    "loyalty_cli",
+    "accrue",
+]
@@ -0,0 +1,40 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from models import db, Challenge, ChallengeType, ChallengePeriod
+from loyalty.engine import accrue
+
+loyalty_cli = AppGroup("loyalty", help="Loyalty accrual jobs.")
+
+# Same catalogue as the frontend DEMO_CHALLENGES
+DEFAULT_CHALLENGES = [
+    ("ch-1", "First Five", "Take your first 5 trips to earn a big bonus.",
+     250, 5, ChallengeType.trip_count, ChallengePeriod.lifetime),
+    ("ch-2", "Weekly Rider", "Complete 10 trips in a single week.",
+     150, 10, ChallengeType.trip_count, ChallengePeriod.weekly),
+    ("ch-3", "Top-up Pro", "Top up a total of R500 across all your cards.",
+     100, 500, ChallengeType.top_up_amount, ChallengePeriod.lifetime),
+]
+
+
+@loyalty_cli.command("accrue")
+@click.option("--max-batches", type=int, default=None,
+              help="Stop after this many batches (default: until caught up).")
+def accrue_command(max_batches):
+    """Consume new ledger rows and update points / challenge progress."""
+    consumed = accrue(current_app.config, max_batches=max_batches)
+    click.echo(f"loyalty: consumed {consumed} transaction(s)")
+
+
+@loyalty_cli.command("seed-challenges")
+def seed_challenges_command():
+    """Insert the default challenges if they do not exist yet."""
+    for cid, title, desc, points, goal, ctype, period in DEFAULT_CHALLENGES:
+        if db.session.get(Challenge, cid) is None:
+            db.session.add(Challenge(
+                id=cid, title=title, description=desc, points=points,
+                goal=goal, type=ctype, period=period
+            ))
+    db.session.commit()
+    click.echo("loyalty: challenges seeded")
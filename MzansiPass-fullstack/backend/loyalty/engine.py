@@ -0,0 +1,300 @@
+# loyalty/engine.py
+"""
+Set-based loyalty accrual.
+
+Each batch covers transactions (cursor, hi] and is applied with a
+fixed number of INSERT ... SELECT / UPDATE statements, independent of
+how many users or transactions are in it:
+
+1. one LoyaltyEvent per user for the batch's trips, one per
+   newly successful top-up
+2. per active challenge: bump existing progress rows, insert missing
+   ones, award + flag completions
+3. add the batch's events to users.loyalty_points
+4. move the cursor to hi
+
+Everything happens in one DB transaction with the cursor row locked,
+so a crashed or concurrent run never double-counts.
+
+Trips are fare rows of a trip (meta.trip_id); PRASA ticket purchases
+are fare rows too but are not trips, and neither are the sweeper's
+max-fare charges for trips never tapped out (meta.reason no_tap_out).
+Top-ups start out pending and are only marked successful by
+/payment/verify, possibly after the cursor passed them, so they are
+not taken from the window: every batch rewards the successful top-ups
+(up to LOYALTY_BATCH_SIZE) created in the last LOYALTY_TOPUP_LOOKBACK_DAYS
+that have no top-up event yet, whatever their id. The lookback keeps
+that lookup a range scan of idx_transaction_type_time rather than a
+scan of the whole ledger; a top-up verified later than that earns no
+points.
+
+Weekly challenge weeks are SAST ones, like the fare caps' week.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, update, exists, func, literal, cast, and_
+from sqlalchemy import Integer, String
+
+from fares.capping import SAST
+from models import (
+    db, User, Transaction, TransactionType,
+    Challenge, ChallengeProgress, ChallengeType, ChallengePeriod,
+    LoyaltyEvent, LoyaltyEventType, ConsumerCursor
+)
+
+CURSOR_NAME = "loyalty"
+EPOCH = datetime(1970, 1, 1)
+
+
+def week_start(dt: datetime) -> datetime:
+    """
+    SAST Monday 00:00 of the week a naive UTC time falls in (a local
+    date stamp, as fare caps keep it, not a UTC instant).
+    """
+    local = dt + SAST
+    monday = local - timedelta(days=local.weekday())
+    return monday.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _event_type(value):
+    return literal(value, LoyaltyEvent.__table__.c.type.type)
+
+
+def _lock_cursor(session):
+    cursor = session.get(ConsumerCursor, CURSOR_NAME, with_for_update=True)
+    if cursor is None:
+        cursor = ConsumerCursor(name=CURSOR_NAME, position=0)
+        session.add(cursor)
+        session.flush()
+    return cursor
+
+
+def _window(lo, hi):
+    return and_(Transaction.id > lo, Transaction.id <= hi)
+
+
+def _successful_topup():
+    return and_(
+        Transaction.type == TransactionType.topup,
+        Transaction.meta["status"].as_string() == "success"
+    )
+
+
+def _trip_fare():
+    # Ticket purchases are fare rows without a trip; sweeper charges
+    # are for trips the rider never finished
+    return and_(
+        Transaction.type == TransactionType.fare,
+        Transaction.meta["trip_id"].as_integer().isnot(None),
+        Transaction.meta["reason"].as_string().is_distinct_from("no_tap_out")
+    )
+
+
+def _unrewarded_topups(session, since, limit) -> list[int]:
+    rewarded = exists().where(LoyaltyEvent.transaction_id == Transaction.id)
+    return session.execute(
+        select(Transaction.id)
+        .where(Transaction.created_at >= since, _successful_topup(), ~rewarded)
+        .order_by(Transaction.id)
+        .limit(limit)
+    ).scalars().all()
+
+
+def run_batch(session, cfg, now: datetime | None = None) -> int:
+    """
+    Accrue one batch. Returns the number of transactions consumed.
+    """
+    now = now or datetime.utcnow()
+    cursor = _lock_cursor(session)
+    lo = cursor.position
+
+    rows = session.execute(
+        select(Transaction.id, Transaction.created_at)
+        .where(
+            Transaction.id > lo,
+            Transaction.created_at <= now - timedelta(seconds=cfg["LOYALTY_SETTLE_SECONDS"])
+        )
+        .order_by(Transaction.id)
+        .limit(cfg["LOYALTY_BATCH_SIZE"])
+    ).all()
+
+    topup_ids = _unrewarded_topups(
+        session,
+        now - timedelta(days=cfg["LOYALTY_TOPUP_LOOKBACK_DAYS"]),
+        cfg["LOYALTY_BATCH_SIZE"]
+    )
+
+    if not rows and not topup_ids:
+        session.rollback()
+        return 0
+
+    hi = lo
+    consumed = 0
+    if rows:
+        # Keep a batch inside one week so weekly challenges share a period
+        week = week_start(rows[0].created_at)
+        next_week = week + timedelta(days=7)
+        for tx_id, created_at in rows:
+            if week_start(created_at) >= next_week:
+                break
+            hi = tx_id
+            consumed += 1
+    else:
+        # Late-verified top-ups only: they count in this week
+        week = week_start(now)
+
+    trips = and_(_window(lo, hi), _trip_fare())
+    topups = Transaction.id.in_(topup_ids)
+    per_trip = cfg["LOYALTY_POINTS_PER_TRIP"]
+    per_rand = cfg["LOYALTY_POINTS_PER_RAND_TOPUP"]
+
+    # Events above this id are the batch's (the cursor lock serialises batches)
+    before = session.execute(select(func.coalesce(func.max(LoyaltyEvent.id), 0))).scalar()
+
+    # 1. Base events
+    trip_count = func.count(Transaction.id)
+    session.execute(
+        insert(LoyaltyEvent).from_select(
+            ["user_id", "type", "description", "points", "batch_id", "created_at"],
+            select(
+                Transaction.user_id,
+                _event_type(LoyaltyEventType.trip),
+                cast(trip_count, String) + literal(" trip(s)"),
+                trip_count * per_trip,
+                literal(hi),
+                literal(now),
+            )
+            .where(trips)
+            .group_by(Transaction.user_id)
+        )
+    )
+
+    if topup_ids:
+        session.execute(
+            insert(LoyaltyEvent).from_select(
+                ["user_id", "type", "description", "points", "batch_id", "transaction_id", "created_at"],
+                select(
+                    Transaction.user_id,
+                    _event_type(LoyaltyEventType.topup),
+                    literal("Top-up R") + cast(Transaction.amount, String),
+                    cast(Transaction.amount * per_rand, Integer),
+                    literal(hi),
+                    Transaction.id,
+                    literal(now),
+                )
+                .where(topups)
+            )
+        )
+
+    # 2. Challenges
+    challenges = Challenge.query.filter_by(is_active=True).all()
+    for challenge in challenges:
+        relevant = trips if challenge.type == ChallengeType.trip_count else topups
+        _apply_challenge(session, challenge, relevant, week, hi, now)
+
+    # 3. Roll the batch's events into the users' balances
+    in_batch = LoyaltyEvent.id > before
+    batch_points = (
+        select(func.sum(LoyaltyEvent.points))
+        .where(in_batch, LoyaltyEvent.user_id == User.id)
+        .scalar_subquery()
+    )
+    session.execute(
+        update(User)
+        .where(User.id.in_(
+            select(LoyaltyEvent.user_id).where(in_batch)
+        ))
+        .values(loyalty_points=User.loyalty_points + func.coalesce(batch_points, 0))
+        .execution_options(synchronize_session=False)
+    )
+
+    # 4. Advance
+    cursor.position = hi
+    session.commit()
+    return consumed + len(topup_ids)
+
+
+def _apply_challenge(session, challenge, relevant, week, batch_id, now):
+    if challenge.type == ChallengeType.trip_count:
+        metric = func.count(Transaction.id)
+    else:
+        metric = func.sum(Transaction.amount)
+
+    period_start = week if challenge.period == ChallengePeriod.weekly else EPOCH
+    cp = ChallengeProgress
+    this_period = and_(
+        cp.challenge_id == challenge.id,
+        cp.period_start == period_start
+    )
+
+    per_user = (
+        select(metric)
+        .where(relevant, Transaction.user_id == cp.user_id)
+        .scalar_subquery()
+    )
+
+    # Existing progress rows first, then the users who have none yet
+    session.execute(
+        update(cp)
+        .where(
+            this_period,
+            cp.completed.is_(False),
+            cp.user_id.in_(select(Transaction.user_id).where(relevant))
+        )
+        .values(current=cp.current + func.coalesce(per_user, 0))
+        .execution_options(synchronize_session=False)
+    )
+
+    has_row = exists().where(this_period, cp.user_id == Transaction.user_id)
+    session.execute(
+        insert(cp).from_select(
+            ["user_id", "challenge_id", "period_start", "current", "completed"],
+            select(
+                Transaction.user_id,
+                literal(challenge.id),
+                literal(period_start),
+                metric,
+                literal(False),
+            )
+            .where(relevant, ~has_row)
+            .group_by(Transaction.user_id)
+        )
+    )
+
+    # Completions: award once, then flag
+    newly_done = and_(this_period, cp.completed.is_(False), cp.current >= challenge.goal)
+    session.execute(
+        insert(LoyaltyEvent).from_select(
+            ["user_id", "type", "description", "points", "batch_id", "created_at"],
+            select(
+                cp.user_id,
+                _event_type(LoyaltyEventType.bonus),
+                literal(f"Challenge completed: {challenge.title}"),
+                literal(challenge.points),
+                literal(batch_id),
+                literal(now),
+            ).where(newly_done)
+        )
+    )
+    session.execute(
+        update(cp)
+        .where(newly_done)
+        .values(completed=True, completed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def accrue(cfg, max_batches: int | None = None, now: datetime | None = None) -> int:
+    """
+    Run batches until the cursor catches up (or max_batches).
+    Returns the total number of transactions consumed.
+    """
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        consumed = run_batch(db.session, cfg, now=now)
+        if not consumed:
+            break
+        total += consumed
+        batches += 1
+    return total
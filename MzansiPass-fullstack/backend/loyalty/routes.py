@@ -0,0 +1,135 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+
+from flask import Blueprint, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from models import (
+    db, User, Challenge, ChallengeProgress, ChallengePeriod,
+    LoyaltyEvent, ConsumerCursor
+)
+from loyalty.engine import CURSOR_NAME, EPOCH, week_start
+
+loyalty_bp = Blueprint(
+    "loyalty",
+    __name__,
+    url_prefix="/api/loyalty"
+)
+
+# ----------------------------------------------------
+# Helpers
+# ----------------------------------------------------
+
+def iso(dt):
+    return dt.isoformat() if dt else None
+
+
+class ProgressCache:
+    """
+    Small per-process LRU of rendered progress payloads.
+
+    Entries are tagged with the accrual cursor position, so they go
+    stale the moment a new batch lands, or after LOYALTY_CACHE_SECONDS.
+    """
+
+    def __init__(self, max_entries=10_000):
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._max = max_entries
+
+    def get(self, user_id, version, ttl):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if not entry:
+                return None
+            cached_version, stored_at, payload = entry
+            if cached_version != version or time.monotonic() - stored_at > ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return payload
+
+    def put(self, user_id, version, payload):
+        with self._lock:
+            self._entries[user_id] = (version, time.monotonic(), payload)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self._max:
+                self._entries.popitem(last=False)
+
+
+progress_cache = ProgressCache()
+
+
+def build_progress(user_id: int) -> dict:
+    user = db.session.get(User, user_id)
+    this_week = week_start(datetime.utcnow())
+
+    challenges = Challenge.query.filter_by(is_active=True).all()
+    rows = {
+        (p.challenge_id, p.period_start): p
+        for p in ChallengeProgress.query.filter(
+            ChallengeProgress.user_id == user_id,
+            ChallengeProgress.period_start.in_([EPOCH, this_week])
+        )
+    }
+
+    progress = []
+    for c in challenges:
+        period = this_week if c.period == ChallengePeriod.weekly else EPOCH
+        row = rows.get((c.id, period))
+        progress.append({
+            "challengeId": c.id,
+            "current": row.current if row else 0,
+            "completed": row.completed if row else False,
+        })
+
+    events = (
+        LoyaltyEvent.query
+        .filter_by(user_id=user_id)
+        .order_by(LoyaltyEvent.created_at.desc())
+        .limit(20)
+        .all()
+    )
+
+    return {
+        "loyaltyPoints": user.loyalty_points if user else 0,
+        "challenges": [{
+            "id": c.id,
+            "title": c.title,
+            "description": c.description,
+            "points": c.points,
+            "goal": c.goal,
+            "type": c.type.value,
+        } for c in challenges],
+        "progress": progress,
+        "events": [{
+            "id": str(e.id),
+            "type": e.type.value,
+            "description": e.description,
+            "date": iso(e.created_at),
+            "points": e.points,
+        } for e in events],
+    }
+
+
+# ----------------------------------------------------
+# PER-USER PROGRESS
+# ----------------------------------------------------
+
+@loyalty_bp.route("/me", methods=["GET"])
+@jwt_required()
+def my_progress():
+    user_id = get_jwt_identity()["id"]
+
+    cursor = db.session.get(ConsumerCursor, CURSOR_NAME)
+    version = cursor.position if cursor else 0
+    ttl = current_app.config["LOYALTY_CACHE_SECONDS"]
+
+    payload = progress_cache.get(user_id, version, ttl)
+    if payload is None:
+        payload = build_progress(user_id)
+        progress_cache.put(user_id, version, payload)
+
+    return jsonify(payload)
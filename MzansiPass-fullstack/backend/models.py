@@ -3,7 +3,10 @@ from flask_bcrypt import Bcrypt
 from datetime import datetime
 import enum
 
-db = SQLAlchemy()
+from tenancy.session import TenantRoutingSession
+
+# Agency requests are routed to their tenant's engine (see tenancy/)
+db = SQLAlchemy(session_options={"class_": TenantRoutingSession})
 bcrypt = Bcrypt()
 
 # ======================================================
@@ -31,6 +34,8 @@ class TransactionType(enum.Enum):
     topup = "topup"
     fare = "fare"
     refund = "refund"
+    # Cash taken at an agency counter (no passenger wallet)
+    cash = "cash"
 
 
 # ======================================================
@@ -54,6 +59,9 @@ class User(db.Model):
 
     balance = db.Column(db.Float, default=0.0)
 
+    # Maintained by the loyalty accrual job, never on the request path
+    loyalty_points = db.Column(db.Integer, default=0, nullable=False)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Auth helpers
@@ -109,11 +117,24 @@ class TransportAgency(db.Model):
 
     is_active = db.Column(db.Boolean, default=True)
 
+    # Stale-trip sweeper settings; NULL falls back to Config defaults
+    stale_trip_hours = db.Column(db.Integer)
+    stale_trip_policy = db.Column(db.String(20))  # "charge_max" | "cancel"
+    max_fare = db.Column(db.Float)
+
     created_at = db.Column(
         db.DateTime,
         server_default=db.func.now()
     )
 
+    __table_args__ = (
+        # sweeper.engine.POLICIES
+        db.CheckConstraint(
+            "stale_trip_policy IN ('charge_max', 'cancel')",
+            name="ck_agency_stale_trip_policy"
+        ),
+    )
+
 
 # ======================================================
 # AGENCY USERS (PROVIDER PORTAL LOGIN)
@@ -222,6 +243,7 @@ class Trip(db.Model):
     __table_args__ = (
         db.Index("idx_trip_agency_time", "agency_id", "start_time"),
         db.Index("idx_trip_user_time", "user_id", "start_time"),
+        db.Index("idx_trip_agency_status_time", "agency_id", "status", "start_time"),
     )
 
     def complete_trip(self, end_lat, end_lng, fare: float):
@@ -244,10 +266,11 @@ class Transaction(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
 
+    # None only for cash counter sales
     user_id = db.Column(
         db.Integer,
         db.ForeignKey("users.id"),
-        nullable=False,
+        nullable=True,
         index=True
     )
 
@@ -280,4 +303,628 @@ class Transaction(db.Model):
     __table_args__ = (
         db.Index("idx_transaction_agency_time", "agency_id", "created_at"),
         db.Index("idx_transaction_user_time", "user_id", "created_at"),
+        db.Index("idx_transaction_type_time", "type", "created_at"),
+    )
+
+
+# ======================================================
+# TRANSIT ALERTS (OFFICIAL INCIDENTS + CROWD REPORTS)
+# ======================================================
+
+class AlertType(enum.Enum):
+    official = "official"
+    user_report = "user_report"
+
+
+class ReportCategory(enum.Enum):
+    crowded = "crowded"
+    delay = "delay"
+    hazard = "hazard"
+    info = "info"
+    other = "other"
+
+
+class TransitAlert(db.Model):
+    """
+    One row per clustered incident.
+
+    Crowd reports for the same provider, category and location cell
+    inside the dedup window are folded into a single row
+    (report_count++) instead of being stored individually.
+    cluster_key (provider, category, cell and dedup bucket, see
+    alerts.clustering) is unique, so two first reports racing each
+    other still open one row; official incidents leave it NULL.
+    """
+    __tablename__ = "transit_alerts"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    type = db.Column(
+        db.Enum(AlertType),
+        default=AlertType.user_report,
+        nullable=False
+    )
+
+    provider = db.Column(db.String(60))
+
+    category = db.Column(
+        db.Enum(ReportCategory),
+        nullable=False
+    )
+
+    # Grid cell the incident falls in ("lat_idx:lng_idx"), see alerts.clustering
+    cell = db.Column(db.String(40))
+    cluster_key = db.Column(db.String(160), unique=True)
+
+    lat = db.Column(db.Float)
+    lng = db.Column(db.Float)
+
+    title = db.Column(db.String(180), nullable=False)
+    description = db.Column(db.Text)
+
+    report_count = db.Column(db.Integer, default=1, nullable=False)
+
+    is_verified = db.Column(db.Boolean, default=False)
+    official_action = db.Column(db.String(255))
+
+    # Official incidents are owned by an agency
+    agency_id = db.Column(
+        db.Integer,
+        db.ForeignKey("transport_agencies.id"),
+        nullable=True
+    )
+
+    first_reported_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_reported_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    updated_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow
+    )
+
+    __table_args__ = (
+        db.Index(
+            "idx_alert_cluster",
+            "provider", "category", "cell", "last_reported_at"
+        ),
+    )
+
+
+# ======================================================
+# PRASA TICKETS (SIGNED, OFFLINE-VERIFIABLE)
+# ======================================================
+
+class PrasaTicketType(enum.Enum):
+    single = "single"
+    ret = "return"
+    weekly = "weekly"
+    monthly = "monthly"
+
+
+class TicketSource(enum.Enum):
+    app = "App"
+    counter = "Counter"
+
+
+class PrasaTicket(db.Model):
+    __tablename__ = "prasa_tickets"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Random 8-byte id (hex) embedded in the signed QR payload
+    ticket_ref = db.Column(db.String(16), unique=True, nullable=False)
+
+    # Null for counter sales to walk-in customers
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id"),
+        nullable=True,
+        index=True
+    )
+
+    agency_id = db.Column(
+        db.Integer,
+        db.ForeignKey("transport_agencies.id"),
+        nullable=True
+    )
+
+    ticket_type = db.Column(db.Enum(PrasaTicketType), nullable=False)
+    source = db.Column(db.Enum(TicketSource), nullable=False)
+
+    from_station = db.Column(db.String(80), nullable=False)
+    to_station = db.Column(db.String(80), nullable=False)
+
+    fare = db.Column(db.Float, nullable=False)
+
+    valid_from = db.Column(db.DateTime, nullable=False)
+    valid_until = db.Column(db.DateTime, nullable=False)
+
+    revoked_at = db.Column(db.DateTime, index=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    user = db.relationship("User", backref="prasa_tickets")
+
+
+# ======================================================
+# LOYALTY (CHALLENGES, POINTS, ACCRUAL CURSOR)
+# ======================================================
+
+class ChallengeType(enum.Enum):
+    trip_count = "trip_count"
+    top_up_amount = "top_up_amount"
+
+
+class ChallengePeriod(enum.Enum):
+    lifetime = "lifetime"
+    weekly = "weekly"
+
+
+class LoyaltyEventType(enum.Enum):
+    trip = "trip"
+    topup = "top-up"
+    bonus = "bonus"
+    redeem = "redeem"
+    contact = "contact"
+
+
+class Challenge(db.Model):
+    __tablename__ = "challenges"
+
+    id = db.Column(db.String(40), primary_key=True)
+
+    title = db.Column(db.String(120), nullable=False)
+    description = db.Column(db.String(255))
+
+    points = db.Column(db.Integer, nullable=False)
+    goal = db.Column(db.Float, nullable=False)
+
+    type = db.Column(db.Enum(ChallengeType), nullable=False)
+    period = db.Column(
+        db.Enum(ChallengePeriod),
+        default=ChallengePeriod.lifetime,
+        nullable=False
+    )
+
+    is_active = db.Column(db.Boolean, default=True)
+
+
+class ChallengeProgress(db.Model):
+    __tablename__ = "challenge_progress"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id"),
+        nullable=False
+    )
+
+    challenge_id = db.Column(
+        db.String(40),
+        db.ForeignKey("challenges.id"),
+        nullable=False
+    )
+
+    # Start of the week for weekly challenges, epoch for lifetime ones
+    period_start = db.Column(db.DateTime, nullable=False)
+
+    current = db.Column(db.Float, default=0, nullable=False)
+    completed = db.Column(db.Boolean, default=False, nullable=False)
+    completed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id", "challenge_id", "period_start",
+            name="uq_progress_user_challenge_period"
+        ),
+    )
+
+
+class LoyaltyEvent(db.Model):
+    """
+    Points ledger. Accrual writes one row per user, event type and
+    batch (not per transaction) for trips and bonuses, and one row per
+    top-up (transaction_id), which is how a top-up verified after the
+    cursor passed it is still found unrewarded. batch_id is the cursor
+    position the batch ended at.
+    """
+    __tablename__ = "loyalty_events"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id"),
+        nullable=False
+    )
+
+    type = db.Column(db.Enum(LoyaltyEventType), nullable=False)
+    description = db.Column(db.String(255))
+    points = db.Column(db.Integer, nullable=False)
+
+    batch_id = db.Column(db.Integer, index=True)
+
+    # Top-up events only: the transaction rewarded (at most once)
+    transaction_id = db.Column(
+        db.Integer,
+        db.ForeignKey("transactions.id"),
+        unique=True
+    )
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("idx_loyalty_user_time", "user_id", "created_at"),
+    )
+
+
+class ConsumerCursor(db.Model):
+    """
+    Incremental read position of a background consumer over an
+    append-only table (e.g. loyalty over transactions.id).
+    """
+    __tablename__ = "consumer_cursors"
+
+    name = db.Column(db.String(60), primary_key=True)
+    position = db.Column(db.BigInteger, default=0, nullable=False)
+    updated_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow
+    )
+
+
+# ======================================================
+# FARE CAP / TRANSFER STATE (ONE ROW PER CARD)
+# ======================================================
+
+class FareCapState(db.Model):
+    """
+    Rolling per-card pricing state, written through from the
+    in-process cache in fare_state.py. version guards concurrent
+    writers (optimistic locking).
+    """
+    __tablename__ = "fare_cap_state"
+
+    card_id = db.Column(db.String(120), primary_key=True)
+
+    day = db.Column(db.Date)
+    day_total = db.Column(db.Float, default=0.0, nullable=False)
+
+    week_start = db.Column(db.Date)
+    week_total = db.Column(db.Float, default=0.0, nullable=False)
+
+    last_tap_out_at = db.Column(db.DateTime)
+    last_agency_id = db.Column(db.Integer)
+    chain_transfers = db.Column(db.Integer, default=0, nullable=False)
+
+    version = db.Column(db.Integer, default=1, nullable=False)
+
+
+# ======================================================
+# FRAUD / ANOMALY REVIEW
+# ======================================================
+
+class FraudRule(enum.Enum):
+    impossible_speed = "impossible_speed"
+    tap_burst = "tap_burst"
+
+
+class FraudAction(enum.Enum):
+    flag = "flag"
+    block = "block"
+
+
+class FlagStatus(enum.Enum):
+    open = "open"
+    dismissed = "dismissed"
+    confirmed = "confirmed"
+
+
+class FraudFlag(db.Model):
+    """
+    One row per anomaly raised by the tap stream detector (fraud/),
+    inserted in batches; reviewed by agency admins.
+    """
+    __tablename__ = "fraud_flags"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    card_id = db.Column(db.String(120), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    agency_id = db.Column(db.Integer, db.ForeignKey("transport_agencies.id"))
+
+    rule = db.Column(db.Enum(FraudRule), nullable=False)
+    action = db.Column(db.Enum(FraudAction), nullable=False)
+
+    # Evidence: speed, distance, taps in window, terminals, ...
+    detail = db.Column(db.JSON, default=dict)
+
+    status = db.Column(
+        db.Enum(FlagStatus),
+        default=FlagStatus.open,
+        nullable=False
+    )
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    reviewed_at = db.Column(db.DateTime)
+    reviewed_by = db.Column(db.Integer, db.ForeignKey("agency_users.id"))
+
+    __table_args__ = (
+        db.Index("idx_fraud_flag_agency_status", "agency_id", "status", "created_at"),
+    )
+
+
+# ======================================================
+# OFFLINE TERMINAL SYNC
+# ======================================================
+
+class CardSyncEntry(db.Model):
+    """
+    Append-only log of card validity for offline validators. version
+    is the sync clock: a terminal at version V applies every entry
+    with version > V. Entries carry the card's absolute state, so
+    re-applying one is harmless.
+
+    version is given in commit order, as the writing transaction
+    commits (terminals/changes.py); it is NULL before that.
+    """
+    __tablename__ = "card_sync_log"
+
+    id = db.Column(
+        db.BigInteger().with_variant(db.Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True
+    )
+
+    version = db.Column(db.BigInteger, unique=True)
+
+    card_id = db.Column(db.String(120), nullable=False)
+    allowed = db.Column(db.Boolean, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class TapKind(enum.Enum):
+    tap_in = "in"
+    tap_out = "out"
+
+
+class OfflineTapStatus(enum.Enum):
+    applied = "applied"
+    rejected = "rejected"
+
+
+class OfflineTap(db.Model):
+    """
+    A tap accepted by a terminal while offline and uploaded later.
+    (agency, terminal, ref) makes re-uploads idempotent.
+    """
+    __tablename__ = "offline_taps"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    agency_id = db.Column(
+        db.Integer,
+        db.ForeignKey("transport_agencies.id"),
+        nullable=False
+    )
+    terminal_id = db.Column(db.String(60), nullable=False)
+    ref = db.Column(db.String(64), nullable=False)
+
+    card_id = db.Column(db.String(120), nullable=False, index=True)
+    kind = db.Column(db.Enum(TapKind), nullable=False)
+    tapped_at = db.Column(db.DateTime, nullable=False)
+    lat = db.Column(db.Float)
+    lng = db.Column(db.Float)
+
+    status = db.Column(db.Enum(OfflineTapStatus), nullable=False)
+    reason = db.Column(db.String(60))
+    trip_id = db.Column(db.Integer, db.ForeignKey("trips.id"))
+
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("agency_id", "terminal_id", "ref", name="uq_offline_tap_ref"),
+    )
+
+
+# ======================================================
+# ANALYTICS (PRE-AGGREGATED RIDERSHIP)
+# ======================================================
+
+class RidershipCube(db.Model):
+    """
+    Completed-trip counts and revenue at the finest grain the portal
+    slices on. Built incrementally from the fare ledger (analytics/);
+    portal queries read only this table, never trips.
+    """
+    __tablename__ = "ridership_cube"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    agency_id = db.Column(
+        db.Integer,
+        db.ForeignKey("transport_agencies.id"),
+        nullable=False
+    )
+    day = db.Column(db.Date, nullable=False)
+    hour = db.Column(db.SmallInteger, nullable=False)
+
+    # Station = nearest GTFS stop, or a grid cell without a feed
+    origin = db.Column(db.String(80), nullable=False)
+    destination = db.Column(db.String(80), nullable=False)
+    fare_band = db.Column(db.String(20), nullable=False)
+
+    trips = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0.0, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "agency_id", "day", "hour", "origin", "destination", "fare_band",
+            name="uq_ridership_cube_cell"
+        ),
+    )
+
+
+# ======================================================
+# BULK CARD PROVISIONING
+# ======================================================
+
+class ImportStatus(enum.Enum):
+    # Uploaded over HTTP, waiting for `flask cards process-imports`
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
+class CardImportJob(db.Model):
+    """
+    Progress + resume point of a bulk card import (provisioning/).
+    checkpoint counts CSV data rows whose chunk has committed; it is
+    written in the same transaction as the cards themselves.
+    """
+    __tablename__ = "card_import_jobs"
+
+    id = db.Column(db.String(32), primary_key=True)
+
+    agency_id = db.Column(db.Integer, db.ForeignKey("transport_agencies.id"))
+    source = db.Column(db.String(255))
+
+    status = db.Column(
+        db.Enum(ImportStatus),
+        default=ImportStatus.running,
+        nullable=False
+    )
+
+    checkpoint = db.Column(db.Integer, default=0, nullable=False)
+    imported = db.Column(db.Integer, default=0, nullable=False)
+    duplicates = db.Column(db.Integer, default=0, nullable=False)
+    rejected = db.Column(db.Integer, default=0, nullable=False)
+
+    # First CARD_IMPORT_MAX_ERRORS rejections: [line, card_number, reason]
+    errors = db.Column(db.JSON, default=list)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow
+    )
+
+
+# ======================================================
+# DISRUPTION REFUNDS
+# ======================================================
+
+class RefundStatus(enum.Enum):
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
+class RefundRun(db.Model):
+    """
+    Bulk refund for one incident (refunds/).
+
+    One run per incident; (cursor_time, cursor_id) is the last trip
+    examined and is committed with each chunk, so a run resumes
+    where it stopped. Each trip is refunded at most once, ever
+    (ledger reference refund_trip_<trip id>).
+    """
+    __tablename__ = "refund_runs"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    alert_id = db.Column(
+        db.Integer,
+        db.ForeignKey("transit_alerts.id"),
+        unique=True,
+        nullable=False
+    )
+
+    agency_id = db.Column(
+        db.Integer,
+        db.ForeignKey("transport_agencies.id"),
+        nullable=False,
+        index=True
+    )
+
+    # Trips that started inside the window ...
+    window_start = db.Column(db.DateTime, nullable=False)
+    window_end = db.Column(db.DateTime, nullable=False)
+
+    # ... and started or ended within radius_km of (lat, lng); NULL = whole agency
+    lat = db.Column(db.Float)
+    lng = db.Column(db.Float)
+    radius_km = db.Column(db.Float)
+
+    # Fraction of the fare refunded
+    share = db.Column(db.Float, default=1.0, nullable=False)
+
+    status = db.Column(
+        db.Enum(RefundStatus),
+        default=RefundStatus.pending,
+        nullable=False
+    )
+
+    cursor_time = db.Column(db.DateTime)
+    cursor_id = db.Column(db.Integer, default=0, nullable=False)
+
+    trips_refunded = db.Column(db.Integer, default=0, nullable=False)
+    amount_refunded = db.Column(db.Float, default=0.0, nullable=False)
+
+    created_by = db.Column(db.Integer, db.ForeignKey("agency_users.id"))
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+    updated_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow
+    )
+
+
+# ======================================================
+# TRANSACTIONAL OUTBOX
+# ======================================================
+
+class OutboxEvent(db.Model):
+    """
+    Domain events written in the same transaction as the change they
+    describe (outbox/). The relay publishes unpublished rows to the
+    event log and stamps published_at; consumers then tail the log
+    instead of scanning trips / transactions.
+    """
+    __tablename__ = "outbox_events"
+
+    id = db.Column(
+        db.BigInteger().with_variant(db.Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True
+    )
+
+    topic = db.Column(db.String(40), nullable=False)
+    type = db.Column(db.String(40), nullable=False)
+
+    # Ordering / partition key (card_id, user id)
+    key = db.Column(db.String(120))
+
+    payload = db.Column(db.JSON, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    published_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # The relay only ever reads the unpublished tail
+        db.Index(
+            "idx_outbox_unpublished", "id",
+            postgresql_where=db.text("published_at IS NULL"),
+            sqlite_where=db.text("published_at IS NULL")
+        ),
     )
@@ -0,0 +1,51 @@
+"""
+MzansiPass Event Outbox
+-----------------------
+
+Tap and payment events for downstream readers (portal dashboards,
+notifications, reporting) without polling trips / transactions.
+
+tap_in, tap_out (rider, terminal, offline and stale-trip auto-closes),
+verify_payment and refund credits (incident runs, revoked tickets) add
+a compact event to outbox_events in the same transaction as the
+change itself. `flask outbox relay --follow` publishes them in batches
+to the event log; readers tail a topic with their own committed offset.
+
+    topics   taps      tap_in, tap_out         key: card_id
+             payments  payment_verified,       key: user id
+                       refund
+
+- events.py   producers (emit, tap_in, tap_out, payment_verified, refund)
+- relay.py    batch relay, purge, Consumer
+- brokers.py  MemoryBroker (in-process bus), FileBroker (local log)
+
+Public API:
+- outbox_cli
+- emit, tap_in, tap_out, payment_verified, refund
+- relay, relay_batch, Consumer
+- MemoryBroker, FileBroker, get_broker
+"""
+
+from .events import emit, tap_in, tap_out, payment_verified, refund, TOPICS
+from .brokers import MemoryBroker, FileBroker, make_broker, get_broker
+from .relay import relay, relay_batch, purge, compact, Consumer
+from .commands import outbox_cli
+
+__all__ = [
+    "outbox_cli",
+    "emit",
+    "tap_in",
+    "tap_out",
+    "payment_verified",
+    "refund",
+    "TOPICS",
+    "relay",
+    "relay_batch",
+    "purge",
+    "compact",
+    "Consumer",
+    "MemoryBroker",
+    "FileBroker",
+    "make_broker",
+    "get_broker",
+]
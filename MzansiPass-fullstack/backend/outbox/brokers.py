@@ -0,0 +1,120 @@
+# outbox/brokers.py
+"""
+Event logs the relay publishes to.
+
+Both keep, per topic, an append-only log addressed by offsets, and
+per (consumer group, topic) a committed offset: a consumer reads from
+its offset and commits the offset returned by read() once it has
+handled the batch (at-least-once; events carry their outbox id for
+de-duplication).
+
+- MemoryBroker  in-process bus; subscribe() handlers run on publish
+- FileBroker    local broker stand-in: <dir>/<topic>.log JSON lines,
+                offsets are byte positions, committed offsets live in
+                <dir>/offsets/<group>.<topic>
+"""
+import json
+import os
+from collections import defaultdict
+from threading import Lock
+
+
+def _dumps(event):
+    return json.dumps(event, separators=(",", ":"), default=str)
+
+
+class MemoryBroker:
+    def __init__(self):
+        self._lock = Lock()
+        self._logs = defaultdict(list)
+        self._offsets = {}
+        self._handlers = defaultdict(list)
+
+    def publish(self, topic, events):
+        with self._lock:
+            self._logs[topic].extend(events)
+            handlers = list(self._handlers[topic])
+        for handler in handlers:
+            handler(events)
+
+    def subscribe(self, topic, handler):
+        with self._lock:
+            self._handlers[topic].append(handler)
+
+    def read(self, topic, offset, limit):
+        """-> (events, next offset)"""
+        with self._lock:
+            events = self._logs[topic][offset:offset + limit]
+        return events, offset + len(events)
+
+    def committed(self, group, topic) -> int:
+        return self._offsets.get((group, topic), 0)
+
+    def commit(self, group, topic, offset):
+        self._offsets[(group, topic)] = offset
+
+
+class FileBroker:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "offsets"), exist_ok=True)
+
+    def _log(self, topic):
+        return os.path.join(self.directory, f"{topic}.log")
+
+    def _offset_file(self, group, topic):
+        return os.path.join(self.directory, "offsets", f"{group}.{topic}")
+
+    def publish(self, topic, events):
+        # One O_APPEND write per batch
+        data = "".join(_dumps(e) + "\n" for e in events).encode()
+        with open(self._log(topic), "ab") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def read(self, topic, offset, limit):
+        """-> (events, next offset); a torn last line is left for later."""
+        try:
+            fh = open(self._log(topic), "rb")
+        except FileNotFoundError:
+            return [], offset
+
+        events = []
+        with fh:
+            fh.seek(offset)
+            while len(events) < limit:
+                line = fh.readline()
+                if not line.endswith(b"\n"):
+                    break
+                events.append(json.loads(line))
+                offset += len(line)
+        return events, offset
+
+    def committed(self, group, topic) -> int:
+        try:
+            with open(self._offset_file(group, topic)) as fh:
+                return int(fh.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def commit(self, group, topic, offset):
+        path = self._offset_file(group, topic)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            fh.write(str(offset))
+        os.replace(tmp, path)
+
+
+def make_broker(cfg):
+    if cfg["OUTBOX_BROKER"] == "memory":
+        return MemoryBroker()
+    return FileBroker(cfg["OUTBOX_LOG_DIR"])
+
+
+def get_broker(app):
+    """One broker per app (and so per process)."""
+    broker = app.extensions.get("outbox_broker")
+    if broker is None:
+        broker = app.extensions["outbox_broker"] = make_broker(app.config)
+    return broker
@@ -0,0 +1,49 @@
+import json
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from outbox.brokers import get_broker
+from outbox.relay import relay, purge, Consumer
+
+outbox_cli = AppGroup("outbox", help="Event outbox relay and log tools.")
+
+
+@outbox_cli.command("relay")
+@click.option("--follow", is_flag=True, help="Keep polling instead of exiting when drained.")
+@click.option("--max-batches", type=int, default=None,
+              help="Stop after this many batches.")
+def relay_command(follow, max_batches):
+    """Publish unpublished outbox events to the event log."""
+    published = relay(get_broker(current_app), current_app.config,
+                      follow=follow, max_batches=max_batches)
+    click.echo(f"outbox: published {published} event(s)")
+
+
+@outbox_cli.command("tail")
+@click.argument("topic")
+@click.option("--group", default="cli", show_default=True,
+              help="Consumer group whose offset is read and committed.")
+@click.option("--follow", is_flag=True, help="Keep waiting for new events.")
+def tail_command(topic, group, follow):
+    """Print a topic's events from the group's committed offset as JSON lines."""
+    consumer = Consumer(get_broker(current_app), group, topic)
+
+    while True:
+        events = consumer.poll()
+        for event in events:
+            click.echo(json.dumps(event, default=str))
+        consumer.commit()
+
+        if not events:
+            if not follow:
+                break
+            time.sleep(current_app.config["OUTBOX_POLL_SECONDS"])
+
+
+@outbox_cli.command("purge")
+def purge_command():
+    """Delete published events past OUTBOX_RETENTION_HOURS."""
+    click.echo(f"outbox: purged {purge(current_app.config)} event(s)")
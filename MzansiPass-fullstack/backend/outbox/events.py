@@ -0,0 +1,90 @@
+# outbox/events.py
+"""
+Producers. Each helper only adds an OutboxEvent to the session; the
+caller's commit makes the event and the change it describes durable
+together (or neither).
+"""
+from datetime import datetime
+
+from models import db, OutboxEvent
+
+TAPS = "taps"
+PAYMENTS = "payments"
+
+TOPICS = {
+    "tap_in": TAPS,
+    "tap_out": TAPS,
+    "payment_verified": PAYMENTS,
+    "refund": PAYMENTS,
+}
+
+
+def iso(dt):
+    return dt.isoformat() if dt else None
+
+
+def emit(type_, key, payload, session=None) -> OutboxEvent:
+    event = OutboxEvent(
+        topic=TOPICS[type_],
+        type=type_,
+        key=None if key is None else str(key),
+        payload=payload,
+        created_at=datetime.utcnow()
+    )
+    (session or db.session).add(event)
+    return event
+
+
+def tap_in(trip, terminal=None, offline=False):
+    """Call after the trip is flushed (its id is in the event)."""
+    return emit("tap_in", trip.card_id, {
+        "trip_id": trip.id,
+        "card_id": trip.card_id,
+        "user_id": trip.user_id,
+        "agency_id": trip.agency_id,
+        "at": iso(trip.start_time),
+        "lat": trip.start_lat,
+        "lng": trip.start_lng,
+        "terminal": terminal,
+        "offline": offline,
+    })
+
+
+def tap_out(trip, terminal=None, offline=False, auto_closed=False):
+    """auto_closed: the stale-trip sweeper ended it, no one tapped out."""
+    return emit("tap_out", trip.card_id, {
+        "trip_id": trip.id,
+        "card_id": trip.card_id,
+        "user_id": trip.user_id,
+        "agency_id": trip.agency_id,
+        "at": iso(trip.end_time),
+        "lat": trip.end_lat,
+        "lng": trip.end_lng,
+        "fare": trip.fare,
+        "seconds": round((trip.end_time - trip.start_time).total_seconds()),
+        "terminal": terminal,
+        "offline": offline,
+        "auto_closed": auto_closed,
+    })
+
+
+def payment_verified(tx, amount):
+    return emit("payment_verified", tx.user_id, {
+        "reference": tx.reference,
+        "user_id": tx.user_id,
+        "amount": amount,
+    })
+
+
+def refund(reference, user_id, amount, agency_id=None, **detail):
+    """
+    Money credited back to a wallet; detail says why (trip_id and
+    incident_id, ticket_ref, ...).
+    """
+    return emit("refund", user_id, {
+        "reference": reference,
+        "user_id": user_id,
+        "agency_id": agency_id,
+        "amount": amount,
+        **detail,
+    })
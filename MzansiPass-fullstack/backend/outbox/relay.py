@@ -0,0 +1,158 @@
+# outbox/relay.py
+"""
+Outbox relay and log consumers.
+
+relay_batch takes up to OUTBOX_BATCH_SIZE unpublished events in id
+order, publishes them to the broker grouped by topic, and stamps
+published_at in the same transaction. A crash between publish and
+commit re-publishes the batch: delivery is at-least-once, and
+consumers de-duplicate on the event id.
+
+Only one relay publishes at a time: each batch first locks the
+consumer_cursors row RELAY_LOCK (SKIP LOCKED), and a relay that finds
+it taken publishes nothing. Splitting batches between relays would let
+a later event of a key reach the log before an earlier one; a single
+publisher keeps each key's events in id order. Extra relays are
+standbys that take over when the active one stops.
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, OutboxEvent, ConsumerCursor
+from outbox.events import iso
+
+# consumer_cursors row held by the publishing relay
+RELAY_LOCK = "outbox_relay"
+
+
+def compact(event: OutboxEvent) -> dict:
+    return {
+        "id": event.id,
+        "type": event.type,
+        "key": event.key,
+        "at": iso(event.created_at),
+        "data": event.payload,
+    }
+
+
+def _claim_relay(session) -> bool:
+    """
+    Lock RELAY_LOCK until the batch commits. False if another relay has it.
+    """
+    held = session.execute(
+        select(ConsumerCursor.name)
+        .where(ConsumerCursor.name == RELAY_LOCK)
+        .with_for_update(skip_locked=True)
+    ).scalar()
+    if held is not None:
+        return True
+    if session.get(ConsumerCursor, RELAY_LOCK) is not None:
+        return False
+
+    # First run: the new row stays locked until commit
+    try:
+        with session.begin_nested():
+            session.add(ConsumerCursor(name=RELAY_LOCK, position=0))
+        return True
+    except IntegrityError:
+        return False
+
+
+def relay_batch(broker, limit) -> int:
+    """
+    Publish one batch. Returns the number of events published
+    (0 when another relay is publishing).
+    """
+    if not _claim_relay(db.session):
+        db.session.rollback()
+        return 0
+
+    events = db.session.execute(
+        select(OutboxEvent)
+        .where(OutboxEvent.published_at.is_(None))
+        .order_by(OutboxEvent.id)
+        .limit(limit)
+    ).scalars().all()
+
+    if not events:
+        db.session.rollback()
+        return 0
+
+    by_topic = defaultdict(list)
+    for event in events:
+        by_topic[event.topic].append(compact(event))
+
+    for topic, batch in by_topic.items():
+        broker.publish(topic, batch)
+
+    db.session.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id.in_([e.id for e in events]))
+        .values(published_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return len(events)
+
+
+def relay(broker, cfg, follow=False, max_batches=None) -> int:
+    """
+    Publish until the outbox is drained (or forever with follow).
+    Returns the number of events published.
+    """
+    total = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        published = relay_batch(broker, cfg["OUTBOX_BATCH_SIZE"])
+        total += published
+        batches += 1
+
+        if published < cfg["OUTBOX_BATCH_SIZE"]:
+            if not follow:
+                break
+            time.sleep(cfg["OUTBOX_POLL_SECONDS"])
+
+    return total
+
+
+def purge(cfg) -> int:
+    """Delete published events past OUTBOX_RETENTION_HOURS."""
+    cutoff = datetime.utcnow() - timedelta(hours=cfg["OUTBOX_RETENTION_HOURS"])
+    deleted = db.session.execute(
+        delete(OutboxEvent).where(
+            OutboxEvent.published_at.isnot(None),
+            OutboxEvent.published_at < cutoff
+        )
+    ).rowcount
+    db.session.commit()
+    return deleted
+
+
+class Consumer:
+    """
+    Tails one topic for a consumer group from its committed offset.
+
+        consumer = Consumer(broker, "dashboards", "taps")
+        for event in consumer.poll():
+            ...
+        consumer.commit()
+    """
+
+    def __init__(self, broker, group, topic):
+        self.broker = broker
+        self.group = group
+        self.topic = topic
+        self.offset = broker.committed(group, topic)
+        self._next = self.offset
+
+    def poll(self, limit=500) -> list[dict]:
+        events, self._next = self.broker.read(self.topic, self._next, limit)
+        return events
+
+    def commit(self):
+        self.broker.commit(self.group, self.topic, self._next)
+        self.offset = self._next
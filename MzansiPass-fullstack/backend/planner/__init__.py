@@ -0,0 +1,22 @@
+"""
+MzansiPass Journey Planner
+--------------------------
+
+Server-side multimodal planner over local GTFS-style feeds.
+
+- gtfs.py    loads stops / routes / trips / stop_times / transfers
+             into a compact in-memory TransitGraph (loaded once per
+             process) with walking transfers precomputed
+- raptor.py  round-based earliest-arrival search (RAPTOR), pure logic
+- options.py prices journeys through FareEngine and picks the
+             Recommended / Fastest / Cheapest options
+
+Public API:
+- planner_bp
+"""
+
+from .routes import planner_bp
+
+__all__ = [
+    "planner_bp",
+]
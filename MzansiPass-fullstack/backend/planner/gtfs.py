@@ -0,0 +1,272 @@
+# planner/gtfs.py
+"""
+GTFS-style feed loader.
+
+Reads the plain CSV files of a GTFS directory into a TransitGraph:
+
+- stops are dense ints (0..n-1)
+- trips sharing a route and an identical stop sequence are grouped
+  into a Pattern; per stop position we keep one sorted array of
+  departures/arrivals across the pattern's trips, so boarding is a
+  bisect instead of a scan
+- walking transfers between nearby stops are precomputed once at load
+  time (plus any explicit transfers.txt entries)
+
+Calendars are not modelled yet: every trip is assumed to run daily.
+"""
+import csv
+import os
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass, field
+from threading import Lock
+
+from fares.engine import FareEngine
+
+
+class FeedError(ValueError):
+    """The feed files exist but cannot be parsed."""
+
+
+@dataclass
+class Pattern:
+    route_id: str
+    route_name: str
+    agency: str
+    headsign: str
+    stops: tuple
+    # departures[pos][trip_idx] / arrivals[pos][trip_idx], seconds after midnight
+    departures: list = field(default_factory=list)
+    arrivals: list = field(default_factory=list)
+
+    @property
+    def trip_count(self) -> int:
+        return len(self.departures[0]) if self.departures else 0
+
+
+@dataclass
+class TransitGraph:
+    stop_ids: list
+    stop_names: list
+    stop_lat: array
+    stop_lng: array
+    patterns: list
+    # stop -> [(pattern_idx, position_in_pattern)]
+    stop_patterns: list
+    # stop -> [(to_stop, seconds)]
+    transfers: list
+    _by_name: dict = field(default_factory=dict)
+
+    @property
+    def stop_count(self) -> int:
+        return len(self.stop_ids)
+
+    def find_stop(self, query: str):
+        """
+        Resolve a stop by GTFS id or (case-insensitive) name.
+        """
+        if query is None:
+            return None
+        key = query.strip().lower()
+        return self._by_name.get(key)
+
+
+# ----------------------------------------------------
+# Parsing helpers
+# ----------------------------------------------------
+
+def parse_time(value: str) -> int:
+    # GTFS allows hours >= 24 for trips running past midnight
+    h, m, s = value.strip().split(":")
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+
+def _read(path, name, required=True):
+    full = os.path.join(path, name)
+    if not os.path.exists(full):
+        if required:
+            raise FileNotFoundError(full)
+        return []
+    with open(full, newline="", encoding="utf-8-sig") as fh:
+        return list(csv.DictReader(fh))
+
+
+# ----------------------------------------------------
+# Loader
+# ----------------------------------------------------
+
+def load_graph(path: str, walk_radius_m: float = 400.0,
+               walk_speed_mps: float = 1.3) -> TransitGraph:
+    """
+    Raises FileNotFoundError for a missing required file, FeedError
+    for a malformed one (missing column, bad time, unknown stop id).
+    """
+    try:
+        return _load(path, walk_radius_m, walk_speed_mps)
+    except (KeyError, ValueError, IndexError, csv.Error) as exc:
+        raise FeedError(f"unreadable GTFS feed in {path}: {exc!r}") from exc
+
+
+def _load(path, walk_radius_m, walk_speed_mps) -> TransitGraph:
+    agencies = {
+        row.get("agency_id", ""): row["agency_name"]
+        for row in _read(path, "agency.txt", required=False)
+    }
+
+    # Stops
+    stop_ids, stop_names = [], []
+    stop_lat, stop_lng = array("d"), array("d")
+    index = {}
+    for row in _read(path, "stops.txt"):
+        index[row["stop_id"]] = len(stop_ids)
+        stop_ids.append(row["stop_id"])
+        stop_names.append(row["stop_name"])
+        stop_lat.append(float(row["stop_lat"]))
+        stop_lng.append(float(row["stop_lon"]))
+
+    # Routes
+    routes = {}
+    for row in _read(path, "routes.txt"):
+        agency = agencies.get(row.get("agency_id", ""), row.get("agency_id", ""))
+        if not agency and len(agencies) == 1:
+            agency = next(iter(agencies.values()))
+        routes[row["route_id"]] = (
+            row.get("route_short_name") or row.get("route_long_name") or row["route_id"],
+            agency,
+        )
+
+    trips = {
+        row["trip_id"]: (row["route_id"], row.get("trip_headsign", ""))
+        for row in _read(path, "trips.txt")
+    }
+
+    # Stop times grouped per trip
+    per_trip = defaultdict(list)
+    for row in _read(path, "stop_times.txt"):
+        dep = row.get("departure_time") or row.get("arrival_time")
+        arr = row.get("arrival_time") or dep
+        per_trip[row["trip_id"]].append((
+            int(row["stop_sequence"]),
+            index[row["stop_id"]],
+            parse_time(arr),
+            parse_time(dep),
+        ))
+
+    # Group trips into patterns
+    grouped = defaultdict(list)
+    for trip_id, times in per_trip.items():
+        if trip_id not in trips or len(times) < 2:
+            continue
+        times.sort()
+        route_id, headsign = trips[trip_id]
+        key = (route_id, tuple(t[1] for t in times))
+        grouped[key].append((times[0][3], headsign, times))
+
+    patterns = []
+    stop_patterns = [[] for _ in stop_ids]
+    for (route_id, seq), members in grouped.items():
+        members.sort(key=lambda m: m[0])
+        route_name, agency = routes.get(route_id, (route_id, ""))
+        pattern = Pattern(
+            route_id=route_id,
+            route_name=route_name,
+            agency=agency,
+            headsign=members[0][1],
+            stops=seq,
+            departures=[array("i") for _ in seq],
+            arrivals=[array("i") for _ in seq],
+        )
+        for _, _, times in members:
+            for pos, (_, _, arr, dep) in enumerate(times):
+                pattern.arrivals[pos].append(arr)
+                pattern.departures[pos].append(dep)
+
+        p_idx = len(patterns)
+        patterns.append(pattern)
+        for pos, stop in enumerate(seq):
+            stop_patterns[stop].append((p_idx, pos))
+
+    transfers = _build_transfers(
+        path, index, stop_lat, stop_lng, walk_radius_m, walk_speed_mps
+    )
+
+    by_name = {}
+    for i, (sid, name) in enumerate(zip(stop_ids, stop_names)):
+        by_name.setdefault(name.strip().lower(), i)
+        by_name[sid.strip().lower()] = i
+
+    return TransitGraph(
+        stop_ids=stop_ids,
+        stop_names=stop_names,
+        stop_lat=stop_lat,
+        stop_lng=stop_lng,
+        patterns=patterns,
+        stop_patterns=stop_patterns,
+        transfers=transfers,
+        _by_name=by_name,
+    )
+
+
+def _build_transfers(path, index, stop_lat, stop_lng,
+                     walk_radius_m, walk_speed_mps):
+    """
+    Precompute footpaths between stops within walk_radius_m.
+
+    Stops are bucketed on a grid roughly the size of the radius so only
+    neighbouring cells are compared, instead of all n^2 pairs.
+    """
+    n = len(stop_lat)
+    transfers = [dict() for _ in range(n)]
+
+    if walk_radius_m > 0:
+        cell = walk_radius_m / 111_000  # degrees, good enough at SA latitudes
+        grid = defaultdict(list)
+        for i in range(n):
+            grid[(int(stop_lat[i] // cell), int(stop_lng[i] // cell))].append(i)
+
+        for (cx, cy), members in grid.items():
+            neighbours = [
+                j
+                for dx in (-1, 0, 1)
+                for dy in (-1, 0, 1)
+                for j in grid.get((cx + dx, cy + dy), ())
+            ]
+            for i in members:
+                for j in neighbours:
+                    if i == j:
+                        continue
+                    metres = FareEngine._distance_km(
+                        stop_lat[i], stop_lng[i], stop_lat[j], stop_lng[j]
+                    ) * 1000
+                    if metres <= walk_radius_m:
+                        transfers[i][j] = int(metres / walk_speed_mps)
+
+    # Explicit transfers override computed walking times
+    for row in _read(path, "transfers.txt", required=False):
+        a = index.get(row["from_stop_id"])
+        b = index.get(row["to_stop_id"])
+        if a is None or b is None or a == b or row.get("transfer_type") == "3":
+            continue
+        transfers[a][b] = int(row.get("min_transfer_time") or 0)
+
+    return [sorted(t.items()) for t in transfers]
+
+
+# ----------------------------------------------------
+# Process-wide cache
+# ----------------------------------------------------
+
+_graph = None
+_graph_lock = Lock()
+
+
+def get_graph(path: str, **kwargs) -> TransitGraph:
+    """
+    Load the graph once per worker process; later calls are free.
+    """
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = load_graph(path, **kwargs)
+    return _graph
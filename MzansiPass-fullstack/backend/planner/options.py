@@ -0,0 +1,142 @@
+# planner/options.py
+"""
+Turn raw RAPTOR journeys into frontend RouteOption dicts.
+
+Every ride leg is priced through FareEngine; legs on agencies the
+engine does not support yet leave the journey unpriced (totalFare
+null) rather than inventing a number.
+"""
+from datetime import datetime, timedelta
+
+from fares.engine import FareEngine, FareContext
+
+
+def _clock(service_day: datetime, secs: int) -> datetime:
+    return service_day + timedelta(seconds=secs)
+
+
+def format_duration(secs: int) -> str:
+    # Matches the frontend's "55 min" / "1 hr 15 min"
+    minutes = max(1, round(secs / 60))
+    hours, minutes = divmod(minutes, 60)
+    if hours and minutes:
+        return f"{hours} hr {minutes} min"
+    if hours:
+        return f"{hours} hr"
+    return f"{minutes} min"
+
+
+def price_journey(graph, journey, service_day: datetime):
+    """
+    Returns (total, per_leg) where per_leg aligns with journey.legs.
+    """
+    total = 0.0
+    per_leg = []
+    for leg in journey.legs:
+        if leg.kind != "ride":
+            per_leg.append(0.0)
+            continue
+
+        pattern = graph.patterns[leg.pattern]
+        try:
+            result = FareEngine.calculate(FareContext(
+                agency=pattern.agency,
+                start_lat=graph.stop_lat[leg.from_stop],
+                start_lng=graph.stop_lng[leg.from_stop],
+                end_lat=graph.stop_lat[leg.to_stop],
+                end_lng=graph.stop_lng[leg.to_stop],
+                start_time=_clock(service_day, leg.depart),
+                end_time=_clock(service_day, leg.arrive),
+            ))
+        except ValueError:
+            per_leg.append(None)
+            total = None
+            continue
+
+        per_leg.append(result.amount)
+        if total is not None:
+            total += result.amount
+
+    return (round(total, 2) if total is not None else None), per_leg
+
+
+def _step(graph, leg, fare, service_day):
+    frm = graph.stop_names[leg.from_stop]
+    to = graph.stop_names[leg.to_stop]
+
+    if leg.kind == "walk":
+        return {
+            "provider": None,
+            "mode": "walk",
+            "from": frm,
+            "to": to,
+            "instruction": f"Walk to {to} ({format_duration(leg.arrive - leg.depart)}).",
+        }
+
+    pattern = graph.patterns[leg.pattern]
+    departs = _clock(service_day, leg.depart).strftime("%H:%M")
+    towards = f" towards {pattern.headsign}" if pattern.headsign else ""
+    return {
+        "provider": pattern.agency,
+        "mode": "ride",
+        "from": frm,
+        "to": to,
+        "route": pattern.route_name,
+        "departs": departs,
+        "fare": fare,
+        "instruction": f"Take {pattern.route_name}{towards} at {departs}, get off at {to}.",
+    }
+
+
+def build_options(graph, journeys, service_day: datetime,
+                  transfer_penalty: int = 300, seconds_per_rand: int = 60):
+    """
+    Pick Recommended / Fastest / Cheapest from the Pareto set.
+
+    Recommended minimises arrival + transfer_penalty per extra vehicle
+    + fare weighted at seconds_per_rand. A journey that wins several
+    tags is returned once, under the first tag it won.
+    """
+    if not journeys:
+        return []
+
+    priced = [(j, *price_journey(graph, j, service_day)) for j in journeys]
+
+    def generalised(item):
+        j, total, _ = item
+        cost = j.arrive + transfer_penalty * (j.rides - 1)
+        if total is not None:
+            cost += total * seconds_per_rand
+        return cost
+
+    fastest = min(priced, key=lambda i: (i[0].arrive, i[0].rides))
+    fare_known = [i for i in priced if i[1] is not None]
+    cheapest = min(fare_known, key=lambda i: (i[1], i[0].arrive)) if fare_known else None
+    # Unpriced journeys would win on cost by default, so prefer priced ones
+    recommended = min(fare_known or priced, key=generalised)
+
+    picks = [
+        ("Recommended", "Balanced Route", recommended),
+        ("Fastest", "Fastest Route", fastest),
+        ("Cheapest", "Cheapest Option", cheapest),
+    ]
+
+    options, seen = [], set()
+    for tag, title, item in picks:
+        if item is None or id(item[0]) in seen:
+            continue
+        seen.add(id(item[0]))
+        journey, total, per_leg = item
+        options.append({
+            "title": title,
+            "tag": tag,
+            "totalFare": total,
+            "travelTime": format_duration(journey.duration),
+            "arrival": _clock(service_day, journey.arrive).strftime("%H:%M"),
+            "steps": [
+                _step(graph, leg, fare, service_day)
+                for leg, fare in zip(journey.legs, per_leg)
+            ],
+        })
+
+    return options
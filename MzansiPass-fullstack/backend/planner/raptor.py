@@ -0,0 +1,163 @@
+# planner/raptor.py
+"""
+RAPTOR (Round-bAsed Public Transit Optimized Router).
+
+Round k finds the earliest arrival at every stop using at most k
+vehicles. The search returns one journey per round that improves the
+arrival at the destination, i.e. the Pareto set over
+(arrival time, number of vehicles).
+
+Pure logic: works on a planner.gtfs.TransitGraph, no Flask / DB.
+"""
+from bisect import bisect_left
+from dataclasses import dataclass
+
+INF = 1 << 30
+
+
+@dataclass(frozen=True)
+class Leg:
+    kind: str          # "ride" | "walk"
+    from_stop: int
+    to_stop: int
+    depart: int        # seconds after midnight
+    arrive: int
+    pattern: int = -1  # ride legs only
+
+
+@dataclass(frozen=True)
+class Journey:
+    legs: tuple
+    depart: int
+    arrive: int
+
+    @property
+    def rides(self) -> int:
+        return sum(1 for leg in self.legs if leg.kind == "ride")
+
+    @property
+    def duration(self) -> int:
+        return self.arrive - self.depart
+
+
+def search(graph, origin: int, destination: int, depart: int,
+           max_rides: int = 4, min_change: int = 120):
+    n = graph.stop_count
+    best = [INF] * n
+    # labels[k][stop] / parents[k][stop]
+    labels = [[INF] * n]
+    parents = [[None] * n]
+
+    labels[0][origin] = depart
+    best[origin] = depart
+    marked = {origin}
+
+    # Walking from the origin counts as round 0
+    for to, secs in graph.transfers[origin]:
+        if depart + secs < best[to]:
+            labels[0][to] = best[to] = depart + secs
+            parents[0][to] = ("walk", origin, 0)
+            marked.add(to)
+
+    for k in range(1, max_rides + 1):
+        prev = labels[k - 1]
+        prev_par = parents[k - 1]
+        # Labels carry over between rounds; parents record their own round
+        cur = prev[:]
+        par = parents[k - 1][:]
+        labels.append(cur)
+        parents.append(par)
+
+        # Earliest marked position per pattern
+        queue = {}
+        for stop in marked:
+            for p_idx, pos in graph.stop_patterns[stop]:
+                if pos < queue.get(p_idx, INF):
+                    queue[p_idx] = pos
+
+        change = min_change if k > 1 else 0
+        new_marked = set()
+
+        for p_idx, start in queue.items():
+            pattern = graph.patterns[p_idx]
+            stops = pattern.stops
+            trip = -1
+            board_pos = -1
+
+            for pos in range(start, len(stops)):
+                stop = stops[pos]
+
+                if trip >= 0:
+                    arr = pattern.arrivals[pos][trip]
+                    if arr < best[stop] and arr < best[destination]:
+                        cur[stop] = best[stop] = arr
+                        par[stop] = ("ride", p_idx, trip, board_pos, pos, k)
+                        new_marked.add(stop)
+
+                ready = prev[stop]
+                if ready >= INF:
+                    continue
+                # A footpath's time already covers the change
+                walked = prev_par[stop] is not None and prev_par[stop][0] == "walk"
+                ready += 0 if walked else change
+                if trip >= 0 and ready > pattern.departures[pos][trip]:
+                    continue
+
+                t = bisect_left(pattern.departures[pos], ready)
+                if t < pattern.trip_count and (trip < 0 or t < trip):
+                    trip = t
+                    board_pos = pos
+
+        # Footpaths
+        for stop in list(new_marked):
+            base = cur[stop]
+            for to, secs in graph.transfers[stop]:
+                arr = base + secs
+                if arr < best[to] and arr < best[destination]:
+                    cur[to] = best[to] = arr
+                    par[to] = ("walk", stop, k)
+                    new_marked.add(to)
+
+        marked = new_marked
+        if not marked:
+            break
+
+    journeys = []
+    last = INF
+    for k in range(len(labels)):
+        arr = labels[k][destination]
+        if arr < last:
+            journeys.append(_reconstruct(graph, labels, parents, k, destination, depart))
+            last = arr
+
+    return [j for j in journeys if j.rides > 0]
+
+
+def _reconstruct(graph, labels, parents, k, stop, depart):
+    legs = []
+    while True:
+        parent = parents[k][stop]
+        if parent is None:
+            break
+
+        if parent[0] == "walk":
+            _, src, k = parent
+            legs.append(Leg("walk", src, stop, labels[k][src], labels[k][stop]))
+            stop = src
+            continue
+
+        _, p_idx, trip, board_pos, alight_pos, k = parent
+        pattern = graph.patterns[p_idx]
+        src = pattern.stops[board_pos]
+        legs.append(Leg(
+            "ride", src, stop,
+            pattern.departures[board_pos][trip],
+            pattern.arrivals[alight_pos][trip],
+            p_idx,
+        ))
+        stop = src
+        k -= 1
+
+    legs.reverse()
+    arrive = legs[-1].arrive if legs else depart
+    return Journey(legs=tuple(legs), depart=depart, arrive=arrive)
@@ -0,0 +1,90 @@
+import time
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify, current_app
+
+from planner.gtfs import get_graph, FeedError
+from planner.raptor import search
+from planner.options import build_options
+
+planner_bp = Blueprint(
+    "planner",
+    __name__,
+    url_prefix="/api/planner"
+)
+
+# ----------------------------------------------------
+# Helpers
+# ----------------------------------------------------
+
+def error(code, message, status=400):
+    return jsonify({
+        "error": code,
+        "message": message
+    }), status
+
+
+def parse_depart(value, now: datetime):
+    """
+    "HH:MM" (today) or a full ISO timestamp; defaults to now.
+    Returns (service_day_midnight, seconds_after_midnight).
+    """
+    if not value:
+        when = now
+    elif len(value) <= 5 and ":" in value:
+        h, m = value.split(":")
+        when = now.replace(hour=int(h), minute=int(m), second=0, microsecond=0)
+    else:
+        when = datetime.fromisoformat(value)
+
+    midnight = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight, int((when - midnight).total_seconds())
+
+
+# ----------------------------------------------------
+# PLAN JOURNEY
+# ----------------------------------------------------
+
+@planner_bp.route("/plan", methods=["GET"])
+def plan():
+    cfg = current_app.config
+
+    try:
+        graph = get_graph(
+            cfg["PLANNER_GTFS_DIR"],
+            walk_radius_m=cfg["PLANNER_WALK_RADIUS_M"],
+        )
+    except FileNotFoundError:
+        return error("planner_unavailable", "No timetable data loaded", 503)
+    except FeedError:
+        current_app.logger.exception("planner: timetable feed failed to load")
+        return error("planner_unavailable", "Timetable data could not be loaded", 503)
+
+    origin = graph.find_stop(request.args.get("from"))
+    destination = graph.find_stop(request.args.get("to"))
+    if origin is None or destination is None:
+        return error("unknown_stop", "Unknown origin or destination", 404)
+
+    try:
+        service_day, depart = parse_depart(request.args.get("depart"), datetime.now())
+    except ValueError:
+        return error("invalid_request", "Invalid depart time")
+
+    started = time.perf_counter()
+    journeys = search(
+        graph, origin, destination, depart,
+        max_rides=cfg["PLANNER_MAX_TRANSFERS"] + 1,
+        min_change=cfg["PLANNER_MIN_CHANGE_SECONDS"],
+    )
+    options = build_options(graph, journeys, service_day)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    return jsonify({
+        "from": graph.stop_names[origin],
+        "to": graph.stop_names[destination],
+        "options": options,
+        "meta": {
+            "search_ms": round(elapsed_ms, 2),
+            "journeys_considered": len(journeys)
+        }
+    })
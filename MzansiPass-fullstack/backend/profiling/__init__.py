@@ -0,0 +1,33 @@
+"""
+MzansiPass SQL Profiler
+-----------------------
+
+Finds the ORM calls behind slow or repeated SQL (User.query.get after
+a trip lookup, lazy user / agency relationships, ...).
+
+Set SQL_PROFILING=true; every response then carries X-SQL-Queries /
+X-SQL-Time-Ms, N+1 patterns and slow queries are logged, and
+
+    GET    /api/admin/sql-profile    per-endpoint stats, N+1 patterns
+                                     with their source lines, slow
+                                     queries with captured plans
+    DELETE /api/admin/sql-profile    reset
+
+(platform admin JWT only).
+
+Public API:
+- profiler
+- profiling_bp
+- fingerprint, digest
+"""
+
+from .fingerprint import fingerprint, digest
+from .profiler import profiler
+from .routes import profiling_bp
+
+__all__ = [
+    "profiler",
+    "profiling_bp",
+    "fingerprint",
+    "digest",
+]
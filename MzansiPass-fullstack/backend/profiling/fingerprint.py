@@ -0,0 +1,29 @@
+# profiling/fingerprint.py
+"""
+SQL fingerprints: the statement with literals and IN-list lengths
+erased, so "the same query with different values" compares equal.
+"""
+import re
+from hashlib import sha1
+
+_PARAM = r"(?:\?|%s|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\])"
+_LIST = re.compile(r"\(\s*" + _PARAM + r"(?:\s*,\s*" + _PARAM + r")*\s*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    text = _STRING.sub("?", statement)
+    text = _NUMBER.sub("?", text)
+    text = _LIST.sub("(?)", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+def digest(fp: str) -> str:
+    return sha1(fp.encode()).hexdigest()[:12]
+
+
+def is_select(statement: str) -> bool:
+    head = statement.lstrip()[:6].upper()
+    return head == "SELECT" or head.startswith("WITH")
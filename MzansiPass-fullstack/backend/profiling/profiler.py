@@ -0,0 +1,246 @@
+# profiling/profiler.py
+"""
+Per-request SQL profiler (Config.SQL_PROFILING).
+
+Hooks before/after_cursor_execute on every Engine (tenant binds
+included) and, inside a request, records each statement's
+fingerprint, duration and the application frame that issued it.
+At the end of the request:
+
+- a SELECT fingerprint repeated SQL_N_PLUS_ONE_THRESHOLD times or
+  more is reported as an N+1 pattern, with the lines that issued it
+- a SELECT slower than SQL_SLOW_MS gets its plan captured once per
+  fingerprint: EXPLAIN (FORMAT JSON) on PostgreSQL - with ANALYZE,
+  BUFFERS when SQL_EXPLAIN_ANALYZE, which runs the query again -
+  or EXPLAIN QUERY PLAN on SQLite
+
+The plan is taken on a separate DBAPI cursor of the same connection
+(inside a savepoint on PostgreSQL), so the request's own results and
+transaction are untouched. Reports are kept in memory per process.
+Off by default: the frame walk costs a few microseconds per query.
+"""
+import os
+import sys
+import time
+from collections import Counter, deque
+from datetime import datetime
+from threading import Lock
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from profiling.fingerprint import fingerprint, digest, is_select
+
+_SKIP_DIRS = (os.sep + "site-packages" + os.sep, os.sep + "profiling" + os.sep)
+
+
+class _RequestProfile:
+    __slots__ = ("queries", "started")
+
+    def __init__(self):
+        self.queries = []     # (digest, fingerprint, ms, origin, select)
+        self.started = time.perf_counter()
+
+
+class SQLProfiler:
+    def __init__(self):
+        self._lock = Lock()
+        self._listening = False
+        self.root = None
+        self.endpoints = {}
+        self.n_plus_one = {}
+        self.slow = deque(maxlen=200)
+        self.plans = {}
+
+    def init_app(self, app):
+        app.extensions["sql_profiler"] = self
+        if not app.config["SQL_PROFILING"]:
+            return
+
+        self.root = app.root_path + os.sep
+        self.slow = deque(maxlen=app.config["SQL_PROFILE_MAX_SLOW"])
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+        if not self._listening:
+            event.listen(Engine, "before_cursor_execute", self._before)
+            event.listen(Engine, "after_cursor_execute", self._after)
+            self._listening = True
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+            self.n_plus_one.clear()
+            self.slow.clear()
+            self.plans.clear()
+
+    # ----------------------------------------------------
+    # Engine events
+    # ----------------------------------------------------
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the statement's own context, not the connection: a
+        # statement that raises never reaches _after, and its start
+        # must not be left behind for the next one to pop
+        if context is not None and has_request_context() and "sql_profile" in g:
+            context._sql_profiler_started = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_sql_profiler_started", None)
+        if started is None or not has_request_context() or "sql_profile" not in g:
+            return
+
+        ms = (time.perf_counter() - started) * 1000
+        fp = fingerprint(statement)
+        key = digest(fp)
+        select = is_select(statement)
+
+        g.sql_profile.queries.append((key, fp, ms, self._origin(), select))
+
+        cfg = current_app.config
+        if select and not executemany and ms >= cfg["SQL_SLOW_MS"] and key not in self.plans:
+            self.plans[key] = _explain(conn, statement, parameters, cfg["SQL_EXPLAIN_ANALYZE"])
+
+    def _origin(self):
+        """
+        The innermost application frame ("agency/trips.py:41 in get_trip").
+        """
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(self.root) and not any(d in filename for d in _SKIP_DIRS):
+                return f"{filename[len(self.root):]}:{frame.f_lineno} in {frame.f_code.co_name}"
+            frame = frame.f_back
+        return None
+
+    # ----------------------------------------------------
+    # Request hooks
+    # ----------------------------------------------------
+
+    def _start(self):
+        g.sql_profile = _RequestProfile()
+
+    def _finish(self, response):
+        profile = g.pop("sql_profile", None)
+        if profile is None:
+            return response
+
+        cfg = current_app.config
+        endpoint = request.endpoint or request.path
+        queries = profile.queries
+        sql_ms = sum(q[2] for q in queries)
+
+        response.headers["X-SQL-Queries"] = str(len(queries))
+        response.headers["X-SQL-Time-Ms"] = f"{sql_ms:.1f}"
+
+        repeats = Counter(q[0] for q in queries if q[4])
+        threshold = cfg["SQL_N_PLUS_ONE_THRESHOLD"]
+        now = datetime.utcnow()
+
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {
+                "requests": 0, "queries": 0, "sql_ms": 0.0, "max_queries": 0
+            })
+            stats["requests"] += 1
+            stats["queries"] += len(queries)
+            stats["sql_ms"] += sql_ms
+            stats["max_queries"] = max(stats["max_queries"], len(queries))
+
+            for key, count in repeats.items():
+                if count < threshold:
+                    continue
+                first = next(q for q in queries if q[0] == key)
+                pattern = self.n_plus_one.setdefault((endpoint, key), {
+                    "endpoint": endpoint,
+                    "fingerprint": first[1],
+                    "origins": [],
+                    "requests": 0,
+                    "max_repeats": 0,
+                })
+                pattern["requests"] += 1
+                pattern["max_repeats"] = max(pattern["max_repeats"], count)
+                for q in queries:
+                    if q[0] == key and q[3] not in pattern["origins"] and len(pattern["origins"]) < 5:
+                        pattern["origins"].append(q[3])
+
+                current_app.logger.warning(
+                    "sql_n_plus_one endpoint=%s repeats=%d origin=%s fingerprint=%s",
+                    endpoint, count, first[3], first[1][:200]
+                )
+
+            for key, fp, ms, origin, _ in queries:
+                if ms < cfg["SQL_SLOW_MS"]:
+                    continue
+                self.slow.append({
+                    "endpoint": endpoint,
+                    "fingerprint": fp,
+                    "digest": key,
+                    "ms": round(ms, 2),
+                    "origin": origin,
+                    "at": now,
+                })
+                current_app.logger.warning(
+                    "sql_slow endpoint=%s ms=%.1f origin=%s fingerprint=%s",
+                    endpoint, ms, origin, fp[:200]
+                )
+
+        return response
+
+    # ----------------------------------------------------
+    # Report
+    # ----------------------------------------------------
+
+    def report(self) -> dict:
+        with self._lock:
+            endpoints = {
+                name: {
+                    **s,
+                    "sql_ms": round(s["sql_ms"], 1),
+                    "avg_queries": round(s["queries"] / s["requests"], 1),
+                }
+                for name, s in self.endpoints.items()
+            }
+            patterns = sorted(
+                (dict(p, origins=list(p["origins"])) for p in self.n_plus_one.values()),
+                key=lambda p: (-p["max_repeats"], p["endpoint"])
+            )
+            slow = [dict(s, plan=self.plans.get(s["digest"])) for s in reversed(self.slow)]
+
+        return {
+            "enabled": current_app.config["SQL_PROFILING"],
+            "endpoints": endpoints,
+            "n_plus_one": patterns,
+            "slow": slow,
+        }
+
+
+def _explain(conn, statement, parameters, analyze):
+    dialect = conn.dialect.name
+    cursor = conn.connection.dbapi_connection.cursor()
+
+    try:
+        if dialect == "postgresql":
+            options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+            cursor.execute("SAVEPOINT sql_profiler")
+            try:
+                cursor.execute(f"EXPLAIN ({options}) {statement}", parameters)
+                plan = cursor.fetchone()[0]
+            finally:
+                # Also undoes anything ANALYZE executed
+                cursor.execute("ROLLBACK TO SAVEPOINT sql_profiler")
+                cursor.execute("RELEASE SAVEPOINT sql_profiler")
+            return plan
+
+        if dialect == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[-1] for row in cursor.fetchall()]
+
+        return None
+    except Exception as exc:
+        return {"error": f"{type(exc).__name__}: {exc}"[:300]}
+    finally:
+        cursor.close()
+
+
+profiler = SQLProfiler()
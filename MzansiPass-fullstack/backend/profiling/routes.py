@@ -0,0 +1,53 @@
+from functools import wraps
+
+from flask import Blueprint, jsonify
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+from profiling.profiler import profiler
+
+profiling_bp = Blueprint(
+    "profiling",
+    __name__,
+    url_prefix="/api/admin/sql-profile"
+)
+
+# ----------------------------------------------------
+# Helpers
+# ----------------------------------------------------
+
+def error(code, message, status=400):
+    return jsonify({
+        "error": code,
+        "message": message
+    }), status
+
+
+def admin_required(fn):
+    """Platform admins (UserRole.admin), not agency admins."""
+    @wraps(fn)
+    def decorator(*args, **kwargs):
+        verify_jwt_in_request()
+        identity = get_jwt_identity()
+
+        if not isinstance(identity, dict) or identity.get("role") != "admin" or "id" not in identity:
+            return error("forbidden", "Admin access required", 403)
+
+        return fn(*args, **kwargs)
+    return decorator
+
+
+# ----------------------------------------------------
+# SQL PROFILE REPORT
+# ----------------------------------------------------
+
+@profiling_bp.route("", methods=["GET"])
+@admin_required
+def sql_profile():
+    return jsonify(profiler.report())
+
+
+@profiling_bp.route("", methods=["DELETE"])
+@admin_required
+def reset_sql_profile():
+    profiler.reset()
+    return jsonify({"status": "reset"})
@@ -0,0 +1,51 @@
+"""
+MzansiPass Card Provisioning
+----------------------------
+
+Bulk onboarding of an operator's existing physical card stock
+(MyCiTi, Gautrain, ...) instead of one POST /cards per card.
+
+    flask cards import stock.csv [--job <id>] [--agency <id>]
+    POST /api/cards/import[?agency=<id>][&job=<id>]   text/csv body or multipart "file"
+    flask cards process-imports                       loads uploads queued by POST
+    GET  /api/cards/import/<id>                       progress / rejected rows
+
+CSV: card_number,owner[,label,color,provider]; owner is an email or
+user id. Imports run in committed chunks with a checkpoint, so a
+re-run with --job / ?job= resumes where the last one stopped. A POST
+only spools the file to CARD_IMPORT_DIR and answers 202 with the job;
+the process-imports worker (cron or a loop) does the loading.
+
+The HTTP routes take a platform admin token (UserRole.admin), not an
+agency one: an import links cards to riders' wallets by email / id,
+which an agency account may not do on its own say-so.
+
+Public API:
+- provisioning_bp
+- cards_cli
+- start_job(source, agency_id), run_import(job_id, stream, cfg, progress)
+- queue_upload(stream, cfg, source, agency_id, job_id), process_queued(cfg, progress)
+- parse_row, normalise_card_number
+"""
+
+from .importer import (
+    start_job, run_import, queue_upload, process_queued, job_summary,
+    parse_row, normalise_card_number, ImportFormatError, ImportConflict, InvalidRow
+)
+from .routes import provisioning_bp
+from .commands import cards_cli
+
+__all__ = [
+    "provisioning_bp",
+    "cards_cli",
+    "start_job",
+    "run_import",
+    "queue_upload",
+    "process_queued",
+    "job_summary",
+    "parse_row",
+    "normalise_card_number",
+    "ImportFormatError",
+    "ImportConflict",
+    "InvalidRow",
+]
@@ -0,0 +1,85 @@
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from models import db, CardImportJob
+from provisioning.importer import (
+    start_job, run_import, process_queued, job_summary, ImportFormatError
+)
+
+cards_cli = AppGroup("cards", help="Card provisioning.")
+
+
+@cards_cli.command("import")
+@click.argument("csv_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--job", "job_id", default=None,
+              help="Resume this import from its checkpoint.")
+@click.option("--agency", "agency_id", type=int, default=None,
+              help="Agency the card stock belongs to.")
+@click.option("--chunk-size", type=int, default=None,
+              help="Rows per transaction (default: CARD_IMPORT_CHUNK_SIZE).")
+def import_command(csv_file, job_id, agency_id, chunk_size):
+    """Bulk-load physical cards from CSV (card_number,owner[,label,color,provider])."""
+    cfg = dict(current_app.config)
+    if chunk_size:
+        cfg["CARD_IMPORT_CHUNK_SIZE"] = chunk_size
+
+    if job_id is None:
+        job = start_job(source=csv_file, agency_id=agency_id)
+        click.echo(f"cards: import {job.id} started")
+    else:
+        job = db.session.get(CardImportJob, job_id)
+        if job is None:
+            raise click.ClickException(f"no import {job_id}")
+        click.echo(f"cards: resuming import {job.id} at row {job.checkpoint}")
+
+    started = time.perf_counter()
+    first_row = job.checkpoint
+
+    def progress(job):
+        rate = (job.checkpoint - first_row) / max(time.perf_counter() - started, 1e-6)
+        click.echo(
+            f"  row {job.checkpoint}: {job.imported} imported, {job.duplicates} duplicate, "
+            f"{job.rejected} rejected ({rate:,.0f} rows/s)"
+        )
+
+    with open(csv_file, newline="", encoding="utf-8-sig") as fh:
+        try:
+            job = run_import(job.id, fh, cfg, progress=progress)
+        except ImportFormatError as exc:
+            raise click.ClickException(f"import {job.id} failed: {exc}")
+
+    click.echo(
+        f"cards: import {job.id} {job.status.value}: {job.imported} imported, "
+        f"{job.duplicates} duplicate, {job.rejected} rejected"
+    )
+
+
+@cards_cli.command("process-imports")
+def process_imports_command():
+    """Import every upload queued over HTTP (and resume interrupted ones)."""
+    def progress(job):
+        click.echo(f"  {job.id} row {job.checkpoint}: {job.imported} imported")
+
+    for job in process_queued(current_app.config, progress=progress):
+        click.echo(
+            f"cards: import {job.id} {job.status.value}: {job.imported} imported, "
+            f"{job.duplicates} duplicate, {job.rejected} rejected"
+        )
+
+
+@cards_cli.command("import-status")
+@click.argument("job_id")
+def import_status_command(job_id):
+    """Show an import's progress and rejected rows."""
+    job = db.session.get(CardImportJob, job_id)
+    if job is None:
+        raise click.ClickException(f"no import {job_id}")
+
+    summary = job_summary(job)
+    for key in ("id", "source", "status", "rows", "imported", "duplicates", "rejected"):
+        click.echo(f"{key:>10}: {summary[key]}")
+    for row_no, card_number, reason in summary["errors"]:
+        click.echo(f"  row {row_no} {card_number}: {reason}")
@@ -0,0 +1,404 @@
+# provisioning/importer.py
+"""
+Chunked bulk import of physical cards from CSV.
+
+    card_number,owner[,label,color,provider]
+
+owner is the account's email or numeric user id. The file is read as
+a stream and handled CARD_IMPORT_CHUNK_SIZE rows at a time; for each
+chunk, in one DB transaction with the job row locked:
+
+1. validate and normalise the rows (bad rows -> job.errors)
+2. drop numbers repeated inside the chunk or already in cards
+   (one IN query against the unique card_id index)
+3. resolve owners (one query per key type)
+4. load the survivors with COPY (PostgreSQL / psycopg2) or a single
+   executemany INSERT, and log them for terminal sync
+5. move job.checkpoint past the chunk
+
+An interrupted or failed import resumes from its checkpoint: earlier
+rows are skipped unparsed, later ones are checked against cards again,
+so no card is loaded twice.
+
+HTTP uploads are not imported in the request: queue_upload spools the
+file to CARD_IMPORT_DIR and queues the job, and process_queued (the
+`flask cards process-imports` worker) imports every spooled file,
+deleting it once its job completes.
+"""
+import csv
+import io
+import logging
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Card, User, CardImportJob, ImportStatus
+from terminals.changes import log_cards
+
+log = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ("card_number", "owner")
+
+# Printed numbers carry spaces / dashes ("6009 1234 5678 9012")
+_SEPARATORS = re.compile(r"[\s-]+")
+_CARD_NUMBER = re.compile(r"^[A-Z0-9]{6,32}$")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+class ImportConflict(RuntimeError):
+    """Another process advanced the job first."""
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+# ----------------------------------------------------
+# Rows
+# ----------------------------------------------------
+
+def normalise_card_number(value) -> str:
+    return _SEPARATORS.sub("", value or "").upper()
+
+
+def parse_row(raw: dict) -> dict:
+    card_id = normalise_card_number(raw.get("card_number"))
+    if not card_id:
+        raise InvalidRow("missing card_number")
+    if not _CARD_NUMBER.match(card_id):
+        raise InvalidRow("invalid card_number")
+
+    owner = (raw.get("owner") or "").strip()
+    if not owner:
+        raise InvalidRow("missing owner")
+    owner = int(owner) if owner.isdigit() else owner.lower()
+
+    label = (raw.get("label") or raw.get("nickname") or raw.get("provider") or "").strip()
+    color = (raw.get("color") or "").strip()
+    if len(label) > 120:
+        raise InvalidRow("label too long")
+    if len(color) > 30:
+        raise InvalidRow("color too long")
+
+    return {
+        "card_id": card_id,
+        "owner": owner,
+        "label": label or None,
+        "color": color or None,
+    }
+
+
+def _check_columns(fieldnames):
+    missing = [c for c in REQUIRED_COLUMNS if c not in (fieldnames or ())]
+    if missing:
+        raise ImportFormatError(f"missing column(s): {', '.join(missing)}")
+
+
+def _resolve_owners(session, owners) -> dict:
+    """
+    {owner key: user id} for the keys that exist.
+    """
+    ids = {o for o in owners if isinstance(o, int)}
+    emails = {o for o in owners if isinstance(o, str)}
+
+    found = {}
+    if ids:
+        found.update((i, i) for i in session.execute(
+            select(User.id).where(User.id.in_(ids))
+        ).scalars())
+    if emails:
+        found.update(session.execute(
+            select(func.lower(User.email), User.id)
+            .where(func.lower(User.email).in_(emails))
+        ).all())
+    return found
+
+
+# ----------------------------------------------------
+# Loading
+# ----------------------------------------------------
+
+_COPY_SQL = (
+    "COPY cards (card_id, user_id, label, color, linked, created_at) "
+    "FROM STDIN WITH (FORMAT csv)"
+)
+
+
+def _load(session, rows):
+    bind = session.get_bind()
+
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+        # Unquoted empty fields are NULL in COPY csv
+        buf = io.StringIO()
+        csv.writer(buf).writerows(
+            (r["card_id"], r["user_id"], r["label"], r["color"], "t", r["created_at"].isoformat())
+            for r in rows
+        )
+        buf.seek(0)
+        raw = session.connection().connection.driver_connection
+        with raw.cursor() as cur:
+            cur.copy_expert(_COPY_SQL, buf)
+    else:
+        session.execute(insert(Card.__table__), rows)
+
+
+# ----------------------------------------------------
+# Jobs
+# ----------------------------------------------------
+
+def start_job(source: str | None = None, agency_id: int | None = None,
+              status: ImportStatus = ImportStatus.running) -> CardImportJob:
+    job = CardImportJob(
+        id=uuid.uuid4().hex,
+        source=(source or "")[:255] or None,
+        agency_id=agency_id,
+        status=status,
+        checkpoint=0, imported=0, duplicates=0, rejected=0, errors=[]
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def job_summary(job: CardImportJob) -> dict:
+    return {
+        "id": job.id,
+        "source": job.source,
+        "status": job.status.value,
+        "rows": job.checkpoint,
+        "imported": job.imported,
+        "duplicates": job.duplicates,
+        "rejected": job.rejected,
+        "errors": job.errors or [],
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+def _reject(job, errors, max_errors, row_no, card_number, reason):
+    job.rejected += 1
+    if len(errors) < max_errors:
+        errors.append([row_no, card_number, reason])
+
+
+def _import_chunk(session, job_id, start, raws, cfg) -> CardImportJob:
+    job = session.get(CardImportJob, job_id, with_for_update=True, populate_existing=True)
+    if job.checkpoint != start or job.status is not ImportStatus.running:
+        raise ImportConflict(f"import {job_id} moved to row {job.checkpoint}")
+
+    errors = list(job.errors or [])
+    max_errors = cfg["CARD_IMPORT_MAX_ERRORS"]
+
+    rows = {}
+    for row_no, raw in enumerate(raws, start + 1):
+        try:
+            row = parse_row(raw)
+        except InvalidRow as exc:
+            _reject(job, errors, max_errors, row_no, raw.get("card_number"), str(exc))
+            continue
+
+        if row["card_id"] in rows:
+            job.duplicates += 1
+            continue
+        row["row_no"] = row_no
+        rows[row["card_id"]] = row
+
+    if rows:
+        existing = session.execute(
+            select(Card.card_id).where(Card.card_id.in_(rows))
+        ).scalars().all()
+        for card_id in existing:
+            del rows[card_id]
+        job.duplicates += len(existing)
+
+    owners = _resolve_owners(session, {r["owner"] for r in rows.values()})
+    now = datetime.utcnow()
+
+    loaded = []
+    for row in rows.values():
+        user_id = owners.get(row["owner"])
+        if user_id is None:
+            _reject(job, errors, max_errors, row["row_no"], row["card_id"], "unknown owner")
+            continue
+        loaded.append({
+            "card_id": row["card_id"],
+            "user_id": user_id,
+            "label": row["label"],
+            "color": row["color"],
+            "linked": True,
+            "created_at": now,
+        })
+
+    if loaded:
+        _load(session, loaded)
+        # Core / COPY rows are invisible to the ORM sync hook
+        log_cards([r["card_id"] for r in loaded], session=session)
+
+    job.imported += len(loaded)
+    job.errors = errors
+    job.checkpoint = start + len(raws)
+    session.commit()
+    return job
+
+
+def _fail(session, job_id):
+    session.rollback()
+    job = session.get(CardImportJob, job_id)
+    job.status = ImportStatus.failed
+    session.commit()
+
+
+def run_import(job_id: str, stream, cfg, progress=None) -> CardImportJob:
+    """
+    Import (or resume) job_id from a text stream of CSV.
+
+    progress(job) is called after every committed chunk.
+    """
+    session = db.session
+
+    job = session.get(CardImportJob, job_id)
+    if job.status is ImportStatus.completed:
+        return job
+
+    job.status = ImportStatus.running
+    start = job.checkpoint
+    session.commit()
+
+    size = cfg["CARD_IMPORT_CHUNK_SIZE"]
+
+    try:
+        reader = csv.DictReader(stream)
+        _check_columns(reader.fieldnames)
+
+        rows = islice(reader, start, None)
+
+        while True:
+            chunk = list(islice(rows, size))
+            if not chunk:
+                break
+
+            for attempt in (1, 2):
+                try:
+                    job = _import_chunk(session, job_id, start, chunk, cfg)
+                    break
+                except IntegrityError:
+                    # A card created since the duplicate check: check again
+                    session.rollback()
+                    if attempt == 2:
+                        raise
+
+            start = job.checkpoint
+            if progress is not None:
+                progress(job)
+    except ImportConflict:
+        # Still running elsewhere: leave the job to that process
+        session.rollback()
+        raise
+    except UnicodeDecodeError as exc:
+        _fail(session, job_id)
+        raise ImportFormatError("file is not UTF-8 text") from exc
+    except Exception:
+        _fail(session, job_id)
+        raise
+
+    job.status = ImportStatus.completed
+    session.commit()
+    return job
+
+
+# ----------------------------------------------------
+# Queue (HTTP uploads)
+# ----------------------------------------------------
+
+def upload_path(cfg, job_id: str) -> str:
+    return os.path.join(cfg["CARD_IMPORT_DIR"], f"{job_id}.csv")
+
+
+def _check_header(path):
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        try:
+            header = next(csv.reader(fh), None)
+        except UnicodeDecodeError as exc:
+            raise ImportFormatError("file is not UTF-8 text") from exc
+    _check_columns(header)
+
+
+def queue_upload(stream, cfg, source: str | None = None, agency_id: int | None = None,
+                 job_id: str | None = None) -> CardImportJob:
+    """
+    Spool a binary upload stream to CARD_IMPORT_DIR and queue its job:
+    a new one, or job_id to resume from its checkpoint with this file.
+    Only the header is checked here; process_queued does the import.
+    """
+    directory = cfg["CARD_IMPORT_DIR"]
+    os.makedirs(directory, exist_ok=True)
+
+    fd, spooled = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            shutil.copyfileobj(stream, fh)
+        _check_header(spooled)
+    except BaseException:
+        os.unlink(spooled)
+        raise
+
+    if job_id is None:
+        job = start_job(source=source, agency_id=agency_id, status=ImportStatus.queued)
+    else:
+        # A worker still on this job stops at its next chunk (status check)
+        job = db.session.get(CardImportJob, job_id, with_for_update=True)
+        job.status = ImportStatus.queued
+
+    os.replace(spooled, upload_path(cfg, job.id))
+    db.session.commit()
+    return job
+
+
+def process_queued(cfg, progress=None):
+    """
+    Import every spooled upload: queued jobs, and running / failed ones
+    a stopped worker left behind. Yields each job once its run ends.
+    """
+    unfinished = (ImportStatus.queued, ImportStatus.running, ImportStatus.failed)
+    job_ids = db.session.execute(
+        select(CardImportJob.id)
+        .where(CardImportJob.status.in_(unfinished))
+        .order_by(CardImportJob.created_at)
+    ).scalars().all()
+    db.session.rollback()
+
+    for job_id in job_ids:
+        path = upload_path(cfg, job_id)
+        # CLI imports read their own file and have nothing spooled
+        if not os.path.exists(path):
+            continue
+
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as fh:
+                job = run_import(job_id, fh, cfg, progress=progress)
+        except ImportConflict:
+            continue
+        except ImportFormatError as exc:
+            # The file itself is bad: a retry would fail the same way
+            log.warning("card import %s failed: %s", job_id, exc)
+            os.unlink(path)
+            job = db.session.get(CardImportJob, job_id)
+        except Exception:
+            # Left spooled: the next run resumes from the checkpoint
+            log.exception("card import %s failed", job_id)
+            db.session.rollback()
+            job = db.session.get(CardImportJob, job_id)
+        else:
+            os.unlink(path)
+
+        yield job
@@ -0,0 +1,103 @@
+from functools import wraps
+
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+from models import db, CardImportJob, TransportAgency, ImportStatus
+from provisioning.importer import queue_upload, job_summary, ImportFormatError
+
+provisioning_bp = Blueprint(
+    "provisioning",
+    __name__,
+    url_prefix="/api/cards/import"
+)
+
+# ----------------------------------------------------
+# Helpers
+# ----------------------------------------------------
+
+def error(code, message, status=400):
+    return jsonify({
+        "error": code,
+        "message": message
+    }), status
+
+
+def csv_stream():
+    """
+    The upload as a binary stream, without reading it into memory:
+    a multipart "file" field or a raw text/csv body.
+    """
+    upload = request.files.get("file")
+    if upload is not None:
+        return upload.filename, upload.stream
+    if request.mimetype == "text/csv":
+        return None, request.stream
+    return None, None
+
+
+def admin_required(fn):
+    """
+    Platform admins (UserRole.admin) only: an import puts cards in
+    riders' wallets, which no agency account may do for another
+    agency's riders.
+    """
+    @wraps(fn)
+    def decorator(*args, **kwargs):
+        verify_jwt_in_request()
+        identity = get_jwt_identity()
+
+        if not isinstance(identity, dict) or identity.get("role") != "admin" or "id" not in identity:
+            return error("forbidden", "Admin access required", 403)
+
+        return fn(*args, **kwargs)
+    return decorator
+
+
+# ----------------------------------------------------
+# BULK IMPORT (PHYSICAL CARD STOCK)
+# ----------------------------------------------------
+
+@provisioning_bp.route("", methods=["POST"])
+@admin_required
+def import_cards():
+    """
+    Upload a CSV and queue its import; `flask cards process-imports`
+    loads it, and GET /<id> reports progress. ?agency=<id> records
+    whose card stock it is, ?job=<id> re-uploads the same file to
+    resume an interrupted import from its checkpoint.
+    """
+    filename, stream = csv_stream()
+    if stream is None:
+        return error("invalid_request", "Send a text/csv body or a multipart 'file'")
+
+    job_id = request.args.get("job")
+    agency_id = None
+    if job_id:
+        job = db.session.get(CardImportJob, job_id)
+        if job is None:
+            return error("not_found", "Import not found", 404)
+        if job.status is ImportStatus.completed:
+            return jsonify(job_summary(job))
+    else:
+        agency_id = request.args.get("agency", type=int)
+        if agency_id is not None and db.session.get(TransportAgency, agency_id) is None:
+            return error("invalid_request", "Unknown agency")
+
+    try:
+        job = queue_upload(stream, current_app.config, source=filename,
+                           agency_id=agency_id, job_id=job_id)
+    except ImportFormatError as exc:
+        return error("invalid_file", str(exc))
+
+    return jsonify(job_summary(job)), 202
+
+
+@provisioning_bp.route("/<job_id>", methods=["GET"])
+@admin_required
+def import_status(job_id):
+    job = db.session.get(CardImportJob, job_id)
+    if job is None:
+        return error("not_found", "Import not found", 404)
+
+    return jsonify(job_summary(job))
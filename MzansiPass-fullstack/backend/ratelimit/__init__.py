@@ -0,0 +1,36 @@
+"""
+MzansiPass Rate Limiting
+------------------------
+
+Token-bucket admission control for hot and upstream-bound endpoints
+(login, NFC taps, Paystack verification).
+
+A rule in Config is "<count>/<period>". The bucket holds `count` tokens
+(the burst) and refills `count` per `period`. Each check costs O(1).
+A client over its limit gets 429 with Retry-After before the view runs,
+so it never holds a DB connection or spends Paystack quota.
+
+Backends (Config.RATELIMIT_BACKEND):
+- "memory"             per-process, bounded LRU of buckets
+- "redis://host:port"  shared by all workers (any Redis-protocol server)
+
+Public API:
+- limiter                 the extension; limiter.init_app(app)
+- limiter.limit(rule, key)
+- by_ip, by_user, by_agency, by_terminal
+"""
+
+from .limiter import RateLimiter, parse_rule
+from .keys import by_ip, by_user, by_agency, by_terminal
+
+limiter = RateLimiter()
+
+__all__ = [
+    "limiter",
+    "RateLimiter",
+    "parse_rule",
+    "by_ip",
+    "by_user",
+    "by_agency",
+    "by_terminal",
+]
@@ -0,0 +1,96 @@
+# ratelimit/backends.py
+import time
+from collections import OrderedDict
+from threading import Lock
+
+
+class MemoryBackend:
+    """
+    Buckets as (tokens, stamp) in an LRU bounded by max_keys, so a flood
+    of distinct keys (spoofed terminals, IP sweeps) cannot grow memory.
+    """
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = Lock()
+
+    def take(self, key, rate, burst) -> float:
+        """
+        Take one token. Returns 0, or seconds until a token is available.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, stamp = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - stamp) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return wait
+
+
+# One round trip, atomic on the server; uses the server clock so
+# workers with skewed clocks share one view of each bucket.
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+local tokens = tonumber(b[1]) or burst
+local stamp = tonumber(b[2]) or now
+tokens = math.min(burst, tokens + (now - stamp) * rate)
+
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'stamp', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    """
+    Works against Redis or any server speaking its protocol and EVAL
+    (KeyDB, Dragonfly, Valkey). Needs the optional `redis` package.
+    """
+
+    prefix = "rl:"
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "RATELIMIT_BACKEND is a redis:// URL but the `redis` package is not installed"
+            ) from exc
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key, rate, burst) -> float:
+        return float(self._take(keys=[self.prefix + key], args=[rate, burst]))
+
+
+def make_backend(cfg):
+    spec = cfg.get("RATELIMIT_BACKEND", "memory")
+    if spec == "memory":
+        return MemoryBackend(cfg.get("RATELIMIT_MAX_KEYS", 100_000))
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(spec)
+    raise ValueError(f"Unknown RATELIMIT_BACKEND: {spec}")
@@ -0,0 +1,31 @@
+# ratelimit/keys.py
+"""
+Key functions: who a request is charged to.
+
+by_user / by_agency read the verified JWT, so the limit decorator must
+sit below @jwt_required / @agency_required.
+"""
+from flask import request
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+
+def by_ip():
+    # Behind a proxy, set PROXY_FIX_X_FOR so remote_addr is the client
+    return f"ip:{request.remote_addr}"
+
+
+def by_user():
+    return f"user:{get_jwt_identity()['id']}"
+
+
+def by_agency():
+    return f"agency:{get_jwt()['agency_id']}"
+
+
+def by_terminal():
+    # Validators send their id; a terminal-less client shares its agency's
+    # bucket. The id is client-chosen, so pair this with a by_agency ceiling.
+    terminal = request.headers.get("X-Terminal-Id")
+    if not terminal:
+        return by_agency()
+    return f"terminal:{get_jwt()['agency_id']}:{terminal}"
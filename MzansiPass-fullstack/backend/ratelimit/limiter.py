@@ -0,0 +1,71 @@
+# ratelimit/limiter.py
+import logging
+import math
+from functools import wraps
+
+from flask import current_app, jsonify
+
+from .backends import make_backend
+
+log = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rule(rule):
+    """
+    "10/minute" or "10/60" -> (rate per second, burst)
+    """
+    count, _, period = rule.partition("/")
+    seconds = _PERIODS.get(period) or float(period)
+    count = int(count)
+    return count / seconds, count
+
+
+class RateLimiter:
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = make_backend(app.config)
+        app.extensions["ratelimit"] = self
+
+    def hit(self, key, rate, burst) -> float:
+        """
+        Charge one request to `key`. Returns 0, or Retry-After seconds.
+
+        Fails open: a broken shared backend must not take taps down.
+        """
+        try:
+            return self.backend.take(key, rate, burst)
+        except Exception:
+            log.exception("rate limit backend failed; admitting %s", key)
+            return 0.0
+
+    def limit(self, rule, key):
+        """
+        Decorate a view with Config.RATELIMIT_<RULE> charged to key().
+        """
+        setting = f"RATELIMIT_{rule.upper()}"
+
+        def wrapper(fn):
+            @wraps(fn)
+            def decorator(*args, **kwargs):
+                cfg = current_app.config
+                if cfg.get("RATELIMIT_ENABLED", True) and cfg.get(setting):
+                    rate, burst = parse_rule(cfg[setting])
+                    wait = self.hit(f"{rule}:{key()}", rate, burst)
+                    if wait:
+                        resp = jsonify({
+                            "error": "rate_limited",
+                            "message": "Too many requests, slow down"
+                        })
+                        resp.status_code = 429
+                        resp.headers["Retry-After"] = str(max(1, math.ceil(wait)))
+                        return resp
+
+                return fn(*args, **kwargs)
+            return decorator
+        return wrapper
@@ -0,0 +1,36 @@
+"""
+MzansiPass Disruption Refunds
+-----------------------------
+
+Credits riders whose trips were hit by an incident (a line going
+down, a major delay): every completed trip of the agency that started
+in the incident's window, in its area, gets a refund ledger row
+(TransactionType.refund) and a balance credit, priced by
+FareEngine.refund.
+
+    POST /api/refunds/incidents/<alert_id>   {share?, radius_km?, window_start?, window_end?}
+    GET  /api/refunds/runs[/<id>]
+    flask refunds process                    (schedule via cron / k8s CronJob)
+    flask refunds incident <alert_id>        create + process from the shell
+
+- engine.py    chunked, resumable, idempotent run logic
+
+Public API:
+- refunds_bp
+- refunds_cli
+- create_run, process, process_pending
+"""
+
+from .engine import create_run, process, process_pending, refund_reference, RefundConflict
+from .routes import refunds_bp
+from .commands import refunds_cli
+
+__all__ = [
+    "refunds_bp",
+    "refunds_cli",
+    "create_run",
+    "process",
+    "process_pending",
+    "refund_reference",
+    "RefundConflict",
+]
@@ -0,0 +1,46 @@
+import json
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from models import db, TransitAlert
+from refunds.engine import create_run, process, process_pending
+
+refunds_cli = AppGroup("refunds", help="Disruption refund jobs.")
+
+
+@refunds_cli.command("process")
+def process_command():
+    """Run every pending, interrupted or failed refund run; prints metrics as JSON."""
+    for metrics in process_pending(current_app.config):
+        click.echo(json.dumps(metrics, default=str))
+
+
+@refunds_cli.command("incident")
+@click.argument("alert_id", type=int)
+@click.option("--agency", "agency_id", type=int, default=None,
+              help="Agency whose trips are refunded (default: the incident's).")
+@click.option("--share", type=float, default=1.0, show_default=True,
+              help="Fraction of each fare refunded.")
+@click.option("--radius-km", type=float, default=None,
+              help="Area around the incident (default: REFUND_RADIUS_KM).")
+def incident_command(alert_id, agency_id, share, radius_km):
+    """Create (or resume) the refund run for one incident and process it."""
+    cfg = current_app.config
+
+    alert = db.session.get(TransitAlert, alert_id)
+    if alert is None:
+        raise click.ClickException(f"no incident {alert_id}")
+
+    agency_id = agency_id or alert.agency_id
+    if agency_id is None:
+        raise click.ClickException("incident has no agency; pass --agency")
+
+    run, created = create_run(alert, agency_id, cfg, share=share, radius_km=radius_km)
+    click.echo(f"refunds: run {run.id} {'created' if created else 'resumed'}")
+
+    def progress(run):
+        click.echo(f"  {run.trips_refunded} trips, R{run.amount_refunded:,.2f}")
+
+    click.echo(json.dumps(process(run.id, cfg, progress=progress), default=str))
@@ -0,0 +1,306 @@
+# refunds/engine.py
+"""
+Bulk refunds for a disrupted service.
+
+A run walks the agency's completed trips in (start_time, id) order
+over idx_trip_agency_status_time, REFUND_CHUNK_SIZE at a time. Per chunk, in
+one transaction with the run row locked:
+
+1. read the chunk (columns only), narrow it to the run's area
+2. drop trips refunded before (one IN query on the unique reference)
+3. price each refund with FareEngine.refund
+4. insert the refund ledger rows with one executemany, credit
+   balances with one executemany UPDATE (one row per rider)
+5. move the run's cursor past the chunk
+
+Re-running a run resumes at its cursor; the per-trip reference makes
+a trip refundable once across all incidents, so overlapping incidents
+never pay twice.
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, bindparam, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from fares.engine import FareEngine
+from models import (
+    db, Trip, TripStatus, Transaction, TransactionType, User,
+    TransitAlert, RefundRun, RefundStatus
+)
+from terminals.changes import log_balance_changes
+import outbox
+
+# Degrees of latitude per km (bounding-box prefilter only)
+_KM_PER_DEG = 111.32
+
+
+class RefundConflict(RuntimeError):
+    """Another process advanced the run first."""
+
+
+def refund_reference(trip_id) -> str:
+    return f"refund_trip_{trip_id}"
+
+
+def create_run(alert: TransitAlert, agency_id, cfg, share=1.0, radius_km=None,
+               window_start=None, window_end=None, created_by=None):
+    """
+    -> (run, created). Idempotent: an incident has at most one run,
+    and asking again returns it unchanged.
+    """
+    run = RefundRun.query.filter_by(alert_id=alert.id).first()
+    if run is not None:
+        return run, False
+
+    now = datetime.utcnow()
+    has_area = alert.lat is not None and alert.lng is not None
+
+    run = RefundRun(
+        alert_id=alert.id,
+        agency_id=agency_id,
+        window_start=window_start or (
+            alert.first_reported_at - timedelta(minutes=cfg["REFUND_LEAD_MINUTES"])
+        ),
+        window_end=window_end or min(alert.expires_at, now),
+        lat=alert.lat if has_area else None,
+        lng=alert.lng if has_area else None,
+        radius_km=(radius_km or cfg["REFUND_RADIUS_KM"]) if has_area else None,
+        share=share,
+        status=RefundStatus.pending,
+        cursor_id=0,
+        trips_refunded=0,
+        amount_refunded=0.0,
+        created_by=created_by
+    )
+    db.session.add(run)
+    db.session.commit()
+    return run, True
+
+
+def _area_filter(run):
+    if run.radius_km is None:
+        return ()
+
+    dlat = run.radius_km / _KM_PER_DEG
+    dlng = dlat * 2  # generous at South African latitudes (cos ~0.85-0.9)
+
+    def box(lat, lng):
+        return and_(lat.between(run.lat - dlat, run.lat + dlat),
+                    lng.between(run.lng - dlng, run.lng + dlng))
+
+    return (or_(box(Trip.start_lat, Trip.start_lng), box(Trip.end_lat, Trip.end_lng)),)
+
+
+def _in_area(run, trip):
+    if run.radius_km is None:
+        return True
+    return any(
+        lat is not None and lng is not None
+        and FareEngine._distance_km(run.lat, run.lng, lat, lng) <= run.radius_km
+        for lat, lng in ((trip.start_lat, trip.start_lng), (trip.end_lat, trip.end_lng))
+    )
+
+
+def _next_chunk(run, limit):
+    after = ()
+    if run.cursor_time is not None:
+        after = (or_(
+            Trip.start_time > run.cursor_time,
+            and_(Trip.start_time == run.cursor_time, Trip.id > run.cursor_id)
+        ),)
+
+    return db.session.execute(
+        select(
+            Trip.id, Trip.user_id, Trip.card_id, Trip.fare, Trip.start_time,
+            Trip.start_lat, Trip.start_lng, Trip.end_lat, Trip.end_lng
+        )
+        .where(
+            Trip.agency_id == run.agency_id,
+            Trip.status == TripStatus.completed,
+            Trip.start_time >= run.window_start,
+            Trip.start_time <= run.window_end,
+            *after,
+            *_area_filter(run)
+        )
+        .order_by(Trip.start_time, Trip.id)
+        .limit(limit)
+    ).all()
+
+
+def _refund_chunk(run_id, cursor, limit, now):
+    """
+    -> (trips examined, trips refunded, amount), committed.
+    """
+    run = db.session.get(RefundRun, run_id, with_for_update=True, populate_existing=True)
+    if (run.cursor_time, run.cursor_id) != cursor:
+        raise RefundConflict(f"refund run {run_id} moved on")
+
+    rows = _next_chunk(run, limit)
+    if not rows:
+        db.session.rollback()
+        return 0, 0, 0.0
+
+    trips = [t for t in rows if t.fare and t.fare > 0 and _in_area(run, t)]
+
+    done = set(db.session.execute(
+        select(Transaction.reference)
+        .where(Transaction.reference.in_([refund_reference(t.id) for t in trips]))
+    ).scalars()) if trips else set()
+
+    ledger = []
+    per_user = defaultdict(float)
+
+    for t in trips:
+        reference = refund_reference(t.id)
+        if reference in done:
+            continue
+
+        result = FareEngine.refund(t.fare, run.share)
+        if result.amount <= 0:
+            continue
+
+        ledger.append({
+            "user_id": t.user_id,
+            "agency_id": run.agency_id,
+            "amount": result.amount,
+            "type": TransactionType.refund,
+            "reference": reference,
+            "meta": {
+                "trip_id": t.id,
+                "card_id": t.card_id,
+                "incident_id": run.alert_id,
+                "refund_run_id": run.id,
+                "fare_breakdown": result.breakdown,
+            },
+            "settled": False,
+            "created_at": now,
+        })
+        per_user[t.user_id] += result.amount
+
+    if ledger:
+        db.session.execute(insert(Transaction.__table__), ledger)
+
+        credits = {uid: round(amount, 2) for uid, amount in per_user.items()}
+        users = User.__table__
+        db.session.execute(
+            update(users)
+            .where(users.c.id == bindparam("uid"))
+            .values(balance=users.c.balance + bindparam("amount")),
+            [{"uid": uid, "amount": amount} for uid, amount in credits.items()]
+        )
+
+        # Core update: the ORM hook that feeds terminal sync did not see it
+        log_balance_changes(credits)
+
+        for e in ledger:
+            outbox.refund(
+                e["reference"], e["user_id"], e["amount"], agency_id=run.agency_id,
+                trip_id=e["meta"]["trip_id"], incident_id=run.alert_id
+            )
+
+    amount = round(sum(e["amount"] for e in ledger), 2)
+
+    last = rows[-1]
+    run.cursor_time, run.cursor_id = last.start_time, last.id
+    run.trips_refunded += len(ledger)
+    run.amount_refunded = round(run.amount_refunded + amount, 2)
+    db.session.commit()
+
+    return len(rows), len(ledger), amount
+
+
+def process(run_id, cfg, max_chunks=None, progress=None) -> dict:
+    """
+    Run (or resume) one refund run. Returns run metrics.
+
+    progress(run) is called after every committed chunk.
+    """
+    started = time.perf_counter()
+    run = db.session.get(RefundRun, run_id)
+    if run.status is RefundStatus.completed:
+        return summary(run)
+
+    run.status = RefundStatus.running
+    db.session.commit()
+
+    limit = cfg["REFUND_CHUNK_SIZE"]
+    chunks = 0
+
+    try:
+        while max_chunks is None or chunks < max_chunks:
+            now = datetime.utcnow()
+            cursor = (run.cursor_time, run.cursor_id)
+
+            for attempt in (1, 2):
+                try:
+                    examined, _, _ = _refund_chunk(run_id, cursor, limit, now)
+                    break
+                except IntegrityError:
+                    # Refunded concurrently by another incident: re-read
+                    db.session.rollback()
+                    if attempt == 2:
+                        raise
+
+            run = db.session.get(RefundRun, run_id)
+            if not examined:
+                run.status = RefundStatus.completed
+                run.completed_at = datetime.utcnow()
+                db.session.commit()
+                break
+
+            chunks += 1
+            if progress is not None:
+                progress(run)
+    except RefundConflict:
+        db.session.rollback()
+        raise
+    except Exception:
+        db.session.rollback()
+        run = db.session.get(RefundRun, run_id)
+        run.status = RefundStatus.failed
+        db.session.commit()
+        raise
+
+    metrics = summary(run)
+    metrics["seconds"] = round(time.perf_counter() - started, 3)
+    return metrics
+
+
+def process_pending(cfg) -> list[dict]:
+    """
+    Every run not yet completed (new, interrupted or failed).
+    """
+    ids = db.session.execute(
+        select(RefundRun.id)
+        .where(RefundRun.status != RefundStatus.completed)
+        .order_by(RefundRun.id)
+    ).scalars().all()
+
+    results = []
+    for run_id in ids:
+        try:
+            results.append(process(run_id, cfg))
+        except RefundConflict:
+            continue
+    return results
+
+
+def summary(run: RefundRun) -> dict:
+    return {
+        "id": run.id,
+        "incident_id": run.alert_id,
+        "agency_id": run.agency_id,
+        "status": run.status.value,
+        "window_start": run.window_start,
+        "window_end": run.window_end,
+        "lat": run.lat,
+        "lng": run.lng,
+        "radius_km": run.radius_km,
+        "share": run.share,
+        "trips_refunded": run.trips_refunded,
+        "amount_refunded": run.amount_refunded,
+        "created_at": run.created_at,
+        "completed_at": run.completed_at,
+    }
@@ -0,0 +1,127 @@
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from models import db, TransitAlert, TransportAgency, RefundRun
+from agency.decorators import agency_required
+from serialization import Shape, paginate
+from refunds.engine import create_run, summary
+
+refunds_bp = Blueprint(
+    "refunds",
+    __name__,
+    url_prefix="/api/refunds"
+)
+
+RUN_ROW = Shape(
+    id=RefundRun.id,
+    incident_id=RefundRun.alert_id,
+    status=RefundRun.status,
+    share=RefundRun.share,
+    trips_refunded=RefundRun.trips_refunded,
+    amount_refunded=RefundRun.amount_refunded,
+    created_at=RefundRun.created_at,
+    completed_at=RefundRun.completed_at,
+)
+
+# ----------------------------------------------------
+# Helpers
+# ----------------------------------------------------
+
+def error(code, message, status=400):
+    return jsonify({
+        "error": code,
+        "message": message
+    }), status
+
+
+def parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def agency_incident(alert_id, agency_id):
+    """
+    Official incidents of this agency, or crowd reports on its service.
+    """
+    alert = db.session.get(TransitAlert, alert_id)
+    if alert is None:
+        return None
+    if alert.agency_id == agency_id:
+        return alert
+
+    agency = db.session.get(TransportAgency, agency_id)
+    if alert.agency_id is None and agency is not None and alert.provider == agency.name:
+        return alert
+    return None
+
+
+# ----------------------------------------------------
+# INCIDENT REFUNDS (AGENCY PORTAL)
+# ----------------------------------------------------
+
+@refunds_bp.route("/incidents/<int:alert_id>", methods=["POST"])
+@agency_required(roles=["admin", "finance"])
+def refund_incident(alert_id):
+    """
+    Queue the refund run for an incident; `flask refunds process`
+    works through it. Asking again returns the existing run.
+    """
+    agency_id = get_jwt()["agency_id"]
+    data = request.get_json(silent=True) or {}
+
+    alert = agency_incident(alert_id, agency_id)
+    if alert is None:
+        return error("not_found", "Incident not found", 404)
+
+    try:
+        share = float(data.get("share", 1.0))
+        radius_km = float(data["radius_km"]) if data.get("radius_km") is not None else None
+        window_start = parse_time(data.get("window_start"))
+        window_end = parse_time(data.get("window_end"))
+    except (TypeError, ValueError):
+        return error("invalid_request", "share / radius_km must be numbers, window_* ISO timestamps")
+
+    if not 0 < share <= 1:
+        return error("invalid_request", "share must be in (0, 1]")
+    if radius_km is not None and radius_km <= 0:
+        return error("invalid_request", "radius_km must be positive")
+    if window_start and window_end and window_start >= window_end:
+        return error("invalid_request", "window_start must be before window_end")
+
+    run, created = create_run(
+        alert, agency_id, current_app.config,
+        share=share, radius_km=radius_km,
+        window_start=window_start, window_end=window_end,
+        created_by=get_jwt_identity().get("agency_user_id")
+    )
+
+    return jsonify(summary(run)), 202 if created else 200
+
+
+@refunds_bp.route("/runs", methods=["GET"])
+@agency_required(roles=["admin", "finance"])
+def list_runs():
+    agency_id = get_jwt()["agency_id"]
+
+    page = int(request.args.get("page", 1))
+    per_page = min(int(request.args.get("per_page", 50)), 100)
+
+    stmt = (
+        RUN_ROW.select()
+        .where(RefundRun.agency_id == agency_id)
+        .order_by(RefundRun.created_at.desc())
+    )
+    items, meta = paginate(RUN_ROW, stmt, page, per_page)
+
+    return jsonify({"items": items, "meta": meta})
+
+
+@refunds_bp.route("/runs/<int:run_id>", methods=["GET"])
+@agency_required(roles=["admin", "finance"])
+def get_run(run_id):
+    run = db.session.get(RefundRun, run_id)
+    if run is None or run.agency_id != get_jwt()["agency_id"]:
+        return error("not_found", "Refund run not found", 404)
+
+    return jsonify(summary(run))
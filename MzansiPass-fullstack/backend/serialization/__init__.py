@@ -0,0 +1,30 @@
+"""
+MzansiPass Serialisation
+------------------------
+
+Read-path fast lane for JSON listings.
+
+- FastJSONProvider  Flask JSON provider backed by orjson (optional
+                    dependency; falls back to the stdlib encoder with
+                    the same wire format)
+- Shape             a named column list: SELECT only those columns,
+                    return rows as plain dicts, no ORM objects
+- paginate()        LIMIT/OFFSET + COUNT for a Shape select
+
+Datetimes are encoded as ISO 8601 and enums by value, so views can
+hand raw column values to jsonify() instead of calling iso()/.value.
+
+Public API:
+- FastJSONProvider
+- Shape
+- paginate
+"""
+
+from .provider import FastJSONProvider
+from .rows import Shape, paginate
+
+__all__ = [
+    "FastJSONProvider",
+    "Shape",
+    "paginate",
+]
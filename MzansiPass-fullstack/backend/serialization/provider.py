@@ -0,0 +1,77 @@
+# serialization/provider.py
+import dataclasses
+import decimal
+import enum
+import uuid
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; see requirements.txt
+    orjson = None
+
+
+def _orjson_default(o):
+    # Everything else (datetime, enum, uuid, dataclass) orjson encodes natively
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _stdlib_default(o):
+    # Mirror orjson's output so responses do not depend on which is installed
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, enum.Enum):
+        return o.value
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    app.json = FastJSONProvider(app)
+
+    Keeps Flask's contract (sorted keys, indented in debug) so switching
+    providers changes speed, not payloads.
+    """
+
+    def _options(self, indent=None):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            kwargs.setdefault("default", _stdlib_default)
+            return super().dumps(obj, **kwargs)
+
+        return orjson.dumps(
+            obj, default=_orjson_default, option=self._options(kwargs.get("indent"))
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+
+        # Straight to bytes: no str round trip
+        body = orjson.dumps(obj, default=_orjson_default, option=self._options(pretty))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,53 @@
+# serialization/rows.py
+import math
+
+from sqlalchemy import func, select
+
+from models import db
+
+
+class Shape:
+    """
+    TRIP_ROW = Shape(id=Trip.id, fare=Trip.fare, status=Trip.status)
+
+    Selects only the named columns; rows come back as plain tuples and
+    are zipped into dicts keyed by the names given. No ORM objects, no
+    identity map, no per-field formatting in the view.
+    """
+
+    def __init__(self, **columns):
+        self.names = tuple(columns)
+        self.columns = tuple(columns.values())
+
+    def extend(self, **columns):
+        return Shape(**dict(zip(self.names, self.columns)), **columns)
+
+    def select(self):
+        return select(*self.columns)
+
+    def all(self, stmt):
+        names = self.names
+        return [dict(zip(names, row)) for row in db.session.execute(stmt)]
+
+    def first(self, stmt):
+        row = db.session.execute(stmt.limit(1)).first()
+        return dict(zip(self.names, row)) if row is not None else None
+
+
+def paginate(shape, stmt, page, per_page):
+    """
+    Returns (items, meta) in the shape list endpoints already use.
+    """
+    page = max(page, 1)
+    total = db.session.execute(
+        select(func.count()).select_from(stmt.order_by(None).subquery())
+    ).scalar_one()
+
+    items = shape.all(stmt.limit(per_page).offset((page - 1) * per_page))
+
+    return items, {
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": math.ceil(total / per_page) if per_page else 0,
+    }
@@ -0,0 +1,49 @@
+"""
+MzansiPass Tap Shards
+---------------------
+
+Card-affinity tap processing. Concurrent taps on one card used to
+contend on the trip's row lock, and unrelated cards queued behind the
+same gunicorn workers; with TAPSHARD_ENABLED the online tap routes
+(/nfc/tap-in|out, /agency/tap-in|out) instead hand each tap to the
+shard process that owns its card:
+
+    gunicorn worker --(unix socket)--> shard = ring.shard_for(card_id)
+
+A node runs TAPSHARD_WORKERS shards (`flask shards serve`, one per
+core by default). Each shard applies its cards' taps one at a time
+against in-memory state (open trip, balance, fare caps) without row
+locks, and writes them through in micro-batches: one commit for up to
+TAPSHARD_BATCH_SIZE taps, never later than TAPSHARD_FLUSH_MS after
+the first. Shards share nothing, so throughput grows with the number
+of cores until the database's write capacity is reached.
+`python -m bench.shards` measures it.
+
+- ring.py     consistent hash ring (card_id -> shard)
+- worker.py   ShardWorker: hot state, apply, batched write-through
+- server.py   shard process (socket, apply loop)
+- client.py   ShardClient used by the routes
+
+Public API:
+- Tap, submit(tap), ShardUnavailable
+- HashRing, ShardWorker, ShardClient, client
+- shards_cli
+"""
+
+from .ring import HashRing
+from .worker import Tap, ShardWorker
+from .client import ShardClient, ShardUnavailable, client
+from .commands import shards_cli
+
+submit = client.submit
+
+__all__ = [
+    "Tap",
+    "submit",
+    "ShardUnavailable",
+    "HashRing",
+    "ShardWorker",
+    "ShardClient",
+    "client",
+    "shards_cli",
+]
@@ -0,0 +1,92 @@
+# shards/client.py
+"""
+HTTP-worker side: send a tap to the shard that owns its card and wait
+for the answer.
+
+Connections are opened lazily, one per (thread, shard), so they are
+created after gunicorn forks and are never shared between threads.
+A connection that times out or breaks is dropped, so a late answer
+can never be read as the reply to the next tap.
+"""
+import itertools
+import threading
+from multiprocessing.connection import Client
+
+from flask import current_app
+
+from .ring import HashRing
+from .server import shard_address, authkey, STATS
+
+
+class ShardUnavailable(RuntimeError):
+    pass
+
+
+class ShardClient:
+    def __init__(self):
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._ring = None
+
+    def ring(self, cfg=None) -> HashRing:
+        cfg = cfg or current_app.config
+        shards, vnodes = cfg["TAPSHARD_WORKERS"], cfg["TAPSHARD_VNODES"]
+
+        ring = self._ring
+        if ring is None or (ring.shards, ring.vnodes) != (shards, vnodes):
+            ring = self._ring = HashRing(shards, vnodes)
+        return ring
+
+    def _conn(self, cfg, index):
+        conns = self._local.__dict__.setdefault("conns", {})
+        conn = conns.get(index)
+        if conn is None:
+            conn = conns[index] = Client(
+                shard_address(cfg, index), family="AF_UNIX", authkey=authkey(cfg)
+            )
+        return conn
+
+    def _drop(self, index):
+        conn = self._local.__dict__.get("conns", {}).pop(index, None)
+        if conn is not None:
+            conn.close()
+
+    def call(self, index, body, cfg=None):
+        cfg = cfg or current_app.config
+        msg_id = next(self._ids)
+
+        try:
+            conn = self._conn(cfg, index)
+            conn.send((msg_id, body))
+            if not conn.poll(cfg["TAPSHARD_TIMEOUT_SECONDS"]):
+                raise TimeoutError(f"no answer in {cfg['TAPSHARD_TIMEOUT_SECONDS']}s")
+            got, result = conn.recv()
+        except (OSError, EOFError) as exc:
+            # TimeoutError and ConnectionRefusedError are OSErrors too
+            self._drop(index)
+            raise ShardUnavailable(f"tap shard {index}: {exc}") from exc
+
+        if got != msg_id:
+            self._drop(index)
+            raise ShardUnavailable(f"tap shard {index}: answer out of order")
+        return result
+
+    def submit(self, tap, cfg=None) -> dict:
+        """
+        Tap -> {"ok": True, ...} | {"error": <code>} once the owning
+        shard has applied (and, if accepted, committed) it.
+        """
+        return self.call(self.ring(cfg).shard_for(tap.card_id), tap, cfg)
+
+    def stats(self, cfg=None) -> list[dict]:
+        cfg = cfg or current_app.config
+        out = []
+        for index in range(cfg["TAPSHARD_WORKERS"]):
+            try:
+                out.append(self.call(index, STATS, cfg))
+            except ShardUnavailable as exc:
+                out.append({"shard": index, "error": str(exc)})
+        return out
+
+
+client = ShardClient()
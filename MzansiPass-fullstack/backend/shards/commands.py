@@ -0,0 +1,55 @@
+import json
+import multiprocessing
+import signal
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from shards.client import client
+from shards.server import run_shard
+
+shards_cli = AppGroup("shards", help="Card-affinity tap shard processes.")
+
+
+@shards_cli.command("serve")
+def serve_command():
+    """Run TAPSHARD_WORKERS shard processes; restart any that die."""
+    count = current_app.config["TAPSHARD_WORKERS"]
+
+    # spawn: every shard builds its own app and engine, nothing is
+    # inherited from this process
+    ctx = multiprocessing.get_context("spawn")
+
+    def start(index):
+        proc = ctx.Process(target=run_shard, args=(index,), name=f"tap-shard-{index}")
+        proc.start()
+        return proc
+
+    procs = [start(i) for i in range(count)]
+    click.echo(f"shards: started {count} shard(s)")
+
+    stopping = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopping.append(True))
+
+    while not stopping:
+        time.sleep(1)
+        for i, proc in enumerate(procs):
+            if not proc.is_alive():
+                # Its cards reload from the DB on their next tap
+                click.echo(f"shards: shard {i} exited ({proc.exitcode}), restarting")
+                procs[i] = start(i)
+
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        proc.join()
+
+
+@shards_cli.command("status")
+def status_command():
+    """Print each shard's counters as JSON lines."""
+    for stats in client.stats():
+        click.echo(json.dumps(stats))
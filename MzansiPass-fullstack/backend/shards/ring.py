@@ -0,0 +1,41 @@
+# shards/ring.py
+"""
+Consistent hash ring: card_id -> shard index.
+
+Each shard sits on the ring at `vnodes` points (BLAKE2b of
+"<shard>:<replica>"); a card belongs to the first point at or after
+its own hash (terminals.codec.card_hash, the hash terminals already
+use). Growing the pool from n to n+1 shards moves ~1/(n+1) of the
+cards, and only those cards' hot state has to be reloaded.
+"""
+from bisect import bisect_left
+from hashlib import blake2b
+
+from terminals.codec import card_hash
+
+
+def _point(label: str) -> int:
+    return int.from_bytes(blake2b(label.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, shards: int, vnodes: int = 64):
+        if shards < 1:
+            raise ValueError("a ring needs at least one shard")
+
+        self.shards = shards
+        self.vnodes = vnodes
+
+        points = sorted(
+            (_point(f"{shard}:{replica}"), shard)
+            for shard in range(shards)
+            for replica in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [s for _, s in points]
+
+    def shard_for(self, card_id: str) -> int:
+        i = bisect_left(self._hashes, card_hash(card_id))
+        if i == len(self._hashes):
+            i = 0
+        return self._owners[i]
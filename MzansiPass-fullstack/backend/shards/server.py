@@ -0,0 +1,141 @@
+# shards/server.py
+"""
+One shard process: a ShardWorker behind a unix socket.
+
+    TAPSHARD_SOCKET_DIR/shard-<index>.sock
+
+Each HTTP worker keeps one connection per shard (client.py) and sends
+(msg_id, Tap); reader threads only decode and queue. The main thread
+is the only one touching state: it applies taps in arrival order and
+flushes the batch once it holds TAPSHARD_BATCH_SIZE taps or its
+oldest tap has waited TAPSHARD_FLUSH_MS. Under load that is one commit
+for hundreds of taps; when idle a tap waits a couple of milliseconds.
+"""
+import logging
+import os
+import queue
+import time
+from multiprocessing.connection import Listener
+from threading import Thread
+
+from flask import current_app
+
+from .worker import ShardWorker, RETRY
+
+log = logging.getLogger(__name__)
+
+STATS = "stats"
+
+
+def shard_address(cfg, index) -> str:
+    return os.path.join(cfg["TAPSHARD_SOCKET_DIR"], f"shard-{index}.sock")
+
+
+def authkey(cfg) -> bytes:
+    return cfg["SECRET_KEY"].encode()
+
+
+class ShardServer:
+    def __init__(self, index):
+        self.index = index
+        self.inbox = queue.Queue()
+        self.worker = ShardWorker(reply=self._reply)
+        self.started = time.time()
+
+    # --------------------------------------------------
+    # Connections (reader threads: no state, no DB)
+    # --------------------------------------------------
+
+    def _accept(self, listener):
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                log.exception("shard %d: rejected a connection", self.index)
+                continue
+            Thread(target=self._read, args=(conn,), daemon=True).start()
+
+    def _read(self, conn):
+        try:
+            while True:
+                msg_id, body = conn.recv()
+                self.inbox.put((conn, msg_id, body))
+        except (EOFError, OSError):
+            conn.close()
+
+    @staticmethod
+    def _reply(token, result):
+        conn, msg_id = token
+        try:
+            conn.send((msg_id, result))
+        except (OSError, ValueError):
+            # Client gave up (timeout) or went away; the tap stands
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "shard": self.index,
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started),
+            "cards": self.worker.cards(),
+            "queued": self.inbox.qsize(),
+            **self.worker.stats,
+        }
+
+    # --------------------------------------------------
+    # Apply loop (main thread)
+    # --------------------------------------------------
+
+    def run(self):
+        cfg = current_app.config
+        address = shard_address(cfg, self.index)
+
+        os.makedirs(os.path.dirname(address), exist_ok=True)
+        if os.path.exists(address):
+            os.unlink(address)
+
+        listener = Listener(address, family="AF_UNIX", authkey=authkey(cfg))
+        Thread(target=self._accept, args=(listener,), daemon=True).start()
+        log.info("shard %d listening on %s", self.index, address)
+
+        batch_size = cfg["TAPSHARD_BATCH_SIZE"]
+        max_wait = cfg["TAPSHARD_FLUSH_MS"] / 1000
+        first_pending = None
+
+        while True:
+            timeout = None if first_pending is None else max(first_pending + max_wait - time.monotonic(), 0)
+            try:
+                conn, msg_id, body = self.inbox.get(timeout=timeout)
+            except queue.Empty:
+                body = None
+
+            if body == STATS:
+                self._reply((conn, msg_id), self.stats())
+            elif body is not None:
+                try:
+                    self.worker.apply((conn, msg_id), body)
+                except Exception:
+                    log.exception("shard %d: tap failed", self.index)
+                    self._reply((conn, msg_id), {"error": RETRY})
+
+            if not self.worker.pending:
+                first_pending = None
+                continue
+            if first_pending is None:
+                first_pending = time.monotonic()
+
+            if self.worker.pending >= batch_size or time.monotonic() - first_pending >= max_wait:
+                self.worker.flush()
+                first_pending = None
+
+
+def run_shard(index):
+    """
+    Process entry point (commands.py spawns one per shard): own app,
+    own engine and pool, serve until killed.
+    """
+    from app import create_app
+
+    app = create_app(serving=True)
+    with app.app_context():
+        ShardServer(index).run()
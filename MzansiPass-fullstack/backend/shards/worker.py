@@ -0,0 +1,572 @@
+# shards/worker.py
+"""
+Tap applier for one shard process.
+
+The shard owns its cards (ring.py): no other online tap path touches
+them, so every tap is applied serially against in-memory state
+
+    card     owner, open trip            (loaded on first touch)
+    balance  per rider, fares taken off  (refreshed after each batch)
+    fares    fare_state.store            (cap / transfer state)
+
+with no row locks and no DB round trip on a warm card. Accepted taps
+queue up as a micro-batch; flush() writes it (one transaction per
+tenant engine, executemany throughout) and only then answers them, so
+a rider is never told "ok" about a tap that is not durable. Refusals
+are answered at once and write nothing.
+
+Writers outside the shards (offline uploads, the stale-trip sweeper,
+top-ups) are caught three ways:
+- a card's state is reloaded once it is TAPSHARD_STATE_TTL_SECONDS old
+- tap-outs update the trip WHERE status = in_progress and fare state
+  WHERE version = seen; a batch that misses a row is rolled back, its
+  cards reloaded and its taps applied once more (then "retry")
+- that second write is split in halves on failure, down to single
+  cards, so one bad tap cannot take the rest of the batch with it
+- a refusal for balance re-reads the balance first (top-ups)
+"""
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+
+from flask import current_app, g
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, Card, User, Trip, TripStatus, Transaction, TransactionType
+from fares.engine import FareEngine, FareContext, FareResult
+from fares.capping import CapPolicy, RiderFareState, apply_caps
+from fare_state import store as fare_state_store
+from fraud import TapEvent, screen_tap, flag_buffer
+from terminals.changes import log_balance_changes
+import outbox
+
+log = logging.getLogger(__name__)
+
+# Refusal codes (the routes map them to their own status / message)
+CARD_NOT_FOUND = "card_not_found"
+ACTIVE_TRIP_EXISTS = "active_trip_exists"
+NO_ACTIVE_TRIP = "no_active_trip"
+CARD_BLOCKED = "card_blocked"
+INSUFFICIENT_BALANCE = "insufficient_balance"
+RETRY = "retry"
+
+
+@dataclass(frozen=True)
+class Tap:
+    kind: str                           # "in" | "out"
+    card_id: str
+    at: datetime
+    lat: float | None = None
+    lng: float | None = None
+    # in: the trip's agency; out: if set, the open trip must be this agency's
+    agency_id: int | None = None
+    # Rider taps: the card must belong to this user
+    owner: int | None = None
+    terminal: str | None = None
+    # Tap-in admission; None = no minimum
+    min_balance: float | None = None
+    # "engine" (FareEngine, terminals) | "distance" (app.calculate_fare, rider NFC)
+    pricing: str = "engine"
+    # Fare ledger reference
+    reference: str | None = None
+    # Tenant engine the request was routed to (tenancy/); None = default
+    bind: str | None = None
+
+
+@dataclass
+class _Trip:
+    # Attribute names match Trip, so outbox.tap_in / tap_out take it as is
+    id: int | None                      # None until its batch commits
+    user_id: int
+    agency_id: int
+    card_id: str
+    start_time: datetime
+    start_lat: float | None
+    start_lng: float | None
+    end_time: datetime | None = None
+    end_lat: float | None = None
+    end_lng: float | None = None
+    fare: float | None = None
+
+
+@dataclass
+class _Card:
+    user_id: int | None                 # None: unknown card
+    trip: _Trip | None
+    loaded_at: float
+    pending: bool = False               # has a tap in the unwritten batch
+
+
+@dataclass
+class _Op:
+    token: object
+    tap: Tap
+    card: _Card
+    trip: _Trip
+    fare: FareResult | None = None
+    state: RiderFareState | None = None
+    seen_version: int = 0
+
+
+@contextmanager
+def _on_bind(key):
+    # Same switch agency_required() flips through enter_tenant()
+    previous = g.get("tenant_bind")
+    g.tenant_bind = key
+    try:
+        yield
+    finally:
+        g.tenant_bind = previous
+
+
+def iso(dt):
+    return dt.isoformat() if dt else None
+
+
+class ShardWorker:
+    """
+    reply(token, result) is called exactly once per applied tap:
+    {"ok": True, ...} or {"error": <code>}. Call apply() and flush()
+    from one thread only; that is what makes the state lock-free.
+    """
+
+    def __init__(self, reply):
+        self._reply = reply
+        # Every tenant bind is a pool on the same tables (tenancy/):
+        # a card or rider has one state whichever route it came through
+        self._cards = OrderedDict()     # card_id -> _Card
+        self._balances = OrderedDict()  # user_id -> balance less unwritten fares
+        self._ops = []
+        self.stats = {"taps": 0, "refused": 0, "batches": 0, "written": 0,
+                      "replays": 0, "retries": 0}
+
+    @property
+    def pending(self) -> int:
+        return len(self._ops)
+
+    def cards(self) -> int:
+        return len(self._cards)
+
+    # --------------------------------------------------
+    # Apply
+    # --------------------------------------------------
+
+    def apply(self, token, tap: Tap):
+        """
+        Refusals are answered now; accepted taps when flush() commits.
+        """
+        self.stats["taps"] += 1
+        self._apply(token, tap, screen=True)
+
+    def _apply(self, token, tap, screen):
+        try:
+            with _on_bind(tap.bind):
+                handler = self._tap_in if tap.kind == "in" else self._tap_out
+                refused = handler(token, tap, screen)
+        except SQLAlchemyError:
+            log.exception("shard could not load card %s", tap.card_id)
+            self._cards.pop(tap.card_id, None)
+            refused = RETRY
+        finally:
+            # Loads only read: hold no snapshot between batches
+            db.session.rollback()
+
+        if refused:
+            self.stats["refused"] += 1
+            self._reply(token, {"error": refused})
+
+    def _tap_in(self, token, tap, screen):
+        card = self._card(tap)
+        if card.user_id is None or (tap.owner is not None and card.user_id != tap.owner):
+            return CARD_NOT_FOUND
+        if card.trip is not None:
+            return ACTIVE_TRIP_EXISTS
+
+        if screen:
+            verdict = screen_tap(TapEvent(
+                tap.card_id, "in", tap.at, tap.lat, tap.lng,
+                agency_id=tap.agency_id, terminal=tap.terminal, user_id=card.user_id
+            ))
+            if verdict.blocked:
+                return CARD_BLOCKED
+
+        if tap.min_balance is not None and not self._covers(card.user_id, tap.min_balance):
+            return INSUFFICIENT_BALANCE
+
+        card.trip = _Trip(
+            id=None,
+            user_id=card.user_id,
+            agency_id=tap.agency_id,
+            card_id=tap.card_id,
+            start_time=tap.at,
+            start_lat=tap.lat,
+            start_lng=tap.lng,
+        )
+        self._queue(_Op(token, tap, card, card.trip))
+        return None
+
+    def _tap_out(self, token, tap, screen):
+        card = self._card(tap)
+        if card.user_id is None:
+            return CARD_NOT_FOUND
+
+        trip = card.trip
+        if (
+            trip is None
+            or (tap.owner is not None and card.user_id != tap.owner)
+            or (tap.agency_id is not None and trip.agency_id != tap.agency_id)
+        ):
+            return NO_ACTIVE_TRIP
+
+        if trip.id is None:
+            # Tapped in earlier in this batch: write that first, the
+            # tap-out updates the trip by id
+            self.flush()
+            return self._tap_out(token, tap, screen)
+
+        if screen:
+            # Recorded only: refusing a tap-out would strand the trip
+            screen_tap(TapEvent(
+                tap.card_id, "out", tap.at, tap.lat, tap.lng,
+                agency_id=trip.agency_id, terminal=tap.terminal, user_id=card.user_id
+            ))
+
+        state = fare_state_store.load(tap.card_id)
+        fare, new_state = apply_caps(
+            CapPolicy.from_config(current_app.config), state,
+            self._base_fare(tap, trip), trip.agency_id, trip.start_time, tap.at
+        )
+
+        if not self._covers(card.user_id, fare.amount):
+            return INSUFFICIENT_BALANCE
+
+        trip.end_time = tap.at
+        trip.end_lat = tap.lat
+        trip.end_lng = tap.lng
+        trip.fare = fare.amount
+        card.trip = None
+        self._balances[card.user_id] -= fare.amount
+
+        self._queue(_Op(token, tap, card, trip, fare, new_state, state.version))
+        return None
+
+    @staticmethod
+    def _base_fare(tap, trip) -> FareResult:
+        if tap.pricing == "distance":
+            from app import calculate_fare
+            return FareResult(amount=calculate_fare(
+                trip.start_lat, trip.start_lng, tap.lat, tap.lng
+            ))
+
+        return FareEngine.calculate(
+            FareContext(
+                agency="Rea Vaya",  # Later derive from agency_id
+                start_lat=trip.start_lat,
+                start_lng=trip.start_lng,
+                end_lat=tap.lat,
+                end_lng=tap.lng,
+                start_time=trip.start_time,
+                end_time=tap.at,
+            )
+        )
+
+    def _queue(self, op):
+        op.card.pending = True
+        self._ops.append(op)
+
+    # --------------------------------------------------
+    # Hot state
+    # --------------------------------------------------
+
+    def _card(self, tap) -> _Card:
+        cfg = current_app.config
+        key = tap.card_id
+        now = time.monotonic()
+
+        card = self._cards.get(key)
+        if card is not None and (card.pending or now - card.loaded_at < cfg["TAPSHARD_STATE_TTL_SECONDS"]):
+            self._cards.move_to_end(key)
+            return card
+
+        card = self._cards[key] = self._load(tap, now)
+        self._cards.move_to_end(key)
+
+        while len(self._cards) > cfg["TAPSHARD_MAX_CARDS"]:
+            old_key, old = self._cards.popitem(last=False)
+            if old.pending:
+                # Its unwritten tap is the truth: keep it
+                self._cards[old_key] = old
+                break
+        return card
+
+    def _load(self, tap, now) -> _Card:
+        row = db.session.execute(
+            select(Card.user_id, User.balance)
+            .join(User, User.id == Card.user_id)
+            .where(Card.card_id == tap.card_id)
+        ).first()
+        if row is None:
+            return _Card(user_id=None, trip=None, loaded_at=now)
+
+        trip = db.session.execute(
+            select(
+                Trip.id, Trip.user_id, Trip.agency_id,
+                Trip.start_time, Trip.start_lat, Trip.start_lng
+            )
+            .where(Trip.card_id == tap.card_id, Trip.status == TripStatus.in_progress)
+            .order_by(Trip.start_time.desc())
+            .limit(1)
+        ).first()
+
+        self._set_balance(row.user_id, row.balance)
+        return _Card(
+            user_id=row.user_id,
+            trip=_Trip(card_id=tap.card_id, **trip._asdict()) if trip else None,
+            loaded_at=now,
+        )
+
+    def _set_balance(self, user_id, balance):
+        # Fares queued but not yet written are already spent
+        unwritten = sum(
+            op.fare.amount for op in self._ops
+            if op.fare is not None and op.card.user_id == user_id
+        )
+        self._balances[user_id] = balance - unwritten
+        self._balances.move_to_end(user_id)
+        while len(self._balances) > current_app.config["TAPSHARD_MAX_CARDS"]:
+            self._balances.popitem(last=False)
+
+    def _covers(self, user_id, amount) -> bool:
+        if user_id in self._balances and self._balances[user_id] >= amount:
+            return True
+
+        # The cached balance may predate a top-up: re-read before refusing
+        balance = db.session.execute(
+            select(User.balance).where(User.id == user_id)
+        ).scalar_one()
+        self._set_balance(user_id, balance)
+        return self._balances[user_id] >= amount
+
+    def _forget(self, ops):
+        for op in ops:
+            self._cards.pop(op.tap.card_id, None)
+            self._balances.pop(op.card.user_id, None)
+            fare_state_store.forget(op.tap.card_id)
+
+    # --------------------------------------------------
+    # Write-through
+    # --------------------------------------------------
+
+    def flush(self) -> int:
+        """
+        Write and answer the pending taps. Returns how many were pending.
+        """
+        ops, self._ops = self._ops, []
+        if not ops:
+            return 0
+
+        failed = self._commit(ops)
+        if failed:
+            # A writer outside the shard moved one of these cards
+            self.stats["replays"] += 1
+            self._forget(failed)
+            for op in failed:
+                self._apply(op.token, op.tap, screen=False)
+
+            again, self._ops = self._ops, []
+            if again:
+                failed = self._commit(again, isolate=True)
+                self._forget(failed)
+                for op in failed:
+                    self.stats["retries"] += 1
+                    self._reply(op.token, {"error": RETRY})
+
+        if flag_buffer.pending():
+            flag_buffer.flush()
+        return len(ops)
+
+    def _commit(self, ops, isolate=False) -> list:
+        """
+        One transaction per tenant engine. Returns the ops whose
+        transaction was rolled back; the rest are answered.
+
+        isolate: a failed transaction is retried as two halves, and so
+        on down to one card's taps, so only the cards at fault fail.
+        """
+        groups = defaultdict(list)
+        for op in ops:
+            groups[op.tap.bind].append(op)
+
+        failed = []
+        for bind, group in groups.items():
+            if isolate:
+                # A card's taps stay together and in order: its tap-out
+                # must not be dropped while its next tap-in commits
+                by_card = defaultdict(list)
+                for op in group:
+                    by_card[op.tap.card_id].append(op)
+                failed.extend(self._commit_isolated(bind, list(by_card.values())))
+            elif not self._commit_group(bind, group):
+                failed.extend(group)
+
+        return failed
+
+    def _commit_isolated(self, bind, cards) -> list:
+        group = [op for ops in cards for op in ops]
+        if self._commit_group(bind, group):
+            return []
+        if len(cards) == 1:
+            return group
+
+        half = len(cards) // 2
+        return self._commit_isolated(bind, cards[:half]) + self._commit_isolated(bind, cards[half:])
+
+    def _commit_group(self, bind, group) -> bool:
+        with _on_bind(bind):
+            try:
+                written = self._write(group)
+                if written:
+                    db.session.commit()
+                else:
+                    db.session.rollback()
+            except Exception:
+                log.exception("shard batch of %d taps failed", len(group))
+                db.session.rollback()
+                written = False
+
+            if written:
+                self._answer(group)
+        return written
+
+    def _write(self, group) -> bool:
+        now = datetime.utcnow()
+        trips = Trip.__table__
+        tap_ins = [op for op in group if op.tap.kind == "in"]
+        tap_outs = [op for op in group if op.tap.kind == "out"]
+
+        if tap_ins:
+            ids = db.session.execute(
+                insert(trips).returning(trips.c.id, sort_by_parameter_order=True),
+                [{
+                    "user_id": op.trip.user_id,
+                    "agency_id": op.trip.agency_id,
+                    "card_id": op.trip.card_id,
+                    "start_time": op.trip.start_time,
+                    "start_lat": op.trip.start_lat,
+                    "start_lng": op.trip.start_lng,
+                    "fare": 0.0,
+                    "status": TripStatus.in_progress,
+                    "created_at": now,
+                } for op in tap_ins]
+            ).scalars().all()
+            for op, trip_id in zip(tap_ins, ids):
+                op.trip.id = trip_id
+
+        if tap_outs:
+            stmt = (
+                update(trips)
+                .where(trips.c.id == bindparam("b_id"), trips.c.status == TripStatus.in_progress)
+                .values(
+                    end_time=bindparam("b_end_time"),
+                    end_lat=bindparam("b_end_lat"),
+                    end_lng=bindparam("b_end_lng"),
+                    fare=bindparam("b_fare"),
+                    status=TripStatus.completed,
+                )
+            )
+            rows = [{
+                "b_id": op.trip.id,
+                "b_end_time": op.trip.end_time,
+                "b_end_lat": op.trip.end_lat,
+                "b_end_lng": op.trip.end_lng,
+                "b_fare": op.trip.fare,
+            } for op in tap_outs]
+
+            # executemany reports a total rowcount only on some drivers
+            if db.session.get_bind().dialect.supports_sane_multi_rowcount:
+                matched = db.session.execute(stmt, rows).rowcount == len(rows)
+            else:
+                matched = all(db.session.execute(stmt, row).rowcount == 1 for row in rows)
+            if not matched:
+                return False
+
+            saved = fare_state_store.write_many([(op.state, op.seen_version) for op in tap_outs])
+            if saved is None:
+                return False
+            for op, state in zip(tap_outs, saved):
+                op.state = state
+
+            db.session.execute(insert(Transaction.__table__), [{
+                "user_id": op.trip.user_id,
+                "agency_id": op.trip.agency_id,
+                "amount": op.fare.amount,
+                "type": TransactionType.fare,
+                "reference": op.tap.reference,
+                "meta": {
+                    "trip_id": op.trip.id,
+                    "start": [op.trip.start_lat, op.trip.start_lng],
+                    "end": [op.trip.end_lat, op.trip.end_lng],
+                    "fare_breakdown": op.fare.breakdown,
+                },
+                "settled": False,
+                "created_at": now,
+            } for op in tap_outs])
+
+            per_user = defaultdict(float)
+            for op in tap_outs:
+                per_user[op.trip.user_id] += op.fare.amount
+
+            users = User.__table__
+            db.session.execute(
+                update(users)
+                .where(users.c.id == bindparam("uid"))
+                .values(balance=users.c.balance - bindparam("amount")),
+                [{"uid": uid, "amount": amount} for uid, amount in per_user.items()]
+            )
+
+            # Core update: the ORM hook that feeds terminal sync did not see it
+            log_balance_changes({uid: -amount for uid, amount in per_user.items()})
+
+        for op in group:
+            if op.tap.kind == "in":
+                outbox.tap_in(op.trip, terminal=op.tap.terminal)
+            else:
+                outbox.tap_out(op.trip, terminal=op.tap.terminal)
+
+        return True
+
+    def _answer(self, group):
+        self.stats["batches"] += 1
+        self.stats["written"] += len(group)
+
+        # Committed balances (top-ups and other shards' fares included)
+        user_ids = {op.trip.user_id for op in group}
+        fresh = db.session.execute(
+            select(User.id, User.balance).where(User.id.in_(user_ids))
+        ).all()
+        db.session.rollback()
+        for user_id, balance in fresh:
+            self._set_balance(user_id, balance)
+
+        for op in group:
+            op.card.pending = False
+
+            if op.tap.kind == "in":
+                self._reply(op.token, {
+                    "ok": True,
+                    "trip_id": op.trip.id,
+                    "started_at": iso(op.trip.start_time),
+                })
+                continue
+
+            fare_state_store.remember(op.state)
+            self._reply(op.token, {
+                "ok": True,
+                "trip_id": op.trip.id,
+                "fare": op.fare.amount,
+                "balance": self._balances.get(op.trip.user_id),
+            })
@@ -0,0 +1,27 @@
+"""
+MzansiPass Stale-Trip Sweeper
+-----------------------------
+
+Closes trips left in_progress by riders who never tapped out, so they
+stop blocking the next tap_in (409) and bloating active-trip scans.
+
+Per agency, trips older than stale_trip_hours are either charged the
+agency's max_fare through the ledger or cancelled, in bounded batches
+claimed with SELECT ... FOR UPDATE SKIP LOCKED so live taps are never
+blocked and parallel sweepers never collide.
+
+- engine.py    batch logic
+- commands.py  `flask trips sweep` (schedule via cron / k8s CronJob)
+
+Public API:
+- sweep
+- trips_cli
+"""
+
+from .engine import sweep
+from .commands import trips_cli
+
+__all__ = [
+    "sweep",
+    "trips_cli",
+]
@@ -0,0 +1,16 @@
+import json
+
+import click
+from flask.cli import AppGroup
+
+from sweeper.engine import sweep
+
+trips_cli = AppGroup("trips", help="Trip maintenance jobs.")
+
+
+@trips_cli.command("sweep")
+@click.option("--max-batches", type=int, default=None,
+              help="Stop after this many batches (default: until no stale trips).")
+def sweep_command(max_batches):
+    """Close trips nobody tapped out of; prints run metrics as JSON."""
+    click.echo(json.dumps(sweep(max_batches=max_batches)))
@@ -0,0 +1,176 @@
+# sweeper/engine.py
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update, insert, bindparam
+
+from models import (
+    db, Trip, TripStatus, Transaction, TransactionType, User, TransportAgency
+)
+from terminals.changes import log_balance_changes
+import outbox
+
+CHARGE_MAX = "charge_max"
+CANCEL = "cancel"
+POLICIES = (CHARGE_MAX, CANCEL)
+
+
+def agency_settings(agency, cfg):
+    return (
+        agency.stale_trip_hours or cfg["STALE_TRIP_HOURS"],
+        agency.stale_trip_policy or cfg["STALE_TRIP_POLICY"],
+        agency.max_fare if agency.max_fare is not None else cfg["STALE_TRIP_MAX_FARE"],
+    )
+
+
+def _claim(agency_id, cutoff, limit):
+    """
+    Lock up to `limit` stale trips; rows locked by a live tap-out (or
+    another sweeper) are skipped, not waited on.
+    """
+    return db.session.execute(
+        select(Trip.id, Trip.user_id, Trip.card_id, Trip.start_time)
+        .where(
+            Trip.agency_id == agency_id,
+            Trip.status == TripStatus.in_progress,
+            Trip.start_time < cutoff
+        )
+        .order_by(Trip.start_time)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+
+def _emit_closed(rows, agency_id, fare, now):
+    # Transient Trips: only their attributes go into the events
+    for r in rows:
+        outbox.tap_out(Trip(
+            id=r.id, user_id=r.user_id, agency_id=agency_id, card_id=r.card_id,
+            start_time=r.start_time, end_time=now, fare=fare
+        ), auto_closed=True)
+
+
+def _close(rows, agency_id, policy, max_fare, now):
+    ids = [r.id for r in rows]
+
+    if policy == CANCEL:
+        db.session.execute(
+            update(Trip)
+            .where(Trip.id.in_(ids))
+            .values(status=TripStatus.cancelled, end_time=now, fare=0.0)
+            .execution_options(synchronize_session=False)
+        )
+        _emit_closed(rows, agency_id, 0.0, now)
+        return 0.0
+
+    db.session.execute(
+        update(Trip)
+        .where(Trip.id.in_(ids))
+        .values(status=TripStatus.completed, end_time=now, fare=max_fare)
+        .execution_options(synchronize_session=False)
+    )
+
+    # One ledger row per trip; the reference makes re-runs idempotent
+    db.session.execute(insert(Transaction.__table__), [{
+        "user_id": r.user_id,
+        "agency_id": agency_id,
+        "amount": max_fare,
+        "type": TransactionType.fare,
+        "reference": f"stale_{r.id}",
+        "meta": {
+            "trip_id": r.id,
+            "card_id": r.card_id,
+            "reason": "no_tap_out",
+            "started_at": r.start_time.isoformat(),
+        },
+        "settled": False,
+        "created_at": now,
+    } for r in rows])
+
+    per_user = defaultdict(float)
+    for r in rows:
+        per_user[r.user_id] += max_fare
+
+    # Balances may go negative: the fare is owed either way
+    users = User.__table__
+    db.session.execute(
+        update(users)
+        .where(users.c.id == bindparam("uid"))
+        .values(balance=users.c.balance - bindparam("amount")),
+        [{"uid": uid, "amount": amount} for uid, amount in per_user.items()]
+    )
+
+    # Core update: the ORM hook that feeds terminal sync did not see it
+    log_balance_changes({uid: -amount for uid, amount in per_user.items()})
+    _emit_closed(rows, agency_id, max_fare, now)
+    return max_fare * len(rows)
+
+
+def sweep(now: datetime | None = None, max_batches: int | None = None) -> dict:
+    """
+    Sweep every active agency. Returns per-run metrics.
+    """
+    cfg = current_app.config
+    now = now or datetime.utcnow()
+    batch_size = cfg["STALE_TRIP_BATCH_SIZE"]
+    started = time.perf_counter()
+
+    metrics = {
+        "run_id": uuid.uuid4().hex[:12],
+        "closed": 0,
+        "charged": 0,
+        "cancelled": 0,
+        "amount_charged": 0.0,
+        "batches": 0,
+        "agencies": {},
+        "skipped": [],
+    }
+
+    agencies = TransportAgency.query.filter_by(is_active=True).all()
+    for agency in agencies:
+        hours, policy, max_fare = agency_settings(agency, cfg)
+        if policy not in POLICIES:
+            # A typo must not quietly charge every stale trip the max fare
+            current_app.logger.error(
+                "stale_trip_sweep run=%s agency=%s unknown stale_trip_policy %r, skipped",
+                metrics["run_id"], agency.code, policy
+            )
+            metrics["skipped"].append(agency.code)
+            continue
+
+        cutoff = now - timedelta(hours=hours)
+        closed = 0
+
+        while max_batches is None or metrics["batches"] < max_batches:
+            rows = _claim(agency.id, cutoff, batch_size)
+            if not rows:
+                db.session.rollback()
+                break
+
+            amount = _close(rows, agency.id, policy, max_fare, now)
+            db.session.commit()
+
+            closed += len(rows)
+            metrics["batches"] += 1
+            metrics["amount_charged"] += amount
+            metrics["cancelled" if policy == CANCEL else "charged"] += len(rows)
+
+            if len(rows) < batch_size:
+                break
+
+        if closed:
+            metrics["agencies"][agency.code] = closed
+        metrics["closed"] += closed
+
+    metrics["amount_charged"] = round(metrics["amount_charged"], 2)
+    metrics["seconds"] = round(time.perf_counter() - started, 3)
+
+    current_app.logger.info(
+        "stale_trip_sweep run=%s closed=%d charged=%d cancelled=%d batches=%d seconds=%.3f",
+        metrics["run_id"], metrics["closed"], metrics["charged"],
+        metrics["cancelled"], metrics["batches"], metrics["seconds"]
+    )
+    return metrics
@@ -0,0 +1,49 @@
+"""
+MzansiPass Tenancy
+------------------
+
+Per-agency routing for the agency blueprints, so a large operator's
+exports and dashboards cannot starve a small operator's taps.
+
+One registry (Config.AGENCY_TENANTS) maps an agency to:
+- its own connection pool (a Flask-SQLAlchemy bind) on the main
+  database
+- a Postgres schema placed first on that pool's search_path
+- a statement timeout
+- a request rate limit (token bucket, see ratelimit/)
+
+Agencies without an entry share the default pool, unlimited.
+agency_required() enters the tenant for every agency request; after
+that db.session transparently uses the tenant's engine.
+
+Every tenant reads and writes the same tables: rider routes, the
+shards and the background jobs never enter a tenant, so a rider's
+balance, cards, trips and ledger must be one set of rows. A tenant's
+schema is for the agency's own objects (reports, views); it must not
+hold a copy of a shared table, or that copy would shadow the public
+one for the agency's requests only. Separate database URLs are
+rejected for the same reason.
+
+Public API:
+- configure_tenants(app)   call before db.init_app(app)
+- enter_tenant(agency_id)
+- tenant_engine(agency_id)
+- TenantRoutingSession
+- tenants_cli
+"""
+
+from .session import TenantRoutingSession
+from .registry import (
+    TenantSpec, TenantRegistry, configure_tenants, enter_tenant, tenant_engine
+)
+from .commands import tenants_cli
+
+__all__ = [
+    "TenantRoutingSession",
+    "TenantSpec",
+    "TenantRegistry",
+    "configure_tenants",
+    "enter_tenant",
+    "tenant_engine",
+    "tenants_cli",
+]
@@ -0,0 +1,26 @@
+import json
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+tenants_cli = AppGroup("tenants", help="Agency tenant routing.")
+
+
+@tenants_cli.command("show")
+def show_command():
+    """Print the resolved routing for every configured agency."""
+    registry = current_app.extensions["tenancy"]
+    binds = current_app.config["SQLALCHEMY_BINDS"]
+
+    for agency_id, spec in sorted(registry.specs.items()):
+        engine = dict(binds[spec.bind_key])
+        # Never print credentials
+        engine["url"] = engine["url"].split("@")[-1]
+        click.echo(json.dumps({
+            "agency_id": agency_id,
+            "bind": spec.bind_key,
+            "engine": engine,
+            "rate_limit": spec.rate_limit,
+            "burst": spec.burst,
+        }))
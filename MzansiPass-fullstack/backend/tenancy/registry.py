@@ -0,0 +1,123 @@
+# tenancy/registry.py
+from dataclasses import dataclass
+
+from flask import current_app, g
+
+from ratelimit import limiter
+
+
+@dataclass(frozen=True)
+class TenantSpec:
+    agency_id: int
+    schema: str | None = None         # Postgres only, see tenancy/__init__
+    pool_size: int = 5
+    max_overflow: int = 5
+    statement_timeout_ms: int | None = None
+    rate_limit: float = 0.0           # requests / second, 0 = unlimited
+    burst: int = 0
+
+    @property
+    def bind_key(self) -> str:
+        return f"agency_{self.agency_id}"
+
+    @classmethod
+    def from_config(cls, agency_id, raw: dict):
+        if "url" in raw:
+            # Riders' balances, cards and ledger would split across two
+            # databases: rider routes never enter a tenant
+            raise RuntimeError(
+                f"AGENCY_TENANTS[{agency_id}]: url is not supported, "
+                "tenants share the main database"
+            )
+        known = {k: v for k, v in raw.items() if k in cls.__dataclass_fields__}
+        return cls(agency_id=int(agency_id), **known)
+
+
+class TenantRegistry:
+    def __init__(self, specs: dict):
+        self.specs = specs
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls({
+            int(agency_id): TenantSpec.from_config(agency_id, raw)
+            for agency_id, raw in (cfg.get("AGENCY_TENANTS") or {}).items()
+        })
+
+    def get(self, agency_id):
+        return self.specs.get(agency_id)
+
+    def throttle(self, agency_id) -> float:
+        spec = self.specs.get(agency_id)
+        if spec is None or spec.rate_limit <= 0:
+            return 0.0
+
+        # Same backend as the endpoint limits, so Redis makes it global
+        burst = spec.burst or max(1, int(spec.rate_limit))
+        return limiter.hit(f"tenant:{agency_id}", spec.rate_limit, burst)
+
+
+def _engine_options(spec: TenantSpec, url: str) -> dict:
+    options = {"url": url}
+
+    if not url.startswith("sqlite"):
+        options.update(pool_size=spec.pool_size, max_overflow=spec.max_overflow)
+
+    if url.startswith("postgresql"):
+        pg = []
+        if spec.schema:
+            pg.append(f"-c search_path={spec.schema},public")
+        if spec.statement_timeout_ms:
+            pg.append(f"-c statement_timeout={spec.statement_timeout_ms}")
+        if pg:
+            options["connect_args"] = {"options": " ".join(pg)}
+
+    return options
+
+
+def configure_tenants(app):
+    """
+    Build the registry and one SQLALCHEMY_BINDS entry per tenant.
+    Must run before db.init_app(app), which creates the engines.
+    """
+    registry = TenantRegistry.from_config(app.config)
+
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    for spec in registry.specs.values():
+        binds[spec.bind_key] = _engine_options(spec, app.config["SQLALCHEMY_DATABASE_URI"])
+    app.config["SQLALCHEMY_BINDS"] = binds
+
+    app.extensions["tenancy"] = registry
+    return registry
+
+
+def enter_tenant(agency_id) -> float:
+    """
+    Route this request's db.session to the agency's engine.
+
+    Returns 0, or the Retry-After seconds when the agency is over its
+    rate limit (the caller should answer 429 and not touch the DB).
+    """
+    registry = current_app.extensions.get("tenancy")
+    if registry is None:
+        return 0.0
+
+    wait = registry.throttle(agency_id)
+    if wait:
+        return wait
+
+    spec = registry.get(agency_id)
+    if spec is not None:
+        g.tenant_bind = spec.bind_key
+    return 0.0
+
+
+def tenant_engine(agency_id):
+    """
+    The engine the agency's requests use, for work done on a
+    connection of its own rather than through db.session.
+    """
+    db = current_app.extensions["sqlalchemy"]
+    registry = current_app.extensions.get("tenancy")
+    spec = registry.get(agency_id) if registry is not None else None
+    return db.engines[spec.bind_key] if spec is not None else db.engine
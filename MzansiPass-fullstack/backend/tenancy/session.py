@@ -0,0 +1,24 @@
+# tenancy/session.py
+"""
+db.session class that routes to the current tenant's engine.
+
+Imported by models.py, so it must not import models itself.
+"""
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+
+
+def current_tenant_bind():
+    if not has_app_context():
+        return None
+    return g.get("tenant_bind")
+
+
+class TenantRoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            key = current_tenant_bind()
+            if key is not None:
+                return self._db.engines[key]
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,43 @@
+"""
+MzansiPass Terminal Sync
+------------------------
+
+Lets validators keep working without connectivity.
+
+A terminal downloads a compact snapshot of the cards that may tap in
+(linked, balance >= TAP_MIN_BALANCE), then polls small deltas since
+its version. It accepts taps against that local list and uploads them
+in bulk once it is back online.
+
+    GET  /api/terminals/cards/snapshot          binary, see codec.py
+    GET  /api/terminals/cards/delta?since=<v>   binary; 410 -> re-snapshot
+    POST /api/terminals/taps                    {"taps": [{ref, card_id, kind, at, lat, lng}]}
+
+Card state changes are logged to card_sync_log (changes.py), which
+is what versions and deltas are read from.
+
+Public API:
+- terminals_bp
+- terminals_cli
+- log_users(user_ids), log_cards(card_ids),
+  log_balance_changes({user_id: amount})    for writers that bypass the ORM
+- encode_snapshot, decode_snapshot, encode_delta, decode_delta, card_hash
+"""
+
+from .changes import log_users, log_cards, log_balance_changes
+from .codec import encode_snapshot, decode_snapshot, encode_delta, decode_delta, card_hash
+from .routes import terminals_bp
+from .commands import terminals_cli
+
+__all__ = [
+    "terminals_bp",
+    "terminals_cli",
+    "log_users",
+    "log_cards",
+    "log_balance_changes",
+    "encode_snapshot",
+    "decode_snapshot",
+    "encode_delta",
+    "decode_delta",
+    "card_hash",
+]
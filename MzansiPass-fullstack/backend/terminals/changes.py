@@ -0,0 +1,222 @@
+# terminals/changes.py
+"""
+Feeds card_sync_log.
+
+ORM writes are caught in the session flush: a user whose balance
+crosses TAP_MIN_BALANCE, or a card added / (un)linked / deleted, gets
+its cards' absolute state appended in the same transaction. Ordinary
+fares and top-ups that stay on one side of the threshold log nothing.
+
+Core bulk writes bypass the ORM and must call log_balance_changes()
+/ log_cards() themselves (see sweeper/engine.py, provisioning/).
+
+Entries get their version only as the transaction commits, under the
+SYNC_CLOCK row lock: versions are handed out in commit order, so once
+a reader sees version V no transaction can still add one below it,
+however long it ran.
+"""
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, insert, select, update, and_, or_, case, literal
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Card, User, CardSyncEntry, ConsumerCursor
+from tenancy.session import TenantRoutingSession
+
+_INFO_KEY = "card_sync"
+_STAMP_KEY = "card_sync_unstamped"
+
+# consumer_cursors row: last version handed out
+SYNC_CLOCK = "terminal_sync_clock"
+
+
+def allowed_expr(min_balance):
+    return case(
+        (and_(Card.linked.isnot(False), User.balance >= min_balance), True),
+        else_=False
+    )
+
+
+def _logged(session):
+    # before_commit stamps the entries
+    session.info[_STAMP_KEY] = True
+
+
+def _state_insert(min_balance, where):
+    return insert(CardSyncEntry).from_select(
+        ["card_id", "allowed", "created_at"],
+        select(Card.card_id, allowed_expr(min_balance), literal(datetime.utcnow()))
+        .join(User, User.id == Card.user_id)
+        .where(where)
+    )
+
+
+def log_users(user_ids, session=None):
+    """
+    Append the current state of every card of these users.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+
+    session = session or db.session
+    session.execute(_state_insert(
+        current_app.config["TAP_MIN_BALANCE"], Card.user_id.in_(user_ids)
+    ))
+    _logged(session)
+
+
+def log_balance_changes(changes, session=None):
+    """
+    Core balance updates: {user_id: amount added (negative: charged)},
+    already applied in this transaction. Logs the cards of the riders
+    the change moved across TAP_MIN_BALANCE, and no one else.
+    """
+    if not changes:
+        return
+
+    session = session or db.session
+    min_balance = current_app.config["TAP_MIN_BALANCE"]
+    rows = session.execute(
+        select(User.id, User.balance).where(User.id.in_(list(changes)))
+    ).all()
+    log_users([
+        user_id for user_id, balance in rows
+        if (balance >= min_balance) != (balance - changes[user_id] >= min_balance)
+    ], session=session)
+
+
+def log_cards(card_ids, session=None):
+    """
+    Append the current state of these cards (e.g. after a bulk import).
+    """
+    card_ids = list(card_ids)
+    if not card_ids:
+        return
+
+    session = session or db.session
+    session.execute(_state_insert(
+        current_app.config["TAP_MIN_BALANCE"], Card.card_id.in_(card_ids)
+    ))
+    _logged(session)
+
+
+def _crossed(user, min_balance):
+    history = sa_inspect(user).attrs.balance.history
+    if not history.deleted or not history.added:
+        return False
+    old, new = history.deleted[0] or 0, history.added[0] or 0
+    return (old >= min_balance) != (new >= min_balance)
+
+
+@event.listens_for(TenantRoutingSession, "before_flush")
+def _collect(session, flush_context, instances):
+    if not has_app_context():
+        return
+
+    min_balance = current_app.config["TAP_MIN_BALANCE"]
+    user_ids, card_ids, removed = set(), set(), set()
+
+    for obj in session.dirty:
+        if isinstance(obj, User) and _crossed(obj, min_balance):
+            user_ids.add(obj.id)
+        elif isinstance(obj, Card) and sa_inspect(obj).attrs.linked.history.has_changes():
+            card_ids.add(obj.card_id)
+
+    for obj in session.new:
+        if isinstance(obj, Card):
+            card_ids.add(obj.card_id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Card):
+            removed.add(obj.card_id)
+
+    if user_ids or card_ids or removed:
+        pending = session.info.setdefault(_INFO_KEY, (set(), set(), set()))
+        pending[0].update(user_ids)
+        pending[1].update(card_ids)
+        pending[2].update(removed)
+
+
+@event.listens_for(TenantRoutingSession, "after_flush")
+def _write(session, flush_context):
+    pending = session.info.pop(_INFO_KEY, None)
+    if pending is None:
+        return
+
+    user_ids, card_ids, removed = pending
+    min_balance = current_app.config["TAP_MIN_BALANCE"]
+
+    if user_ids or card_ids:
+        session.execute(_state_insert(
+            min_balance,
+            or_(Card.user_id.in_(user_ids), Card.card_id.in_(card_ids))
+        ))
+
+    if removed:
+        now = datetime.utcnow()
+        session.execute(insert(CardSyncEntry), [
+            {"card_id": c, "allowed": False, "created_at": now} for c in removed
+        ])
+
+    _logged(session)
+
+
+def _advance_clock(session, count) -> int:
+    """
+    Reserve `count` versions; returns the highest. The clock row stays
+    locked until this transaction ends.
+    """
+    bump = (
+        update(ConsumerCursor)
+        .where(ConsumerCursor.name == SYNC_CLOCK)
+        .values(position=ConsumerCursor.position + count)
+        .returning(ConsumerCursor.position)
+    )
+    top = session.execute(bump).scalar()
+    if top is not None:
+        return top
+
+    try:
+        with session.begin_nested():
+            start = session.execute(select(func.max(CardSyncEntry.version))).scalar() or 0
+            session.execute(insert(ConsumerCursor).values(
+                name=SYNC_CLOCK, position=start + count, updated_at=datetime.utcnow()
+            ))
+        return start + count
+    except IntegrityError:
+        # Another transaction created it first
+        return session.execute(bump).scalar()
+
+
+@event.listens_for(TenantRoutingSession, "before_commit")
+def _stamp(session):
+    # commit() flushes after this hook: flush first, it may log entries
+    session.flush()
+    if not session.info.pop(_STAMP_KEY, False):
+        return
+
+    # Readers only see committed entries, all stamped: NULL is ours
+    count = session.execute(
+        select(func.count()).where(CardSyncEntry.version.is_(None))
+    ).scalar()
+    if not count:
+        return
+
+    base = _advance_clock(session, count) - count
+    ranked = (
+        select(
+            CardSyncEntry.id,
+            func.row_number().over(order_by=CardSyncEntry.id).label("n")
+        )
+        .where(CardSyncEntry.version.is_(None))
+        .subquery()
+    )
+    session.execute(
+        update(CardSyncEntry)
+        .where(CardSyncEntry.id == ranked.c.id)
+        .values(version=base + ranked.c.n)
+        .execution_options(synchronize_session=False)
+    )
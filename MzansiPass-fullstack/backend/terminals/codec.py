@@ -0,0 +1,91 @@
+# terminals/codec.py
+"""
+Binary formats shared with the validator firmware.
+
+Cards are identified by an 8-byte BLAKE2b hash of card_id (collision
+odds ~ n^2 / 2^65: negligible for tens of millions of cards), so the
+terminal never stores card numbers.
+
+Snapshot  (allowed cards at `version`)
+
+    ">4sQI"  magic b"MZS1", version, count
+    zlib( ">{count}Q" of the sorted hashes, gap-encoded )
+
+    Sorted 64-bit hashes differ in their top bytes only slowly, so the
+    gaps have leading zero bytes and zlib takes them to ~7 bytes per
+    card: about 6.8 MB for a million cards.
+
+Delta  (changes in (since, version])
+
+    ">4sQQI"  magic b"MZD1", since, version, count
+    zlib( count x ">QB" : hash, allowed )
+
+Apply a delta in order: allowed=1 adds the hash, allowed=0 removes it.
+"""
+import struct
+import zlib
+from hashlib import blake2b
+
+SNAPSHOT_MAGIC = b"MZS1"
+DELTA_MAGIC = b"MZD1"
+
+_SNAPSHOT_HEADER = struct.Struct(">4sQI")
+_DELTA_HEADER = struct.Struct(">4sQQI")
+_DELTA_RECORD = struct.Struct(">QB")
+
+
+def card_hash(card_id: str) -> int:
+    return int.from_bytes(blake2b(card_id.encode(), digest_size=8).digest(), "big")
+
+
+def encode_snapshot(version, card_ids) -> bytes:
+    hashes = sorted({card_hash(c) for c in card_ids})
+
+    gaps = [hashes[0]] if hashes else []
+    gaps += [b - a for a, b in zip(hashes, hashes[1:])]
+
+    body = zlib.compress(struct.pack(f">{len(gaps)}Q", *gaps), 6)
+    return _SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, version, len(hashes)) + body
+
+
+def decode_snapshot(blob: bytes):
+    """
+    -> (version, sorted list of hashes)
+    """
+    magic, version, count = _SNAPSHOT_HEADER.unpack_from(blob)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("not a card snapshot")
+
+    gaps = struct.unpack(f">{count}Q", zlib.decompress(blob[_SNAPSHOT_HEADER.size:]))
+
+    hashes, acc = [], 0
+    for g in gaps:
+        acc += g
+        hashes.append(acc)
+    return version, hashes
+
+
+def encode_delta(since, version, changes) -> bytes:
+    """
+    changes: iterable of (card_id, allowed) in version order
+    """
+    records = b"".join(
+        _DELTA_RECORD.pack(card_hash(card_id), 1 if allowed else 0)
+        for card_id, allowed in changes
+    )
+    count = len(records) // _DELTA_RECORD.size
+    return _DELTA_HEADER.pack(DELTA_MAGIC, since, version, count) + zlib.compress(records, 6)
+
+
+def decode_delta(blob: bytes):
+    """
+    -> (since, version, [(hash, allowed), ...])
+    """
+    magic, since, version, count = _DELTA_HEADER.unpack_from(blob)
+    if magic != DELTA_MAGIC:
+        raise ValueError("not a card delta")
+
+    records = zlib.decompress(blob[_DELTA_HEADER.size:])
+    return since, version, [
+        (h, bool(a)) for h, a in _DELTA_RECORD.iter_unpack(records)
+    ]
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, select
+
+from models import db, CardSyncEntry, ConsumerCursor
+from terminals.snapshot import FLOOR_CURSOR
+
+terminals_cli = AppGroup("terminals", help="Offline terminal sync.")
+
+
+@terminals_cli.command("compact")
+def compact_command():
+    """Drop sync log entries past retention; older terminals re-snapshot."""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config["TERMINAL_SYNC_RETENTION_DAYS"])
+
+    floor = db.session.execute(
+        select(func.max(CardSyncEntry.version)).where(CardSyncEntry.created_at < cutoff)
+    ).scalar()
+    if floor is None:
+        click.echo("terminals: nothing to compact")
+        return
+
+    # Floor first: a delta from below it must now answer 410
+    cursor = db.session.get(ConsumerCursor, FLOOR_CURSOR) or ConsumerCursor(name=FLOOR_CURSOR)
+    cursor.position = floor
+    db.session.add(cursor)
+
+    deleted = db.session.execute(
+        delete(CardSyncEntry).where(CardSyncEntry.version <= floor)
+    ).rowcount
+    db.session.commit()
+
+    click.echo(f"terminals: removed {deleted} entries, floor is now {floor}")
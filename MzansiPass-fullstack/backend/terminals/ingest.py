@@ -0,0 +1,269 @@
+# terminals/ingest.py
+"""
+Bulk upload of taps a terminal accepted while offline.
+
+The terminal already let the rider through, so nothing here refuses
+a journey: tap-outs are priced and charged even if that takes the
+balance negative, and anomalies only raise fraud flags. Taps that
+cannot be applied (unknown card, no open trip, a write that failed)
+are stored as rejected for the agency to review.
+
+Idempotent: (agency, terminal, ref) is unique, re-sent taps report
+their original outcome. A tap whose fare state kept changing is not
+stored and comes back as "retry".
+"""
+import logging
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import (
+    db, Card, User, Trip, TripStatus, Transaction, TransactionType, TransportAgency,
+    OfflineTap, OfflineTapStatus, TapKind
+)
+from fares.engine import FareEngine, FareContext, FareResult
+from fares.exceptions import FareCalculationError
+from fare_state import store as fare_state_store, price_with_caps
+from fraud import TapEvent, screen_tap, valid_point
+from terminals.changes import log_balance_changes
+import outbox
+
+log = logging.getLogger(__name__)
+
+
+class InvalidTap(ValueError):
+    pass
+
+
+def tap_ref(raw):
+    if not isinstance(raw, dict) or not raw.get("ref"):
+        return None
+    return str(raw["ref"])[:64]
+
+
+def parse_tap(raw):
+    ref = tap_ref(raw)
+    if ref is None:
+        raise InvalidTap("bad tap: missing ref")
+
+    try:
+        card_id = str(raw["card_id"])
+        kind = TapKind(raw["kind"])
+        tapped_at = datetime.fromisoformat(str(raw["at"]).replace("Z", "+00:00"))
+    except (KeyError, TypeError, ValueError) as exc:
+        raise InvalidTap(f"bad tap: {exc}") from exc
+
+    # Stored naive UTC like every other timestamp
+    if tapped_at.tzinfo is not None:
+        tapped_at = tapped_at.replace(tzinfo=None) - tapped_at.utcoffset()
+
+    # No GPS fix is fine (max fare); a garbled one is not
+    lat, lng = raw.get("lat"), raw.get("lng")
+    if not valid_point(lat, lng):
+        raise InvalidTap("bad tap: invalid lat/lng")
+
+    return {
+        "ref": ref,
+        "card_id": card_id,
+        "kind": kind,
+        "tapped_at": tapped_at,
+        "lat": lat,
+        "lng": lng,
+    }
+
+
+def _tap_in(agency_id, terminal_id, tap, user):
+    active = Trip.query.filter_by(
+        card_id=tap["card_id"],
+        status=TripStatus.in_progress
+    ).first()
+    if active:
+        return OfflineTapStatus.rejected, "active_trip_exists", None, None
+
+    trip = Trip(
+        user_id=user.id,
+        agency_id=agency_id,
+        card_id=tap["card_id"],
+        start_time=tap["tapped_at"],
+        start_lat=tap["lat"],
+        start_lng=tap["lng"],
+        status=TripStatus.in_progress
+    )
+    db.session.add(trip)
+    db.session.flush()
+    outbox.tap_in(trip, terminal=terminal_id, offline=True)
+    return OfflineTapStatus.applied, None, trip.id, None
+
+
+def _tap_out(agency, terminal_id, tap, user):
+    trip = (
+        Trip.query
+        .filter(
+            Trip.card_id == tap["card_id"],
+            Trip.status == TripStatus.in_progress,
+            Trip.start_time <= tap["tapped_at"]
+        )
+        .with_for_update()
+        .first()
+    )
+    if not trip:
+        return OfflineTapStatus.rejected, "no_active_trip", None, None
+
+    coords = (trip.start_lat, trip.start_lng, tap["lat"], tap["lng"])
+    if None in coords:
+        # No GPS fix on one end: the agency's maximum fare, as for a missing tap-out
+        max_fare = agency.max_fare
+        if max_fare is None:
+            max_fare = current_app.config["STALE_TRIP_MAX_FARE"]
+        base = FareResult(amount=max_fare)
+    else:
+        base = FareEngine.calculate(
+            FareContext(
+                agency="Rea Vaya",  # Later derive from agency_id
+                start_lat=trip.start_lat,
+                start_lng=trip.start_lng,
+                end_lat=tap["lat"],
+                end_lng=tap["lng"],
+                start_time=trip.start_time,
+                end_time=tap["tapped_at"],
+            )
+        )
+
+    fare_result, fare_state = price_with_caps(
+        tap["card_id"], agency.id, base, trip.start_time, tap["tapped_at"]
+    )
+    fare = fare_result.amount
+
+    trip.end_time = tap["tapped_at"]
+    trip.end_lat = tap["lat"]
+    trip.end_lng = tap["lng"]
+    trip.fare = fare
+    trip.status = TripStatus.completed
+
+    # May go negative: the terminal already admitted the rider.
+    # Relative: the users row was read unlocked at the start of the
+    # upload, and top-ups or online fares may have landed since
+    db.session.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(balance=User.balance - fare)
+        .execution_options(synchronize_session=False)
+    )
+    # Core update: the ORM hook that feeds terminal sync did not see it
+    log_balance_changes({user.id: -fare})
+
+    db.session.add(Transaction(
+        user_id=user.id,
+        agency_id=agency.id,
+        amount=fare,
+        type=TransactionType.fare,
+        reference=f"offline_{agency.id}_{terminal_id}_{tap['ref']}",
+        meta={
+            "trip_id": trip.id,
+            "offline": True,
+            "terminal_id": terminal_id,
+            "fare_breakdown": fare_result.breakdown
+        }
+    ))
+    outbox.tap_out(trip, terminal=terminal_id, offline=True)
+    return OfflineTapStatus.applied, None, trip.id, fare_state
+
+
+def ingest_taps(agency_id, terminal_id, raw_taps) -> list[dict]:
+    """
+    Apply a terminal's upload; one result per tap, in upload order.
+    """
+    agency = db.session.get(TransportAgency, agency_id)
+
+    results = {}
+    taps = []
+    for raw in raw_taps:
+        try:
+            taps.append(parse_tap(raw))
+        except InvalidTap as exc:
+            ref = tap_ref(raw)
+            results[ref] = {"ref": ref, "status": "invalid", "reason": str(exc)}
+
+    # Already uploaded?
+    seen = db.session.execute(
+        select(OfflineTap.ref, OfflineTap.status, OfflineTap.reason, OfflineTap.trip_id)
+        .where(
+            OfflineTap.agency_id == agency_id,
+            OfflineTap.terminal_id == terminal_id,
+            OfflineTap.ref.in_([t["ref"] for t in taps])
+        )
+    ).all()
+    for ref, status, reason, trip_id in seen:
+        results[ref] = {"ref": ref, "status": status.value, "reason": reason,
+                        "trip_id": trip_id, "duplicate": True}
+
+    # Card owners in one query
+    owners = dict(db.session.execute(
+        select(Card.card_id, User)
+        .join(User, User.id == Card.user_id)
+        .where(Card.card_id.in_({t["card_id"] for t in taps}))
+    ).all())
+
+    fare_states = []
+
+    # Chronological, so each card's in/out pairs line up
+    for tap in sorted(taps, key=lambda t: t["tapped_at"]):
+        if tap["ref"] in results:
+            continue
+
+        user = owners.get(tap["card_id"])
+
+        screen_tap(TapEvent(
+            tap["card_id"], tap["kind"].value, tap["tapped_at"], tap["lat"], tap["lng"],
+            agency_id=agency_id, terminal=terminal_id, user_id=user.id if user else None
+        ))
+
+        try:
+            with db.session.begin_nested():
+                if user is None:
+                    status, reason, trip_id, state = OfflineTapStatus.rejected, "unknown_card", None, None
+                elif tap["kind"] is TapKind.tap_in:
+                    status, reason, trip_id, state = _tap_in(agency_id, terminal_id, tap, user)
+                else:
+                    status, reason, trip_id, state = _tap_out(agency, terminal_id, tap, user)
+
+                db.session.add(OfflineTap(
+                    agency_id=agency_id,
+                    terminal_id=terminal_id,
+                    status=status,
+                    reason=reason,
+                    trip_id=trip_id,
+                    **tap
+                ))
+        except FareCalculationError:
+            results[tap["ref"]] = {"ref": tap["ref"], "status": "retry", "reason": "fare_state_conflict"}
+            continue
+        except SQLAlchemyError:
+            # Only this tap's savepoint is gone: keep it for review
+            log.exception("offline tap %s from %s could not be applied", tap["ref"], terminal_id)
+            status, reason, trip_id, state = OfflineTapStatus.rejected, "apply_failed", None, None
+            try:
+                with db.session.begin_nested():
+                    db.session.add(OfflineTap(
+                        agency_id=agency_id,
+                        terminal_id=terminal_id,
+                        status=status,
+                        reason=reason,
+                        **tap
+                    ))
+            except SQLAlchemyError:
+                results[tap["ref"]] = {"ref": tap["ref"], "status": "retry", "reason": reason}
+                continue
+
+        if state is not None:
+            fare_states.append(state)
+        results[tap["ref"]] = {"ref": tap["ref"], "status": status.value,
+                               "reason": reason, "trip_id": trip_id}
+
+    db.session.commit()
+    for state in fare_states:
+        fare_state_store.remember(state)
+
+    return [results.get(tap_ref(raw)) for raw in raw_taps]
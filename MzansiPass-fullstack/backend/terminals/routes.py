@@ -0,0 +1,96 @@
+from flask import Blueprint, request, jsonify, current_app, Response
+from flask_jwt_extended import get_jwt
+
+from agency.decorators import agency_required
+from ratelimit import limiter, by_agency, by_terminal
+from terminals.snapshot import snapshot_cache, build_delta, SnapshotRequired
+from terminals.ingest import ingest_taps
+
+terminals_bp = Blueprint(
+    "terminals",
+    __name__,
+    url_prefix="/api/terminals"
+)
+
+BINARY = "application/octet-stream"
+
+# ----------------------------------------------------
+# Helpers
+# ----------------------------------------------------
+
+def error(code, message, status=400):
+    return jsonify({
+        "error": code,
+        "message": message
+    }), status
+
+
+def binary(blob, version):
+    resp = Response(blob, mimetype=BINARY)
+    resp.headers["X-Sync-Version"] = str(version)
+    return resp
+
+
+# ----------------------------------------------------
+# CARD LIST (SNAPSHOT + DELTAS)
+# ----------------------------------------------------
+
+@terminals_bp.route("/cards/snapshot", methods=["GET"])
+@agency_required()
+def card_snapshot():
+    snapshot = snapshot_cache.get()
+
+    if snapshot.etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        resp = binary(snapshot.blob, snapshot.version)
+
+    resp.set_etag(snapshot.etag)
+    return resp
+
+
+@terminals_bp.route("/cards/delta", methods=["GET"])
+@agency_required()
+def card_delta():
+    since = request.args.get("since", type=int)
+    if since is None or since < 0:
+        return error("invalid_request", "since must be a version number")
+
+    try:
+        version, blob = build_delta(since)
+    except SnapshotRequired as exc:
+        # 410: drop local state and fetch /cards/snapshot
+        return error("snapshot_required", str(exc), 410)
+
+    return binary(blob, version)
+
+
+# ----------------------------------------------------
+# OFFLINE TAP UPLOAD
+# ----------------------------------------------------
+
+@terminals_bp.route("/taps", methods=["POST"])
+@agency_required()
+@limiter.limit("terminal_sync", key=by_terminal)
+@limiter.limit("agency_sync", key=by_agency)
+def upload_taps():
+    terminal_id = request.headers.get("X-Terminal-Id")
+    if not terminal_id:
+        return error("invalid_request", "Missing X-Terminal-Id")
+
+    taps = (request.get_json() or {}).get("taps")
+    if not isinstance(taps, list) or not taps:
+        return error("invalid_request", "taps must be a non-empty list")
+
+    if len(taps) > current_app.config["TERMINAL_UPLOAD_MAX_TAPS"]:
+        return error("too_many_taps", "Split the upload", 413)
+
+    results = ingest_taps(get_jwt()["agency_id"], terminal_id[:60], taps)
+
+    return jsonify({
+        "results": results,
+        "applied": sum(
+            1 for r in results
+            if r and r["status"] == "applied" and not r.get("duplicate")
+        ),
+    })
@@ -0,0 +1,109 @@
+# terminals/snapshot.py
+import time
+from dataclasses import dataclass
+from threading import Lock
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from models import db, Card, User, CardSyncEntry, ConsumerCursor
+from terminals.codec import encode_snapshot, encode_delta
+
+# Versions below this have been compacted away (see commands.py)
+FLOOR_CURSOR = "terminal_sync_floor"
+
+
+class SnapshotRequired(Exception):
+    """The terminal is too far behind for a delta."""
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: int
+    blob: bytes
+    built_at: float
+
+    @property
+    def etag(self):
+        return f"cards-{self.version}"
+
+
+def settled_version() -> int:
+    """
+    Highest version a reader can rely on: versions are handed out in
+    commit order (changes.py), so none below a visible one is still
+    in flight.
+    """
+    return db.session.execute(
+        select(func.max(CardSyncEntry.version))
+    ).scalar() or 0
+
+
+def floor_version() -> int:
+    cursor = db.session.get(ConsumerCursor, FLOOR_CURSOR)
+    return cursor.position if cursor else 0
+
+
+def build_snapshot(cfg) -> Snapshot:
+    # Version first: anything logged after it is re-sent as a delta
+    version = settled_version()
+
+    card_ids = db.session.execute(
+        select(Card.card_id)
+        .join(User, User.id == Card.user_id)
+        .where(Card.linked.isnot(False), User.balance >= cfg["TAP_MIN_BALANCE"])
+        .execution_options(yield_per=50_000)
+    ).scalars()
+
+    return Snapshot(version, encode_snapshot(version, card_ids), time.monotonic())
+
+
+class SnapshotCache:
+    """
+    One encoded snapshot per process, rebuilt at most every
+    TERMINAL_SNAPSHOT_MAX_AGE_SECONDS; terminals catch up with deltas.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._snapshot = None
+
+    def get(self) -> Snapshot:
+        cfg = current_app.config
+        with self._lock:
+            s = self._snapshot
+            if s is None or time.monotonic() - s.built_at > cfg["TERMINAL_SNAPSHOT_MAX_AGE_SECONDS"]:
+                s = self._snapshot = build_snapshot(cfg)
+            return s
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+
+snapshot_cache = SnapshotCache()
+
+
+def build_delta(since: int):
+    """
+    -> (version, encoded delta); raises SnapshotRequired.
+    """
+    cfg = current_app.config
+
+    if since < floor_version():
+        raise SnapshotRequired("history before this version was compacted")
+
+    version = settled_version()
+    limit = cfg["TERMINAL_SYNC_MAX_DELTA"]
+
+    rows = db.session.execute(
+        select(CardSyncEntry.card_id, CardSyncEntry.allowed)
+        .where(CardSyncEntry.version > since, CardSyncEntry.version <= version)
+        .order_by(CardSyncEntry.version)
+        .limit(limit + 1)
+    ).all()
+
+    if len(rows) > limit:
+        raise SnapshotRequired("too many changes; fetch a snapshot")
+
+    return version, encode_delta(since, max(version, since), rows)
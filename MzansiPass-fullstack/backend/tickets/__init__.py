@@ -0,0 +1,40 @@
+"""
+MzansiPass PRASA Tickets
+------------------------
+
+Issuing and validating PRASA tickets whose QR codes carry a compact,
+HMAC-signed payload. Gates and the TicketCounter verify a scan with
+the shared key and a periodically synced revocation bloom filter -
+no database round trip per scan.
+
+- codes.py       station and ticket type codes of the QR format
+- catalog.py     fares and validity per ticket type
+- signing.py     QR payload encoding + TicketVerifier (pure, no DB)
+- revocation.py  bloom filter of revoked, still-valid tickets
+
+TicketVerifier and RevocationFilter import neither Flask nor the
+models; tickets_bp is loaded on first access, so gates can use the
+package as is.
+
+Public API:
+- tickets_bp
+- TicketVerifier
+- RevocationFilter
+"""
+
+from .revocation import RevocationFilter
+from .signing import TicketVerifier
+
+
+def __getattr__(name):
+    if name == "tickets_bp":
+        from .routes import tickets_bp
+        return tickets_bp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    "tickets_bp",
+    "TicketVerifier",
+    "RevocationFilter",
+]
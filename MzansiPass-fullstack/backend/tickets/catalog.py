@@ -0,0 +1,33 @@
+# tickets/catalog.py
+"""
+PRASA ticket catalogue. Stations live in codes.py with the rest of
+the QR format.
+"""
+from datetime import timedelta
+
+from models import PrasaTicketType
+from tickets.codes import PRASA_STATIONS
+
+PRASA_AGENCY_CODE = "PR"
+
+# Same prices as BuyPrasaTicketModal
+TICKET_FARES = {
+    PrasaTicketType.single: 22.50,
+    PrasaTicketType.ret: 43.00,
+    PrasaTicketType.weekly: 160.00,
+    PrasaTicketType.monthly: 550.00,
+}
+
+TICKET_VALIDITY = {
+    PrasaTicketType.single: timedelta(days=1),
+    PrasaTicketType.ret: timedelta(days=1),
+    PrasaTicketType.weekly: timedelta(days=7),
+    PrasaTicketType.monthly: timedelta(days=30),
+}
+
+
+def station_index(name):
+    try:
+        return PRASA_STATIONS.index(name)
+    except ValueError:
+        return None
@@ -0,0 +1,27 @@
+# tickets/codes.py
+"""
+Values the signed QR format encodes as numbers: ticket types and
+stations. No imports beyond the standard library, so gates can load
+the verifier without Flask or the models.
+
+Station order is part of the format (stations are encoded as their
+index), so only ever APPEND to PRASA_STATIONS.
+"""
+
+PRASA_STATIONS = (
+    "Park Station",
+    "Germiston",
+    "Pretoria",
+    "Soweto",
+    "Tembisa",
+    "Mamelodi",
+)
+
+# Stable one-byte codes, keyed by PrasaTicketType value
+TYPE_CODES = {
+    "single": 1,
+    "return": 2,
+    "weekly": 3,
+    "monthly": 4,
+}
+CODE_TYPES = {v: k for k, v in TYPE_CODES.items()}
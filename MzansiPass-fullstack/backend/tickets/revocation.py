@@ -0,0 +1,57 @@
+# tickets/revocation.py
+"""
+Bloom filter of revoked tickets for offline gates.
+
+Only tickets that are revoked AND not yet expired go in, so the filter
+stays small no matter how many tickets have ever been revoked. Gates
+pull it periodically (ETag-versioned) and check membership locally.
+"""
+import hashlib
+import math
+import struct
+
+_HEADER = struct.Struct(">IB")  # bit count, hash count
+
+
+class RevocationFilter:
+    def __init__(self, bits: int, hashes: int, data: bytes | None = None):
+        self.bits = max(8, bits)
+        self.hashes = max(1, hashes)
+        self._data = bytearray(data) if data is not None else bytearray((self.bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, fp_rate: float = 0.001):
+        capacity = max(1, capacity)
+        bits = int(-capacity * math.log(fp_rate) / (math.log(2) ** 2))
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        return cls(bits, hashes)
+
+    def _positions(self, ticket_ref: str):
+        # Double hashing: h1 + i*h2 from one 128-bit digest
+        digest = hashlib.blake2b(ticket_ref.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack(">QQ", digest)
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, ticket_ref: str):
+        for pos in self._positions(ticket_ref):
+            self._data[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, ticket_ref: str) -> bool:
+        data = self._data
+        for pos in self._positions(ticket_ref):
+            if not data[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    # --------------------------------------------------
+    # Wire format (header + raw bit array)
+    # --------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(self.bits, self.hashes) + bytes(self._data)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes):
+        bits, hashes = _HEADER.unpack_from(raw)
+        return cls(bits, hashes, raw[_HEADER.size:])
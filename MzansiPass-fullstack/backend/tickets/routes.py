@@ -0,0 +1,356 @@
+import hashlib
+import os
+import time
+import uuid
+from datetime import datetime
+from threading import Lock
+
+from flask import Blueprint, request, jsonify, current_app, Response
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import func
+
+from models import (
+    db, User, Transaction, TransactionType, TransportAgency,
+    PrasaTicket, PrasaTicketType, TicketSource
+)
+from agency.decorators import agency_required
+from tickets.catalog import (
+    PRASA_AGENCY_CODE, TICKET_FARES, TICKET_VALIDITY, station_index
+)
+from tickets.revocation import RevocationFilter
+from tickets.signing import TicketVerifier
+import outbox
+
+tickets_bp = Blueprint(
+    "tickets",
+    __name__,
+    url_prefix="/api/tickets"
+)
+
+# ----------------------------------------------------
+# Helpers
+# ----------------------------------------------------
+
+def iso(dt):
+    return dt.isoformat() if dt else None
+
+
+def error(code, message, status=400):
+    return jsonify({
+        "error": code,
+        "message": message
+    }), status
+
+
+def verifier(revocations=None):
+    return TicketVerifier(current_app.config["TICKET_SIGNING_KEY"], revocations)
+
+
+def serialize_ticket(t: PrasaTicket, now: datetime) -> dict:
+    # Shape matches the frontend PrasaTicket type; qrCode replaces the
+    # client-built qrCodeUrl and is what gates scan
+    f_idx = station_index(t.from_station)
+    t_idx = station_index(t.to_station)
+    active = t.revoked_at is None and t.valid_until > now
+
+    return {
+        "id": t.ticket_ref,
+        "ticketType": t.ticket_type.value,
+        "from": t.from_station,
+        "to": t.to_station,
+        "purchaseDate": iso(t.created_at),
+        "validUntil": iso(t.valid_until),
+        "qrCode": verifier().sign(
+            t.ticket_ref, t.ticket_type, f_idx, t_idx, t.valid_from, t.valid_until
+        ),
+        "fare": t.fare,
+        "status": "active" if active else "expired",
+        "source": t.source.value,
+    }
+
+
+def parse_order(data):
+    """
+    Validate type + stations. Returns (ticket_type, error_response).
+    """
+    try:
+        ticket_type = PrasaTicketType(data.get("ticket_type"))
+    except ValueError:
+        return None, error("invalid_request", "Unknown ticket type")
+
+    frm, to = data.get("from"), data.get("to")
+    if station_index(frm) is None or station_index(to) is None:
+        return None, error("unknown_station", "Unknown PRASA station")
+    if frm == to:
+        return None, error("invalid_request", "Departure and destination must be different")
+
+    return ticket_type, None
+
+
+def prasa_agency():
+    return TransportAgency.query.filter_by(code=PRASA_AGENCY_CODE).first()
+
+
+def require_prasa():
+    """
+    Counter sales and revocations are PRASA's own: returns the agency,
+    or an error response for any other agency's token.
+    """
+    agency = prasa_agency()
+    if agency is None or get_jwt()["agency_id"] != agency.id:
+        return None, error("forbidden", "Only PRASA staff can do this", 403)
+    return agency, None
+
+
+def new_ticket(ticket_type, data, source, user_id=None):
+    now = datetime.utcnow()
+    agency = prasa_agency()
+
+    return PrasaTicket(
+        ticket_ref=os.urandom(8).hex(),
+        user_id=user_id,
+        agency_id=agency.id if agency else None,
+        ticket_type=ticket_type,
+        source=source,
+        from_station=data["from"],
+        to_station=data["to"],
+        fare=TICKET_FARES[ticket_type],
+        valid_from=now,
+        valid_until=now + TICKET_VALIDITY[ticket_type],
+        created_at=now
+    )
+
+
+# ----------------------------------------------------
+# ISSUE (PASSENGER APP)
+# ----------------------------------------------------
+
+@tickets_bp.route("/prasa", methods=["POST"])
+@jwt_required()
+def buy_ticket():
+    user_id = get_jwt_identity()["id"]
+    data = request.get_json() or {}
+
+    ticket_type, err = parse_order(data)
+    if err:
+        return err
+
+    user = User.query.filter_by(id=user_id).with_for_update().first()
+    if not user:
+        return error("user_not_found", "Unknown user", 404)
+
+    ticket = new_ticket(ticket_type, data, TicketSource.app, user_id=user.id)
+
+    if user.balance < ticket.fare:
+        db.session.rollback()
+        return error("insufficient_balance", "Not enough balance", 402)
+
+    user.balance -= ticket.fare
+    db.session.add(ticket)
+    db.session.add(Transaction(
+        user_id=user.id,
+        agency_id=ticket.agency_id,
+        amount=ticket.fare,
+        type=TransactionType.fare,
+        reference=f"prasa_{uuid.uuid4().hex}",
+        meta={
+            "ticket_ref": ticket.ticket_ref,
+            "ticket_type": ticket_type.value
+        }
+    ))
+    db.session.commit()
+
+    return jsonify(serialize_ticket(ticket, datetime.utcnow())), 201
+
+
+@tickets_bp.route("", methods=["GET"])
+@jwt_required()
+def list_tickets():
+    user_id = get_jwt_identity()["id"]
+    now = datetime.utcnow()
+
+    tickets = (
+        PrasaTicket.query
+        .filter_by(user_id=user_id)
+        .order_by(PrasaTicket.created_at.desc())
+        .limit(100)
+        .all()
+    )
+
+    return jsonify([serialize_ticket(t, now) for t in tickets])
+
+
+# ----------------------------------------------------
+# ISSUE (TICKET COUNTER)
+# ----------------------------------------------------
+
+@tickets_bp.route("/prasa/counter", methods=["POST"])
+@agency_required(roles=["admin", "staff", "finance"])
+def counter_sale():
+    agency, err = require_prasa()
+    if err:
+        return err
+
+    data = request.get_json() or {}
+
+    ticket_type, err = parse_order(data)
+    if err:
+        return err
+
+    # Cash sale: no passenger balance involved, but the cash is on the ledger
+    ticket = new_ticket(ticket_type, data, TicketSource.counter)
+    db.session.add(ticket)
+    db.session.add(Transaction(
+        user_id=None,
+        agency_id=agency.id,
+        amount=ticket.fare,
+        type=TransactionType.cash,
+        reference=f"prasa_counter_{ticket.ticket_ref}",
+        meta={
+            "ticket_ref": ticket.ticket_ref,
+            "ticket_type": ticket_type.value,
+            "sold_by": get_jwt_identity()["agency_user_id"]
+        }
+    ))
+    db.session.commit()
+
+    return jsonify(serialize_ticket(ticket, datetime.utcnow())), 201
+
+
+# ----------------------------------------------------
+# VALIDATE (GATES WITH CONNECTIVITY)
+# ----------------------------------------------------
+
+@tickets_bp.route("/validate", methods=["POST"])
+@agency_required()
+def validate_ticket():
+    data = request.get_json() or {}
+
+    qr_code, station = data.get("qr_code"), data.get("station")
+    if not isinstance(qr_code, str) or not qr_code:
+        return error("invalid_request", "qr_code must be a string")
+    if station is not None and not isinstance(station, str):
+        return error("invalid_request", "station must be a string")
+
+    result = verifier(revocation_snapshot()[1]).verify(
+        qr_code, int(time.time()), station=station
+    )
+
+    # Bloom hit: confirm against the DB to rule out a false positive
+    if result.reason == "revoked":
+        revoked = PrasaTicket.query.filter(
+            PrasaTicket.ticket_ref == result.ticket_ref,
+            PrasaTicket.revoked_at.isnot(None)
+        ).first()
+        if not revoked:
+            result = verifier().verify(qr_code, int(time.time()), station=station)
+
+    return jsonify({
+        "valid": result.valid,
+        "reason": result.reason,
+        "ticket_ref": result.ticket_ref,
+        "ticket_type": result.ticket_type,
+        "from": result.from_station,
+        "to": result.to_station,
+        "valid_until": result.valid_until
+    }), 200 if result.valid else 403
+
+
+# ----------------------------------------------------
+# REVOCATION
+# ----------------------------------------------------
+
+@tickets_bp.route("/<ticket_ref>/revoke", methods=["POST"])
+@agency_required(roles=["admin"])
+def revoke_ticket(ticket_ref):
+    agency, err = require_prasa()
+    if err:
+        return err
+
+    ticket = (
+        PrasaTicket.query
+        .filter_by(ticket_ref=ticket_ref, agency_id=agency.id)
+        .with_for_update()
+        .first_or_404()
+    )
+
+    refunded = 0.0
+    if ticket.revoked_at is None:
+        now = datetime.utcnow()
+        ticket.revoked_at = now
+
+        # A still-valid app ticket was paid from the wallet: give it back.
+        # Counter tickets are refunded in cash at the counter.
+        if ticket.source == TicketSource.app and ticket.user_id and ticket.valid_until > now:
+            user = User.query.filter_by(id=ticket.user_id).with_for_update().first()
+            user.balance += ticket.fare
+            refunded = ticket.fare
+            db.session.add(Transaction(
+                user_id=user.id,
+                agency_id=agency.id,
+                amount=ticket.fare,
+                type=TransactionType.refund,
+                reference=f"prasa_refund_{ticket.ticket_ref}",
+                meta={"ticket_ref": ticket.ticket_ref, "reason": "revoked"}
+            ))
+            outbox.refund(
+                f"prasa_refund_{ticket.ticket_ref}", user.id, ticket.fare,
+                agency_id=agency.id, ticket_ref=ticket.ticket_ref
+            )
+
+        db.session.commit()
+
+    return jsonify({
+        "status": "revoked",
+        "ticket_ref": ticket.ticket_ref,
+        "refunded": refunded
+    })
+
+
+_snapshot = {"version": None, "filter": None, "raw": None}
+_snapshot_lock = Lock()
+
+
+def revocation_snapshot():
+    """
+    (version, RevocationFilter, raw bytes) of revoked, unexpired tickets.
+
+    Rebuilt only when the (count, max(revoked_at)) version changes.
+    """
+    now = datetime.utcnow()
+    active = (
+        PrasaTicket.revoked_at.isnot(None),
+        PrasaTicket.valid_until > now,
+    )
+
+    count, last = db.session.query(
+        func.count(PrasaTicket.id),
+        func.max(PrasaTicket.revoked_at)
+    ).filter(*active).one()
+    version = hashlib.sha1(f"{count}:{iso(last)}".encode()).hexdigest()[:16]
+
+    with _snapshot_lock:
+        if _snapshot["version"] != version:
+            bloom = RevocationFilter.for_capacity(
+                count, current_app.config["TICKET_REVOCATION_FP_RATE"]
+            )
+            for (ref,) in db.session.query(PrasaTicket.ticket_ref).filter(*active):
+                bloom.add(ref)
+
+            _snapshot.update(version=version, filter=bloom, raw=bloom.to_bytes())
+
+        return _snapshot["version"], _snapshot["filter"], _snapshot["raw"]
+
+
+@tickets_bp.route("/revocations", methods=["GET"])
+@agency_required()
+def revocation_list():
+    version, _, raw = revocation_snapshot()
+
+    if version in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        resp = Response(raw, mimetype="application/octet-stream")
+
+    resp.set_etag(version)
+    return resp
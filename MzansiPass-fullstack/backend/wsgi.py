@@ -1,5 +1,6 @@
 # wsgi.py
 from app import create_app
 
-# Call the factory function to create the WSGI app
-app = create_app()
+# Call the factory function to create the WSGI app (serving only:
+# no migration / CLI setup)
+app = create_app(serving=True)